@@ -1,10 +1,30 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Request
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse, StreamingResponse, RedirectResponse, FileResponse
 from pathlib import Path
 import sqlite3
 import os
-from rag import get_images_using_llm, viton_model, FITTED_IMAGES_FOLDER, search_products_rag
-from recommendation import get_top_products
+from rag import get_images_using_llm, viton_model, FITTED_IMAGES_FOLDER, search_products_rag, embedding_function
+from search_filters import parse_search_filters, facet_counts, FILTER_FIELDS
+from recommendation import get_top_products, preload_in_background, get_sales_store, get_live_trending, get_products, product_id_for_image, catalog_images
+from complements import ComplementIndex, SIGNAL_WEIGHTS
+from sales_events import parse_event
+from user_store import UserStore, resolve_session_id, rerank
+from tryon_prefetch import TryOnPrefetcher, TRYON_PREFETCH_ITEMS
+from visual_index import VisualSearch
+from catalog_ingest import ensure_product_schema
+from image_placeholders import update_placeholders
+from product_listing import list_products, iter_product_chunks, parse_fields, parse_cursor, parse_limit, db_marker
+from compression import CompressionMiddleware
+import orjson
+from db import catalog_db, CATALOG_DB_PATH
+from catalog_snapshot import catalog, category_key
+from image_variants import ImageVariants, FORMATS as VARIANT_FORMATS
+from image_resize import ImageResizer, OUTPUT_FORMATS as RESIZE_FORMATS
+from asset_manifest import AssetManifest, HashedStaticFiles
+from http_cache import (make_etag, validator_headers, is_fresh, not_modified, json_response, ResponseCache,
+                        CATALOG_MAX_AGE, SEARCH_MAX_AGE)
+import threading
 from typing import List
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
@@ -27,10 +47,79 @@ import base64
 from typing import Optional
 
 
-app = FastAPI()
+# orjson for every JSON response; large payloads are compressed once they pass COMPRESS_MIN_BYTES
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(CompressionMiddleware)
+
+
+@app.on_event("startup")
+def load_recommendation_data():
+    # The recommendation dataset loads lazily; start it now without holding up startup
+    preload_in_background()
+    # Same for the visual index, which computes features for any garments added since it was saved
+    threading.Thread(target=visual_search.index, daemon=True).start()
+    # And the image variants: serve the ones already rendered, render new garments in the background
+    image_variants.load()
+    image_variants.build_in_background()
+
+
+@app.on_event("startup")
+def prepare_catalog_schema():
+    # Databases built before the listing index lack the normalized category column
+    try:
+        conn = sqlite3.connect(SQLITE_DB_PATH, timeout=30)
+        try:
+            ensure_product_schema(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Could not prepare the catalog schema: {e}")
+
+
+def backfill_placeholders():
+    conn = sqlite3.connect(SQLITE_DB_PATH, timeout=60)
+    try:
+        update_placeholders(conn, EXTRACTED_CLOTH_IMAGES_FOLDER)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not compute image placeholders: {e}")
+    finally:
+        conn.close()
+
+
+@app.on_event("startup")
+def start_placeholder_backfill():
+    # Products loaded without placeholders get them in the background; the snapshot picks up the change
+    threading.Thread(target=backfill_placeholders, daemon=True).start()
+
+
+@app.on_event("startup")
+def load_catalog_snapshot():
+    # Loaded before serving, so no request pays for the first load
+    try:
+        catalog.refresh()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not load the catalog snapshot, listing will query the database: {e}")
+
+
+@app.on_event("startup")
+def hash_assets():
+    # Only new or changed files are hashed, so after the first run this is a pass of stat calls
+    asset_manifest.build()
+
+
+@app.on_event("shutdown")
+def close_catalog_connections():
+    catalog.close()
+    catalog_db.close()
+    image_resizer.close()
+    asset_manifest.save()
+
 
 image_directory = Path(__file__).parent / "fitted_images"
 app.mount("/fitted_images", StaticFiles(directory=image_directory), name="fitted_images")
+# The same files under content-hashed names, cacheable for a year
+asset_manifest = AssetManifest(image_directory)
+app.mount("/assets", HashedStaticFiles(asset_manifest), name="assets")
 
 origins = [
     "http://localhost",
@@ -43,12 +132,12 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "X-Session-Id"],
 )
 
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "user_images")
 UPLOADED_PERSON_IMAGE_NAME = None
-SQLITE_DB_PATH = os.path.join(os.path.dirname(__file__), "myntra.db")
+SQLITE_DB_PATH = CATALOG_DB_PATH
 print(f"Database path: {SQLITE_DB_PATH}")
 EXTRACTED_CLOTH_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), "fitted_images")
 print(f"Upload directory: {UPLOAD_DIR}")
@@ -56,27 +145,206 @@ print(f"Extracted clothes directory: {EXTRACTED_CLOTH_IMAGES_FOLDER}")
 
 Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
 
-user_preferences = {"positive": {}, "negative": {}}
-visited_items = set()
+# Feedback and visited items per session, shared by all workers through SQLite
+user_store = UserStore()
+# Products worn together in the same session, a "complete the look" candidate source
+complement_index = ComplementIndex()
+
+
+def record_tryon(session_id, extract_image):
+    """Feed a try-on into the complement graph"""
+    try:
+        product_id = product_id_for_image(extract_image)
+        if product_id is not None:
+            complement_index.record(session_id, product_id, "tryon")
+        return product_id
+    except sqlite3.Error as e:
+        print(f"Could not record try-on for complements: {e}")
+        return None
+
+
+async def render_tryon(cloth_image_path, category, person_image_path, output_name):
+    return await viton_model(cloth_image_path=cloth_image_path, cloth_category=category,
+                             person_image_path=person_image_path, output_name=output_name)
+
+
+# Color-similarity index over the garment images, for "more like this"
+visual_search = VisualSearch(FITTED_IMAGES_FOLDER or str(image_directory))
+# Cached try-ons, plus background renders of the recommendations a session is likely to see next
+tryon_prefetcher = TryOnPrefetcher(render_tryon, FITTED_IMAGES_FOLDER or str(image_directory))
+# Resized WebP/JPEG copies of the garment images, served under /fitted_images/variants
+image_variants = ImageVariants(FITTED_IMAGES_FOLDER or str(image_directory), url_for=asset_manifest.url)
+# Scaled-down copies of try-on results and uploads, rendered on first request and kept in a disk LRU
+image_resizer = ImageResizer({"fitted_images": FITTED_IMAGES_FOLDER or str(image_directory), "user_images": UPLOAD_DIR},
+                             mutable_roots=("user_images",))
+
+
+def viton_category(main_category):
+    # Note: Segmind uses "Upper body" not "Upper-body"
+    if main_category == "Top Wear":
+        return "Upper body"
+    elif main_category == "Bottom Wear":
+        return "Lower body"
+    elif main_category == "Western Wear":
+        return "Dress"
+    return "Upper body"  # Default fallback
+
+
+def recommended_products(session_id, main_category, target_audience, selected_product_id, k=3):
+    """Top complementary products for the selected item, ranked for this session"""
+    # Get recommendations for complementary items
+    if main_category == "Top Wear":
+        recommended_category = "Bottom Wear"
+    elif main_category == "Bottom Wear":
+        recommended_category = "Top Wear"
+    elif main_category == "Western Wear":
+        recommended_category = "Western Wear"
+    else:
+        recommended_category = "Top Wear"  # Default fallback
+        
+    trendy_products = get_top_products(recommended_category, target_audience)
+    
+    # seasonal_top_products = trendy_products["seasonal_top_products"]
+    # Fall back to the live event-driven ranking when the seasonal trend windows have no data
+    fashion_trend_products = trendy_products["fashion_trend_products"] or trendy_products.get("trending_products", [])
+    
+    # Items other sessions wore with the selected one come first, trending items fill the rest
+    if selected_product_id is not None:
+        complement_ids = [other_id for other_id, _ in complement_index.top_complements(selected_product_id, k=10)]
+        fashion_trend_products = get_products(complement_ids, main_category=recommended_category) + fashion_trend_products
+    
+    # Filter out products this session has already seen. With daily sales history a product
+    # can appear once per sale day in the trend ranking, so keep only its first occurrence
+    visited_items = user_store.visited(session_id)
+    seen_images = set()
+    filtered_products = []
+    for product in fashion_trend_products:
+        if "img" in product and product['img'] not in visited_items and product['img'] not in seen_images:
+            seen_images.add(product['img'])
+            filtered_products.append(product)
+    
+    # Rank by the session's subcategory weights from feedback
+    weights = user_store.weights(session_id)
+    print(weights)
+    return rerank(filtered_products, weights, k)
+
+
+def prefetch_recommendations(session_id, main_category, target_audience, selected_product_id, fitted_image):
+    """Start rendering the recommendations the panel will most likely ask for next"""
+    try:
+        products = recommended_products(session_id, main_category, target_audience, selected_product_id, TRYON_PREFETCH_ITEMS)
+    except Exception as e:
+        print(f"Could not predict recommendations to prefetch: {e}")
+        return 0
+    person_image_path = tryon_prefetcher.absolute_path(fitted_image)
+    jobs = [
+        (os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, product["extract_images"]), viton_category(product["main_category"]), person_image_path)
+        for product in products
+    ]
+    return tryon_prefetcher.prefetch(session_id, jobs)
+
+# Search answers per catalog version and parameters, so a repeated query returns the same products
+search_cache = ResponseCache()
+
+
+def catalog_version():
+    try:
+        return catalog.current().version
+    except (OSError, sqlite3.Error) as e:
+        print(f"Catalog version unavailable: {e}")
+        return None
+
+
+def with_image_urls(products):
+    """Content-hashed ``img`` URLs and responsive variants for product dicts, in place"""
+    for product in products:
+        if "img" in product:
+            product["img"] = asset_manifest.url(product["img"])
+    return image_variants.annotate(products)
+
+
+async def run_search(request, query, raw_filters, limit, want_facets):
+    query = (query or "").strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Search query is required")
+    try:
+        filters = parse_search_filters(raw_filters)
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = catalog_version()
+    etag = make_etag(version, {"search": " ".join(query.split()), "filters": filters, "limit": limit, "facets": want_facets,
+                               "assets": asset_manifest.version})
+    headers = validator_headers(etag, SEARCH_MAX_AGE)
+    if version is not None and is_fresh(request, etag):
+        return not_modified(headers)
+    body = search_cache.get(etag) if version is not None else None
+    if body is not None:
+        print(f"RAG Search Query (cached): {query}")
+        return json_response(body, headers)
+
+    print(f"RAG Search Query: {query}")
+    # Use RAG to search products, with the filters applied inside the search
+    products = await asyncio.to_thread(lambda: with_image_urls(search_products_rag(query, num_results=limit, filters=filters)))
+    print(f"RAG search returned {len(products)} products")
+
+    if not filters and not want_facets:
+        body = products
+    else:
+        body = {
+            "query": query,
+            "filters": filters,
+            "total": len(products),
+            "products": products,
+            "facets": facet_counts(products),
+        }
+    if version is None or not products:
+        # Nothing to pin: an empty answer may just be a failed search
+        return json_response(body, {"Cache-Control": "no-store"})
+    search_cache.put(etag, body)
+    return json_response(body, headers)
+
 
 @app.post("/search_products")
-async def search_products(search: dict):
+async def search_products(search: dict, request: Request):
     """
-    RAG-based product search using natural language queries
+    RAG-based product search using natural language queries.
+
+    Optional body fields:
+      filters: {"category", "subcategory", "seller", "min_price", "max_price", "min_discount"}
+      limit: maximum number of products (default 50)
+      facets: true to get {"products", "facets", ...} instead of a plain list
+
+    When filters are given the response always includes facets.
     """
     try:
-        query = search.get("query", "").strip()
-        if not query:
-            raise HTTPException(status_code=400, detail="Search query is required")
-        
-        print(f"RAG Search Query: {query}")
-        
-        # Use RAG to search products
-        products = search_products_rag(query, num_results=50)
-        
-        print(f"RAG search returned {len(products)} products")
-        return products
-        
+        return await run_search(request, search.get("query", ""), search.get("filters"), search.get("limit", 50),
+                                bool(search.get("facets")))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in search_products: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
+@app.get("/search_products")
+async def search_products_get(request: Request, query: str = "", limit: int = 50, facets: bool = False):
+    """
+    Same search as the POST endpoint, as a cacheable GET. Filters are query
+    parameters named like the body filters; repeat one to match any of several values.
+    """
+    raw_filters = {}
+    for name in FILTER_FIELDS:
+        values = request.query_params.getlist(name)
+        if values:
+            raw_filters[name] = values if len(values) > 1 else values[0]
+    try:
+        return await run_search(request, query, raw_filters, limit, facets)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in search_products: {str(e)}")
         import traceback
@@ -88,46 +356,39 @@ async def search_products(search: dict):
 async def get_images(search: dict):
     query = search["query"]
     print("Search Query:", query)
-    extracted_images, images, categories, names, sellers, prices, discounts  = get_images_using_llm(query)
-    extracted_image_1 = extracted_images[0]
-    extracted_image_final = extracted_image_1
-    print("Cloth Match:", names[0])
-    category_1= categories[0]
-    print(category_1)
+    # LLM extraction and the batched catalog lookup are blocking, keep them off the event loop
+    products = await asyncio.to_thread(get_images_using_llm, query)
+    if not products:
+        raise HTTPException(status_code=404, detail="No matching clothing items found")
     
     images_details = []
-    images_details.append(
-        {
-            "original_image": images,
-            "name": names[0],
-            "seller": sellers[0],
-            "price": prices[0],
-            "discount": discounts[0]
-        }
-    )
-    
-    final_image = await viton_model(cloth_image_path=os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image_1), cloth_category=category_1, person_image_path=os.path.join(UPLOAD_DIR, UPLOADED_PERSON_IMAGE_NAME)) # along with these parameters, we can also pass the user image
+    person_image_path = os.path.join(UPLOAD_DIR, UPLOADED_PERSON_IMAGE_NAME)
+    extracted_image_final = None
     
-    try:
-        extracted_image_2 = extracted_images[1]
-        extracted_image_final = extracted_image_2
-        print("Cloth Match:", names[1])
-        category_2 = categories[1]
-        print(category_2)
-        final_image_path = await viton_model(cloth_image_path=os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image_2), cloth_category=category_2, person_image_path=final_image)
+    # Layer up to two garments: each try-on is applied on top of the previous result
+    for product in products[:2]:
+        print("Cloth Match:", product["name"])
+        print(product["category"])
+        try:
+            fitted_image = await viton_model(cloth_image_path=os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, product["extract_images"]), cloth_category=product["category"], person_image_path=person_image_path)
+        except Exception as e:
+            print(e)
+            if extracted_image_final is None:
+                raise
+            break
         
+        extracted_image_final = product["extract_images"]
+        if isinstance(fitted_image, str) and fitted_image.startswith('/fitted_images/'):
+            person_image_path = os.path.join(FITTED_IMAGES_FOLDER, fitted_image.split('/')[-1])
         images_details.append(
             {
-                "original_image": images[1],
-                "name": names[1],
-                "seller": sellers[1],
-                "price": prices[1],
-                "discount": discounts[1]
+                "original_image": product["img"],
+                "name": product["name"],
+                "seller": product["seller"],
+                "price": product["price"],
+                "discount": product["discount"]
             }
         )
-    except Exception as e:
-        print(e)
-        pass # this means there was only one image which is possible
     
     return {
         "fitted_image": extracted_image_final,
@@ -154,126 +415,60 @@ async def get_fitted_images(images, person_image_path):
 
 @app.post("/get_recommendations")
 
-async def get_recommendations(data: dict):
+async def get_recommendations(data: dict, x_session_id: Optional[str] = Header(None)):
+    session_id = resolve_session_id(data.get("session_id"), x_session_id)
     main_category = data["main_category"]
     target_audience = data["target_audience"]
     extracted_image = data['extract_images']
+    selected_product_id = record_tryon(session_id, extracted_image)
     
-    # Map categories to VITON categories
-    if main_category == "Top Wear":
-        category = "Upper body"  # Note: Segmind uses "Upper body" not "Upper-body"
-    elif main_category == "Bottom Wear":
-        category = "Lower body"  # Note: Segmind uses "Lower body" not "Lower-body"
-    elif main_category == "Western Wear":
-        category = "Dress"
-    else:
-        category = "Upper body"  # Default fallback
+    category = viton_category(main_category)
     
     print(f"Processing single item try-on: {extracted_image} with category: {category}")
     
-    # Process ONLY the selected single item
-    extracted_image_path = await viton_model(
-        cloth_image_path=os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image), 
-        cloth_category=category, 
-        person_image_path=os.path.join(UPLOAD_DIR, UPLOADED_PERSON_IMAGE_NAME)
+    # Process ONLY the selected single item; usually a cache hit from /single_item_tryon
+    extracted_image_path = await tryon_prefetcher.tryon(
+        os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image), 
+        category, 
+        os.path.join(UPLOAD_DIR, UPLOADED_PERSON_IMAGE_NAME)
     )
     
     print(f"VITON result: {extracted_image_path}")
     
     # Convert relative path to absolute path for recommendations
-    if extracted_image_path.startswith('/fitted_images/'):
-        absolute_tryon_path = os.path.join(FITTED_IMAGES_FOLDER, extracted_image_path.split('/')[-1])
-    else:
-        absolute_tryon_path = extracted_image_path
+    absolute_tryon_path = tryon_prefetcher.absolute_path(extracted_image_path)
     
     print(f"Absolute try-on path for recommendations: {absolute_tryon_path}")
     
-    # Get recommendations for complementary items
-    if main_category == "Top Wear":
-        recommended_category = "Bottom Wear"
-    elif main_category == "Bottom Wear":
-        recommended_category = "Top Wear"
-    elif main_category == "Western Wear":
-        recommended_category = "Western Wear"
-    else:
-        recommended_category = "Top Wear"  # Default fallback
-        
-    trendy_products = get_top_products(recommended_category, target_audience)
-    
-    # seasonal_top_products = trendy_products["seasonal_top_products"]
-    fashion_trend_products = trendy_products["fashion_trend_products"]
-    
-    # Filter out products that have been visited
-    filtered_products = [product for product in fashion_trend_products if "img" in product and product['img'] not in visited_items]
-    
-    
-    
-    def adjust_weights():
-        weights = {}
-        for subcat, count in user_preferences["positive"].items():
-            weights[subcat] = weights.get(subcat, 1) + count  # Increase weight for positive feedback
-        
-        for subcat, count in user_preferences["negative"].items():
-            weights[subcat] = weights.get(subcat, 1) - count  # Decrease weight for negative feedback
-        
-        # Ensure no negative weights
-        for subcat in weights:
-            if weights[subcat] < 0:
-                weights[subcat] = 0
-
-        return weights
-    # Adjust weights based on feedback
-    weights = adjust_weights()
-    print(weights)
-    
-    # Apply weights to filter and sort the products
-    def weighted_sort(product):
-        subcat = product.get("subcategory", "")
-        return weights.get(subcat, 1)
-    
-    # print(fashion_trend_products)
-    # print("#############################")
-    # Sort and slice the lists
-    # seasonal_top_products = sorted(seasonal_top_products, key=weighted_sort, reverse=True)[0]
-    fashion_trend_products = sorted(filtered_products, key=weighted_sort, reverse=True)[:3]
+    fashion_trend_products = recommended_products(session_id, main_category, target_audience, selected_product_id)
     print("fashion: ",len(fashion_trend_products))
     
     # Update visited items
-    visited_items.update([product["img"] for product in fashion_trend_products])
-    print("Visited_Items:", visited_items)
+    user_store.add_visited(session_id, [product["img"] for product in fashion_trend_products])
     # print(fashion_trend_products)
     # Verify the data passed to get_fitted_images
     if any(not isinstance(product, dict) for product in fashion_trend_products):
         return {"error": "Invalid data format: Each item in 'fashion_trend_products' should be a dictionary"}
     
-    # Get fitted images for the recommended items too
+    # Get fitted images for the recommended items too. Renders prefetched after the
+    # selected item's try-on are joined or served from the cache instead of started again
     print("Generating virtual try-on results for recommendations...")
-    recommendation_tryon_results = []
+    results = await asyncio.gather(*[
+        tryon_prefetcher.tryon(
+            os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, product["extract_images"]), 
+            viton_category(product["main_category"]), 
+            absolute_tryon_path  # Use the absolute path
+        )
+        for product in fashion_trend_products
+    ], return_exceptions=True)
     
-    for product in fashion_trend_products:
-        try:
-            # Map product category to VITON category
-            if product["main_category"] == "Top Wear":
-                viton_category = "Upper body"
-            elif product["main_category"] == "Bottom Wear":
-                viton_category = "Lower body"
-            elif product["main_category"] == "Western Wear":
-                viton_category = "Dress"
-            else:
-                viton_category = "Upper body"  # Default
-            
-            # Generate virtual try-on for this recommendation
-            tryon_result = await viton_model(
-                cloth_image_path=os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, product["extract_images"]), 
-                cloth_category=viton_category, 
-                person_image_path=absolute_tryon_path  # Use the absolute path
-            )
-            recommendation_tryon_results.append(tryon_result)
-            
-        except Exception as e:
-            print(f"Error generating try-on for {product['name']}: {e}")
+    recommendation_tryon_results = []
+    for product, tryon_result in zip(fashion_trend_products, results):
+        if isinstance(tryon_result, Exception):
+            print(f"Error generating try-on for {product['name']}: {tryon_result}")
             # Fallback to original image if try-on fails
-            recommendation_tryon_results.append(product["extract_images"])
+            tryon_result = product["extract_images"]
+        recommendation_tryon_results.append(tryon_result)
     
     # Return just the try-on result and recommendations with their try-on results
     fitted_images = {"images": [extracted_image_path]}  # Only the single try-on result
@@ -282,8 +477,8 @@ async def get_recommendations(data: dict):
         {
             "name": fashion_trend_products[i]["name"],
             "subcategory": fashion_trend_products[i]["subcategory"],
-            "fitted_image": recommendation_tryon_results[i] if i < len(recommendation_tryon_results) else fashion_trend_products[i]["extract_images"],
-            "original_image": fashion_trend_products[i]["img"],
+            "fitted_image": asset_manifest.url(recommendation_tryon_results[i] if i < len(recommendation_tryon_results) else fashion_trend_products[i]["extract_images"]),
+            "original_image": asset_manifest.url(fashion_trend_products[i]["img"]),
             "seller": fashion_trend_products[i]["seller"],
             "price": fashion_trend_products[i]["price"],
             "discount": fashion_trend_products[i]["discount"],
@@ -299,32 +494,27 @@ async def get_recommendations(data: dict):
 
 
 @app.post("/submit-feedback")
-async def feedback(positive_feedback: List[str], negative_feedback: List[str]):
+async def feedback(positive_feedback: List[str], negative_feedback: List[str], session_id: Optional[str] = None, x_session_id: Optional[str] = Header(None)):
+    session_id = resolve_session_id(session_id, x_session_id)
     print(positive_feedback)
     print(negative_feedback)
-    for subcat in positive_feedback:
-        user_preferences["positive"][subcat] = user_preferences["positive"].get(subcat, 0) + 1
-    
-    for subcat in negative_feedback:
-        user_preferences["negative"][subcat] = user_preferences["negative"].get(subcat, 0) + 1
+    user_store.record_feedback(session_id, positive_feedback, negative_feedback)
     
-    return {"message": "Feedback received", "user_preferences": user_preferences}
+    return {"message": "Feedback received", "user_preferences": user_store.preferences(session_id)}
 
 @app.post("/single_item_tryon")
-async def single_item_tryon(data: dict):
+async def single_item_tryon(data: dict, x_session_id: Optional[str] = Header(None)):
     """Endpoint for trying on a single selected clothing item"""
+    session_id = resolve_session_id(data.get("session_id"), x_session_id)
     main_category = data.get("main_category", "")
+    target_audience = data.get("target_audience", "Female")
     extracted_image = data.get('extract_images', '')
+    # Moving to another item makes the previous item's prefetched recommendations moot
+    tryon_prefetcher.cancel(session_id)
+    selected_product_id = record_tryon(session_id, extracted_image)
     
     # Map categories to VITON categories (Segmind format)
-    if main_category == "Top Wear":
-        category = "Upper body"
-    elif main_category == "Bottom Wear":
-        category = "Lower body" 
-    elif main_category == "Western Wear":
-        category = "Dress"
-    else:
-        category = "Upper body"  # Default fallback
+    category = viton_category(main_category)
     
     print(f"=== SINGLE ITEM TRY-ON ===")
     print(f"Item: {extracted_image}")
@@ -333,14 +523,16 @@ async def single_item_tryon(data: dict):
     
     # Process ONLY the selected single item
     try:
-        result_image_path = await viton_model(
-            cloth_image_path=os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image), 
-            cloth_category=category, 
-            person_image_path=os.path.join(UPLOAD_DIR, UPLOADED_PERSON_IMAGE_NAME)
+        result_image_path = await tryon_prefetcher.tryon(
+            os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image), 
+            category, 
+            os.path.join(UPLOAD_DIR, UPLOADED_PERSON_IMAGE_NAME)
         )
         
         print(f"Single try-on result: {result_image_path}")
-        return {"success": True, "fitted_image": result_image_path}
+        if isinstance(result_image_path, str) and result_image_path.startswith('/fitted_images/'):
+            prefetch_recommendations(session_id, main_category, target_audience, selected_product_id, result_image_path)
+        return {"success": True, "fitted_image": asset_manifest.url(result_image_path)}
         
     except Exception as e:
         print(f"Error in single item try-on: {e}")
@@ -357,6 +549,8 @@ async def get_user_image(file: UploadFile = File(...)):
 
         global UPLOADED_PERSON_IMAGE_NAME
         UPLOADED_PERSON_IMAGE_NAME = file.filename
+        # Renders of the previous photo are no longer wanted
+        tryon_prefetcher.cancel_all()
         print(UPLOADED_PERSON_IMAGE_NAME)
         
         # Define the path where the image will be saved
@@ -377,30 +571,123 @@ def check_user_image():
     """Check if a user image has been uploaded"""
     return {"has_user_image": UPLOADED_PERSON_IMAGE_NAME is not None, "filename": UPLOADED_PERSON_IMAGE_NAME}
 
+@app.post("/cancel_prefetch")
+def cancel_prefetch(data: Optional[dict] = None, x_session_id: Optional[str] = Header(None)):
+    """Called when the user leaves the try-on panel"""
+    tryon_prefetcher.cancel(resolve_session_id((data or {}).get("session_id"), x_session_id))
+    return {"cancelled": True}
+
+@app.get("/tryon_cache_stats")
+def tryon_cache_stats():
+    return tryon_prefetcher.stats
+
+@app.get("/search_cache_stats")
+def search_cache_stats():
+    return search_cache.stats
+
+@app.get("/image_cache_stats")
+def image_cache_stats():
+    return image_resizer.stats
+
+@app.get("/embedding_cache_stats")
+def embedding_cache_stats():
+    """Hit-rate and encode-time metrics for the query embedding cache"""
+    return embedding_function.stats()
+
+@app.post("/sales_events")
+def ingest_sales_events(data: dict):
+    """Append sales/interaction events: {"events": [{"product_id", "event_type", "quantity", "occurred_at", "session_id"}]}"""
+    raw_events = data.get("events", [data] if "product_id" in data else [])
+    try:
+        events = [parse_event(raw) for raw in raw_events]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    store = get_sales_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Sales event store unavailable")
+    ingested = store.record_events(events)
+    
+    # Purchases and cart adds in one session also link products in the complement graph
+    for event in events:
+        if event["session_id"] and event["event_type"] in SIGNAL_WEIGHTS:
+            complement_index.record(event["session_id"], event["product_id"], event["event_type"], seen_at=event["occurred_at"])
+    return {"ingested": ingested}
+
+@app.get("/complements/{product_id}")
+def complements(product_id: int, k: int = 10):
+    """Products most often tried on or bought together with this one"""
+    pairs = complement_index.top_complements(product_id, k=min(max(k, 1), 100))
+    weights = dict(pairs)
+    return [{**record, "weight": weights[record["product_id"]]} for record in get_products([other_id for other_id, _ in pairs])]
+
+@app.get("/similar_items")
+def similar_items(image: str, k: int = 10, main_category: Optional[str] = None):
+    """Catalog products whose garment colors look most like ``image`` (an extract_images name)"""
+    try:
+        matches = visual_search.similar(os.path.basename(image), k=min(max(k, 1), 50), candidates=catalog_images(main_category))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No visual features for image: {image}")
+    items = []
+    for name, similarity in matches:
+        for product in get_products([product_id_for_image(name)]):
+            items.append({**product, "similarity": similarity})
+    return {"image": image, "items": items}
+
+@app.get("/trending")
+def trending(main_category: Optional[str] = None, target_audience: Optional[str] = None, limit: int = 10):
+    """Products ranked by decayed sales/interaction score"""
+    return get_live_trending(main_category, target_audience, limit=min(max(limit, 1), 100))
+
 @app.get("/get_myntra_data")
-def get_myntra_data(category: Optional[str] = None):
+async def get_myntra_data(request: Request, category: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """
+    Products, optionally in one subcategory. Passing ``limit``, ``cursor`` or ``fields``
+    returns one page {items, next_cursor, total}; without them, the full list as before.
+    Responses carry an ETag for the catalog version, and a matching If-None-Match gets a 304.
+    """
+    paginated = limit is not None or cursor is not None or fields is not None
     try:
-        print(f"Attempting to connect to database at: {SQLITE_DB_PATH}")
-        conn = sqlite3.connect(SQLITE_DB_PATH)
-        print("Database connection successful")
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # If category is specified, filter by it
-        if category:
-            cursor.execute("SELECT * FROM products WHERE extract_images IS NOT NULL AND LOWER(subcategory) = LOWER(?)", (category,))
-            print(f"Query executed successfully with category filter: {category}")
-        else:
-            cursor.execute("SELECT * FROM products WHERE extract_images IS NOT NULL")
-            print("Query executed successfully")
-            
-        rows = cursor.fetchall()
-        conn.close()
+        field_list = parse_fields(fields)
+        after = parse_cursor(cursor)
+        page_size = parse_limit(limit) if paginated else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Convert rows to list of dicts  
-        data = [dict(row) for row in rows]
-        print(f"Returning {len(data)} rows")
-        return data
+    try:
+        try:
+            snapshot = catalog.current()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Catalog snapshot unavailable, querying the database: {e}")
+            snapshot = None
+
+        headers = None
+        if snapshot is not None:
+            etag = make_etag(snapshot.version, {
+                "category": category_key(category), "fields": field_list, "cursor": after,
+                "limit": page_size, "paginated": paginated, "variants": image_variants.version,
+                "assets": asset_manifest.version,
+            })
+            mtime_ns = snapshot.version[2] if snapshot.version else None
+            headers = validator_headers(etag, CATALOG_MAX_AGE, mtime_ns)
+            if is_fresh(request, etag, mtime_ns):
+                return not_modified(headers)
+
+        if snapshot is not None and paginated:
+            # A page is an index slice of the in-memory catalog, cheap enough for the event loop
+            page = snapshot.list_products(category, field_list, after, page_size)
+            with_image_urls(page["items"])
+        elif snapshot is not None:
+            page = await asyncio.to_thread(snapshot.list_products, category, field_list, after, page_size)
+            # One stat per image, so the full list does it off the event loop too
+            await asyncio.to_thread(with_image_urls, page["items"])
+        else:
+            page = await catalog_db.run(list_products, category, field_list, after, page_size,
+                                        include_total=paginated, marker=db_marker(SQLITE_DB_PATH))
+            await asyncio.to_thread(with_image_urls, page["items"])
+        print(f"Returning {len(page['items'])} rows" + (f" for category {category}" if category else ""))
+        body = {**page, "limit": page_size} if paginated else page["items"]
+        return json_response(body, headers)
 
     except Exception as e:
         print(f"Error in get_myntra_data: {str(e)}")
@@ -409,6 +696,81 @@ def get_myntra_data(category: Optional[str] = None):
         raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
 
 
+@app.get("/image_variant/{name}")
+def image_variant(name: str, request: Request, w: int = 320, fmt: Optional[str] = None):
+    """
+    Redirects to the smallest rendered variant of ``name`` at least ``w`` pixels
+    wide (the original when none is). WebP unless ``fmt`` says otherwise or the
+    client does not accept it.
+    """
+    if fmt is None:
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+    if fmt not in VARIANT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of {', '.join(VARIANT_FORMATS)}")
+    url = image_variants.best_url(os.path.basename(name), max(w, 1), fmt)
+    if url is None:
+        raise HTTPException(status_code=404, detail=f"No variants for image: {name}")
+    return RedirectResponse(url, headers={"Cache-Control": f"public, max-age={CATALOG_MAX_AGE}", "Vary": "Accept"})
+
+
+@app.get("/img/{path:path}")
+async def resized_image(path: str, request: Request, w: int = 320, fmt: Optional[str] = None, v: Optional[str] = None):
+    """
+    ``path`` (e.g. fitted_images/tryon_cache/abc.png, or a hashed assets/ path) scaled
+    down to about ``w`` pixels wide, as WebP when the client accepts it or ``fmt`` asks for it.
+    """
+    negotiated = fmt is None
+    if negotiated:
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+    if path.startswith("assets/"):
+        # A content-hashed URL: resize the file it names, if it is still current
+        name = await asyncio.to_thread(asset_manifest.logical_name, path[len("assets/"):])
+        if name is None:
+            raise HTTPException(status_code=404, detail=f"No such image: {path}")
+        path = f"fitted_images/{name}"
+    try:
+        file_path, version = await image_resizer.get(path, max(w, 1), fmt)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No such image: {path}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        # The cache file name hashes source, version and width, and ends in the format
+        "ETag": f'"{os.path.basename(file_path).replace(".", "-")}"',
+        "Cache-Control": image_resizer.cache_control(path, v, version),
+    }
+    if negotiated:
+        headers["Vary"] = "Accept"
+    if is_fresh(request, headers["ETag"]):
+        return not_modified(headers)
+    return FileResponse(file_path, media_type=RESIZE_FORMATS[fmt][1], headers=headers)
+
+
+@app.get("/export_catalog")
+def export_catalog(category: Optional[str] = None, fields: Optional[str] = None):
+    """
+    Every listable product as NDJSON, one object per line, streamed from a
+    database cursor in chunks instead of built as one list.
+    """
+    try:
+        field_list = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def lines():
+        # Its own connection: the generator is resumed on whichever worker thread is free
+        conn = catalog_db.open()
+        try:
+            for rows in iter_product_chunks(conn, category, field_list):
+                yield b"".join(orjson.dumps(dict(zip(field_list, row))) + b"\n" for row in rows)
+        finally:
+            conn.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="catalog.ndjson"'})
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
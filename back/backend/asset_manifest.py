@@ -0,0 +1,192 @@
+"""
+Content-hashed URLs for the files under ``fitted_images``.
+
+``1234_extracted.png`` is served as ``/assets/1234_extracted.3f9a1c2b4d5e.png``,
+where the hash is taken from the file's bytes. When the bytes change the URL
+changes with them, so responses can be cached as immutable for a year and a
+repeat visit needs no image requests at all.
+
+The manifest maps each logical name (the path under ``fitted_images``) to
+the hash of its current bytes, along with the size and mtime it was hashed
+at. A file is only re-hashed when its size or mtime changes. The manifest is
+saved to ``ASSET_MANIFEST_PATH`` between runs.
+
+Nothing is copied: ``/assets`` serves the logical file, but only while its
+hash still matches the URL. An outdated hashed URL gets a 404 rather than
+different bytes under a URL that promised never to change.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from starlette.staticfiles import StaticFiles
+
+from image_resize import IMMUTABLE_CACHE_CONTROL
+
+FITTED_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), "fitted_images")
+ASSET_MANIFEST_PATH = os.getenv("ASSET_MANIFEST_PATH") or os.path.join(os.path.dirname(__file__), "asset_manifest.json")
+# How often changed or new files are looked for without a request noticing them first
+ASSET_CHECK_SECONDS = float(os.getenv("ASSET_CHECK_SECONDS", "10"))
+HASH_LENGTH = 12
+ASSET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name, digest):
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest}{extension}"
+
+
+def split_hashed_name(hashed):
+    """("1234_extracted.png", "3f9a1c2b4d5e") for "1234_extracted.3f9a1c2b4d5e.png", or None"""
+    stem, extension = os.path.splitext(hashed)
+    stem, dot, digest = stem.rpartition(".")
+    if not dot or len(digest) != HASH_LENGTH:
+        return None
+    return stem + extension, digest
+
+
+class AssetManifest:
+    def __init__(self, folder=FITTED_IMAGES_FOLDER, manifest_path=ASSET_MANIFEST_PATH, source_prefix="/fitted_images",
+                 url_prefix="/assets", check_seconds=ASSET_CHECK_SECONDS):
+        self.folder = os.path.realpath(folder)
+        self.manifest_path = manifest_path
+        self.source_prefix = source_prefix.rstrip("/") + "/"
+        self.url_prefix = url_prefix.rstrip("/")
+        self.check_seconds = check_seconds
+        # Changes whenever a known file's hash does, for ETags of responses that embed asset URLs
+        self.version = time.time_ns()
+        self._entries = {}  # logical name -> [size:mtime stamp, hash]
+        self._checked_at = time.monotonic()
+        self._building = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def save(self):
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            # A copy: requests add entries while this runs
+            json.dump(dict(self._entries), f)
+        os.replace(temp_path, self.manifest_path)
+
+    def _path(self, name):
+        """Filesystem path of a logical name, or None if it would leave the folder"""
+        # Lexical check only, it runs per URL; serving goes through StaticFiles' own realpath check
+        name = os.path.normpath(name)
+        if os.path.isabs(name) or name == ".." or name.startswith(".." + os.sep):
+            return None
+        return os.path.join(self.folder, name)
+
+    def digest(self, name):
+        """Hash of the current bytes of ``name``, re-hashed only if the file changed; None if missing"""
+        path = self._path(name)
+        if path is None or not name.lower().endswith(ASSET_EXTENSIONS):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        digest = file_hash(path)
+        if entry is not None and entry[1] != digest:
+            # A URL handed out before no longer works; new files do not affect earlier responses
+            self.version = time.time_ns()
+        self._entries[name] = [stamp, digest]
+        return digest
+
+    def url(self, url):
+        """Hashed URL for a "/fitted_images/..." URL or a bare name; anything else is returned as is"""
+        if not isinstance(url, str):
+            return url
+        self._maybe_refresh()
+        name = url[len(self.source_prefix):] if url.startswith(self.source_prefix) else url
+        if name.startswith("/") or "://" in name:
+            return url
+        digest = self.digest(name)
+        if digest is None:
+            return url
+        return f"{self.url_prefix}/{hashed_name(name, digest)}"
+
+    def logical_name(self, path):
+        """Logical name behind a hashed path (relative to ``url_prefix``) if the hash is current, else None"""
+        parts = split_hashed_name(path.strip("/"))
+        if parts is None:
+            return None
+        name, digest = parts
+        return name if self.digest(name) == digest else None
+
+    def build(self):
+        """Hash every new or changed file, forget deleted ones and save; blocking"""
+        start = time.perf_counter()
+        hashed = hashed_bytes = 0
+        seen = set()
+        try:
+            for directory, _, files in os.walk(self.folder):
+                for file_name in files:
+                    if not file_name.lower().endswith(ASSET_EXTENSIONS):
+                        continue
+                    name = os.path.relpath(os.path.join(directory, file_name), self.folder).replace(os.sep, "/")
+                    seen.add(name)
+                    entry = self._entries.get(name)
+                    if self.digest(name) is not None and self._entries.get(name) is not entry:
+                        hashed += 1
+                        hashed_bytes += int(self._entries[name][0].split(":")[0])
+            for name in [name for name in list(self._entries) if name not in seen]:
+                self._entries.pop(name, None)
+                self.version = time.time_ns()
+            self.save()
+            seconds = time.perf_counter() - start
+            print(f"Asset manifest: {len(seen)} files, {hashed} hashed ({hashed_bytes / 1e6:.1f} MB) in {seconds:.2f}s")
+        except OSError as e:
+            print(f"Could not update the asset manifest: {e}")
+        finally:
+            self._building = False
+
+    def build_in_background(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.build, daemon=True).start()
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = time.monotonic()
+        self.build_in_background()
+
+
+class HashedStaticFiles(StaticFiles):
+    """Serves ``AssetManifest`` URLs with immutable cache headers"""
+
+    def __init__(self, manifest, **kwargs):
+        super().__init__(directory=manifest.folder, **kwargs)
+        self.manifest = manifest
+
+    def lookup_path(self, path):
+        name = self.manifest.logical_name(path)
+        if name is None:
+            return "", None
+        return super().lookup_path(name)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
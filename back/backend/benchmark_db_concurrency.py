@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent catalog reads: a fresh sqlite3.connect() per request on
+the event loop (the old handlers) against the pooled read-only connections
+of db.py run off the loop.
+
+Builds a synthetic catalog, fires concurrent batches of the two queries the
+API runs most (a category page and the SQL search fallback), and reports
+requests per second and the worst event-loop stall seen by a heartbeat task.
+
+Usage: python benchmark_db_concurrency.py [num_products] [num_requests] [concurrency]
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from catalog_ingest import ingest_products
+from db import ReadPool
+from product_listing import list_products
+
+SUBCATEGORIES = ["T-Shirt", "Jeans", "Dress", "Shirt", "Blazer", "Hoodie", "Skirt", "Pants"]
+SEARCH_SQL = "SELECT * FROM products WHERE (LOWER(name) LIKE ? OR LOWER(subcategory) LIKE ?) LIMIT ?"
+
+
+def make_rows(count):
+    for product_id in range(1, count + 1):
+        subcategory = SUBCATEGORIES[product_id % len(SUBCATEGORIES)]
+        yield {
+            "product_id": product_id, "name": f"Casual {subcategory} {product_id}", "img": f"/fitted_images/{product_id}.png",
+            "subcategory": subcategory, "main_category": "Top Wear", "seller": "FashionStore", "price": 500 + product_id % 2500,
+            "discount": product_id % 40, "target_audience": "Unisex", "extract_images": f"{product_id}_extracted.png",
+        }
+
+
+def request_args(i):
+    return SUBCATEGORIES[i % len(SUBCATEGORIES)], SUBCATEGORIES[(i + 3) % len(SUBCATEGORIES)].lower()
+
+
+def handle(conn, category, term):
+    page = list_products(conn, category, ["product_id", "name", "price", "img"], cursor=None, limit=60, include_total=False)
+    results = [dict(row) for row in conn.execute(SEARCH_SQL, (f"%{term}%", f"%{term}%", 20))]
+    return len(page["items"]) + len(results)
+
+
+async def heartbeat(stop, lags, interval=0.001):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        before = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - before - interval)
+
+
+async def run_load(route, num_requests, concurrency):
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            return await route(*request_args(i))
+
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(one(i) for i in range(num_requests)))
+    seconds = time.perf_counter() - start
+    stop.set()
+    await beat
+    assert all(count == 80 for count in counts), set(counts)
+    return num_requests / seconds, max(lags, default=0.0)
+
+
+def main():
+    num_products = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(num_products), db_path)
+
+        async def per_request_connection(category, term):
+            # What the handlers did: connect, query and close on the event loop thread
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                return handle(conn, category, term)
+            finally:
+                conn.close()
+
+        pool = ReadPool(db_path)
+
+        async def pooled(category, term):
+            return await pool.run(handle, category, term)
+
+        print(f"{num_products} products, {num_requests} requests, {concurrency} in flight, {os.cpu_count()} CPUs")
+        results = {}
+        for name, route in [("connect per request", per_request_connection), ("pooled, off the loop", pooled)]:
+            asyncio.run(run_load(route, concurrency, concurrency))  # warm the OS cache and the pool
+            rate, worst_lag = asyncio.run(run_load(route, num_requests, concurrency))
+            results[name] = rate
+            print(f"{name:>22}: {rate:8.0f} req/s, worst event-loop stall {worst_lag * 1000:6.1f} ms")
+        pool.close()
+        print(f"Throughput: {results['pooled, off the loop'] / results['connect per request']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark encode throughput of the embedding backends.
+
+Compares fp32 sentence-transformers with the fp32 and int8 ONNX exports of
+gte-base, encoding one term at a time (the query path) and in batches (the
+ingestion path). Requires the exported model (python embedding_backend.py).
+
+Usage: python benchmark_embedding_backend.py [num_terms]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from embedding_backend import OnnxEmbeddingFunction, create_embedding_function
+
+BATCH_SIZE = 32
+SUBCATEGORIES = ["dress", "t-shirt", "jeans", "shirt", "blazer", "hoodie", "skirt", "jacket", "sweater", "shorts"]
+COLORS = ["red", "black", "navy blue", "white", "olive green", "pastel pink"]
+STYLES = ["casual", "formal", "party", "oversized", "slim fit", "summer"]
+
+
+def make_terms(num_terms):
+    return [
+        f"{COLORS[i % len(COLORS)]} {STYLES[(i // 3) % len(STYLES)]} {SUBCATEGORIES[i % len(SUBCATEGORIES)]} {i}"
+        for i in range(num_terms)
+    ]
+
+
+def terms_per_second(encode, terms, batch_size):
+    encode(terms[:batch_size])  # warm-up
+    start = time.perf_counter()
+    for i in range(0, len(terms), batch_size):
+        encode(terms[i:i + batch_size])
+    return len(terms) / (time.perf_counter() - start)
+
+
+def benchmark(num_terms=256):
+    terms = make_terms(num_terms)
+    print(f"=== Embedding backend benchmark: {num_terms} terms ===")
+
+    backends = [
+        ("sentence-transformers fp32", lambda: create_embedding_function("sentence-transformers")),
+        ("ONNX fp32", lambda: OnnxEmbeddingFunction(quantized=False)),
+        ("ONNX int8", lambda: OnnxEmbeddingFunction(quantized=True)),
+    ]
+    for label, load in backends:
+        start = time.perf_counter()
+        encode = load()
+        load_seconds = time.perf_counter() - start
+
+        single = terms_per_second(encode, terms, 1)
+        batched = terms_per_second(encode, terms, BATCH_SIZE)
+        latency_ms = 1000 / single
+        print(f"\n[{label}]")
+        print(f"  load time          {load_seconds:8.2f} s")
+        print(f"  single-term        {single:8.1f} terms/s ({latency_ms:.2f} ms/term)")
+        print(f"  batch of {BATCH_SIZE:<3}       {batched:8.1f} terms/s")
+        assert np.isfinite(np.asarray(encode(terms[:2]))).all()
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 256)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized trend engine against the original lambda-based one.
+
+Builds a synthetic sales table (one row per product per sale date), ranks it
+with both implementations, reports the time taken and asserts that every
+category/audience ranking is identical.
+
+Usage: python benchmark_recommendation.py [num_rows] [num_products]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from recommendation import categories, audiences, compute_trending_tables, _records_by_combo, SEASONAL_COLUMNS, TREND_COLUMNS
+
+SUBCATEGORIES = np.array(["T-Shirt", "Jeans", "Dress", "Shirt", "Blazer", "Bra", "Infant Romper", "Hoodie"])
+DATES = pd.to_datetime([
+    "2022-07-04", "2022-07-18", "2023-07-03", "2023-07-17", "2023-07-31",
+    "2024-05-06", "2024-05-20", "2024-06-03", "2024-06-17", "2024-06-28", "2024-08-01",
+])
+
+
+def make_sales(num_rows, num_products, seed=13):
+    rng = np.random.default_rng(seed)
+    product_ids = rng.integers(0, num_products, num_rows)
+    subcategories = SUBCATEGORIES[product_ids % len(SUBCATEGORIES)]
+    df = pd.DataFrame({
+        "product_id": product_ids,
+        "name": pd.Series(subcategories).str.cat(pd.Series(product_ids % (num_products // 2)).astype(str), sep=" "),
+        "price": (500 + product_ids % 2500).astype(float),
+        "rating": 4.2,
+        "subcategory": subcategories,
+        "img": pd.Series(product_ids).astype(str).radd("/fitted_images/").add(".png"),
+        "main_category": np.array(categories)[product_ids % len(categories)],
+        "target_audience": np.array(audiences)[(product_ids // 7) % len(audiences)],
+        "date": DATES[rng.integers(0, len(DATES), num_rows)],
+        # A small range so equal quantities (and nlargest tie-breaking) are common
+        "quantity": rng.integers(0, 50, num_rows),
+        "extract_images": pd.Series(product_ids).astype(str).add("_extracted.png"),
+        "seller": "FashionStore",
+        "discount": (product_ids % 40).astype(float),
+    })
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def reference_trending_tables(df, target_year=2024):
+    """The original engine: per-group nlargest apply and Python lambdas in the aggregation"""
+    df_july_past_years = df[(df['date'].dt.month == 7) & (df['date'].dt.year < target_year)]
+    df_july_past_years_filtered = df_july_past_years[~df_july_past_years['name'].str.contains('Infant', case=False, na=False)]
+    seasonal_top_products = df_july_past_years_filtered.groupby(['main_category', 'target_audience']).apply(
+        lambda x: x.nlargest(10, 'quantity')
+    ).reset_index(drop=True)
+
+    df_recent_months = df[(df['date'] >= '2024-05-01') & (df['date'] <= '2024-06-30')]
+    df_recent_months_filtered = df_recent_months[~df_recent_months['name'].str.contains('Infant', case=False, na=False)]
+    df_recent_months_filtered = df_recent_months_filtered[~df_recent_months_filtered['name'].str.contains('Bra', case=False, na=False)]
+
+    recent_spike_products = df_recent_months_filtered.groupby(['main_category', 'target_audience', 'name']).agg(
+        quantity_sum=('quantity', 'sum'),
+        last_month_quantity=('quantity', lambda x: x.iloc[-1]),
+        last_month_date=('date', lambda x: x.iloc[-1])
+    ).reset_index()
+
+    df_july_2023 = df[(df['date'].dt.month == 7) & (df['date'].dt.year == 2023)]
+    df_july_2023_filtered = df_july_2023[~df_july_2023['name'].str.contains('Infant', case=False, na=False)]
+    df_july_2023_filtered = df_july_2023_filtered[~df_july_2023_filtered['name'].str.contains('Bra', case=False, na=False)]
+
+    previous_year_products = df_july_2023_filtered.groupby(['main_category', 'target_audience', 'name']).agg(
+        quantity_sum_last_year=('quantity', 'sum')
+    ).reset_index()
+
+    recent_spike_products = recent_spike_products.merge(previous_year_products, on=['main_category', 'target_audience', 'name'], how='left', suffixes=('', '_last_year'))
+    recent_spike_products['quantity_sum_last_year'] = recent_spike_products['quantity_sum_last_year'].fillna(0)
+
+    recent_spike_products['has_spike'] = recent_spike_products['quantity_sum'] > recent_spike_products['quantity_sum_last_year'] * 1.5
+    recent_spike_products['weight'] = recent_spike_products['quantity_sum_last_year'].apply(lambda x: 2 if x == 0 else 1)
+    recent_spike_products['weighted_spike'] = recent_spike_products['has_spike'] * recent_spike_products['quantity_sum'] * recent_spike_products['weight']
+
+    fashion_trend_products = recent_spike_products[recent_spike_products['has_spike']].sort_values(by=['weighted_spike', 'quantity_sum'], ascending=[False, False])
+    fashion_top_products = fashion_trend_products.groupby(['main_category', 'target_audience']).head(10).reset_index(drop=True)
+
+    fashion_top_products_details = fashion_top_products.merge(df[['name', 'product_id', 'price', 'rating', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']], on=['name', 'main_category'], how='left')
+
+    seasonal = _records_by_combo(seasonal_top_products, SEASONAL_COLUMNS)
+    fashion = _records_by_combo(fashion_top_products_details, TREND_COLUMNS)
+    return {
+        (category, audience): {
+            "seasonal_top_products": seasonal.get((category, audience), []),
+            "fashion_trend_products": fashion.get((category, audience), []),
+        }
+        for category in categories
+        for audience in audiences
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark(num_rows=1_000_000, num_products=20_000):
+    print(f"=== Trend engine benchmark: {num_rows} sales rows, {num_products} products ===")
+    df = make_sales(num_rows, num_products)
+
+    reference, reference_seconds = timed(reference_trending_tables, df)
+    vectorized, vectorized_seconds = timed(compute_trending_tables, df)
+
+    print(f"  lambda engine     {reference_seconds:8.2f} s")
+    print(f"  vectorized engine {vectorized_seconds:8.2f} s   ({reference_seconds / vectorized_seconds:.1f}x faster)")
+
+    for key, expected in reference.items():
+        assert vectorized[key] == expected, f"Rankings differ for {key}"
+    ranked = sum(len(v["seasonal_top_products"]) + len(v["fashion_trend_products"]) for v in vectorized.values())
+    print(f"\nRankings identical for all {len(reference)} pairs ({ranked} ranked rows)")
+
+
+if __name__ == "__main__":
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    num_products = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    benchmark(num_rows, num_products)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark catalog response serialization and compression.
+
+Renders a synthetic product list the way FastAPI's default path does
+(jsonable_encoder, then JSONResponse) and with ORJSONResponse as the API now
+does, then reports the time per response and the bytes on the wire with no
+encoding, gzip and (if installed) brotli.
+
+Usage: python benchmark_serialization.py [num_products] [repeats]
+"""
+
+import json
+import sys
+import time
+import zlib
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+
+SUBCATEGORIES = ["T-Shirt", "Jeans", "Dress", "Shirt", "Blazer", "Hoodie", "Skirt", "Pants"]
+
+
+def make_products(count):
+    return [
+        {
+            "product_id": product_id, "name": f"Casual {SUBCATEGORIES[product_id % 8]} {product_id}",
+            "img": f"/fitted_images/{product_id}_extracted.png", "subcategory": SUBCATEGORIES[product_id % 8],
+            "main_category": "Top Wear", "seller": "FashionStore", "price": 499.0 + product_id % 2500,
+            "discount": float(product_id % 40), "target_audience": "Unisex", "extract_images": f"{product_id}_extracted.png",
+        }
+        for product_id in range(1, count + 1)
+    ]
+
+
+def timed(render, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = render()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def gzip_bytes(body):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def main():
+    num_products = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    products = make_products(num_products)
+
+    before, before_body = timed(lambda: JSONResponse(jsonable_encoder(products)).body, repeats)
+    after, after_body = timed(lambda: ORJSONResponse(products).body, repeats)
+    assert json.loads(after_body) == json.loads(before_body)
+    print(f"{num_products} products")
+    print(f"  jsonable_encoder + JSONResponse: {before * 1000:8.1f} ms")
+    print(f"  ORJSONResponse:                  {after * 1000:8.1f} ms ({before / after:.1f}x faster)")
+
+    gzip_time, gzipped = timed(lambda: gzip_bytes(after_body), repeats)
+    print(f"  identity: {len(after_body):>12,} bytes")
+    print(f"  gzip {GZIP_LEVEL}:   {len(gzipped):>12,} bytes ({len(after_body) / len(gzipped):.1f}x smaller, {gzip_time * 1000:.1f} ms)")
+    if brotli is not None:
+        brotli_time, compressed = timed(lambda: brotli.compress(after_body, quality=BROTLI_QUALITY), repeats)
+        print(f"  br {BROTLI_QUALITY}:     {len(compressed):>12,} bytes ({len(after_body) / len(compressed):.1f}x smaller, {brotli_time * 1000:.1f} ms)")
+    else:
+        print("  br: brotli not installed")
+
+
+if __name__ == "__main__":
+    main()
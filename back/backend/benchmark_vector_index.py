@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-memory NumPy vector index against ChromaDB.
+
+Builds a synthetic catalog of random gte-base sized embeddings, loads it into an
+in-memory Chroma collection and into NumpyVectorIndex, then reports query
+latency (unfiltered and with a metadata filter) and Chroma's recall@k against
+the exact results.
+
+Usage: python benchmark_vector_index.py [num_products] [num_queries]
+"""
+
+import sys
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from vector_index import NumpyVectorIndex
+
+DIMENSIONS = 768
+TOP_K = 10
+CATEGORIES = ["Top Wear", "Bottom Wear", "Western Wear", "Sports Wear"]
+
+
+def make_catalog(num_products, seed=7):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((num_products, DIMENSIONS)).astype(np.float32)
+    ids = [f"product_{i}" for i in range(num_products)]
+    documents = [f"Product {i}" for i in range(num_products)]
+    metadatas = [
+        {
+            "product_id": i,
+            "main_category": CATEGORIES[i % len(CATEGORIES)],
+            "price": float(1000 + i % 5000),
+        }
+        for i in range(num_products)
+    ]
+    return embeddings, ids, documents, metadatas
+
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q) * 1000)
+
+
+def time_queries(run_query, queries):
+    timings = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(run_query(query))
+        timings.append(time.perf_counter() - start)
+    return timings, results
+
+
+def benchmark(num_products=1500, num_queries=200):
+    print(f"=== Vector index benchmark: {num_products} products, {num_queries} queries ===")
+    embeddings, ids, documents, metadatas = make_catalog(num_products)
+    queries = np.random.default_rng(11).standard_normal((num_queries, DIMENSIONS)).astype(np.float32)
+
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(name="benchmark_vector_index")
+    for start in range(0, num_products, 1000):
+        end = start + 1000
+        collection.add(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end].tolist(),
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+        )
+
+    with tempfile.TemporaryDirectory() as path:
+        NumpyVectorIndex(embeddings, ids, documents, metadatas).save(path)
+        index = NumpyVectorIndex.load(path)
+
+        where = {"$and": [{"main_category": "Top Wear"}, {"price": {"$lte": 3000.0}}]}
+        cases = [("unfiltered", None), ("filtered", where)]
+
+        for label, case_where in cases:
+            chroma_timings, chroma_results = time_queries(
+                lambda q: collection.query(query_embeddings=[q.tolist()], n_results=TOP_K, where=case_where), queries
+            )
+            numpy_timings, numpy_results = time_queries(
+                lambda q: index.query(query_embeddings=[q], n_results=TOP_K, where=case_where), queries
+            )
+
+            recall = np.mean([
+                len(set(c["ids"][0]) & set(n["ids"][0])) / max(len(n["ids"][0]), 1)
+                for c, n in zip(chroma_results, numpy_results)
+            ])
+
+            print(f"\n[{label}]")
+            print(f"  ChromaDB    p50 {percentile_ms(chroma_timings, 50):7.3f} ms   p95 {percentile_ms(chroma_timings, 95):7.3f} ms")
+            print(f"  NumPy index p50 {percentile_ms(numpy_timings, 50):7.3f} ms   p95 {percentile_ms(numpy_timings, 95):7.3f} ms")
+            print(f"  ChromaDB recall@{TOP_K} vs exact: {recall:.4f}")
+
+        # Sanity check the index against brute force
+        exact = np.argsort(((embeddings[None, :, :] - queries[:5, None, :]) ** 2).sum(axis=2), axis=1, kind="stable")[:, :TOP_K]
+        for query, expected in zip(queries[:5], exact):
+            got = index.query(query_embeddings=[query], n_results=TOP_K)["ids"][0]
+            assert got == [ids[i] for i in expected], "NumPy index disagrees with brute force"
+        print("\nNumPy index matches brute-force search")
+
+
+if __name__ == "__main__":
+    num_products = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    benchmark(num_products, num_queries)
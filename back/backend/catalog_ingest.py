@@ -0,0 +1,198 @@
+"""
+Bulk, transactional product ingestion into the SQLite catalog.
+
+Rows are upserted by ``product_id`` with ``executemany`` inside a single
+transaction, in WAL mode. The API keeps reading the previous catalog while a
+load runs and sees the new one atomically once it commits; nothing is dropped
+or recreated. Rows are streamed in batches, so a load never needs the whole
+catalog in memory. Secondary indexes are created after the rows are in, so
+a first load does not maintain them row by row.
+
+After the load, image placeholders are computed for products that lack one
+(see ``image_placeholders``). A product whose image changes loses its old
+placeholder in the upsert, so it is recomputed.
+
+    python catalog_ingest.py products.csv --db myntra.db --replace
+"""
+
+import argparse
+import csv
+import operator
+import os
+import sqlite3
+import time
+
+from image_placeholders import ADD_PLACEHOLDER_SQL, FITTED_IMAGES_FOLDER, update_placeholders
+
+CATALOG_DB_PATH = os.path.join(os.path.dirname(__file__), "myntra.db")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "10000"))
+
+PRODUCT_COLUMNS = [
+    "product_id", "name", "img", "subcategory", "main_category", "seller",
+    "price", "discount", "target_audience", "extract_images",
+]
+
+CREATE_PRODUCTS_SQL = """
+    CREATE TABLE IF NOT EXISTS products (
+        product_id INTEGER PRIMARY KEY,
+        name TEXT,
+        img TEXT,
+        subcategory TEXT,
+        main_category TEXT,
+        seller TEXT,
+        price REAL,
+        discount REAL,
+        target_audience TEXT,
+        extract_images TEXT,
+        placeholder TEXT
+    )
+"""
+
+# Lower-cased, trimmed subcategory that category filters compare against, kept in sync by SQLite
+ADD_SUBCATEGORY_KEY_SQL = "ALTER TABLE products ADD COLUMN subcategory_key TEXT GENERATED ALWAYS AS (lower(trim(subcategory))) VIRTUAL"
+
+PRODUCT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_products_subcategory ON products (subcategory)",
+    "CREATE INDEX IF NOT EXISTS idx_products_main_category ON products (main_category)",
+    "CREATE INDEX IF NOT EXISTS idx_products_target_audience ON products (target_audience)",
+    # Keyset pages and counts for the collections listing, optionally by category
+    "CREATE INDEX IF NOT EXISTS idx_products_listing ON products (subcategory_key, product_id) WHERE extract_images IS NOT NULL",
+]
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def _table_columns(conn):
+    # table_xinfo, unlike table_info, lists generated columns
+    return [row[1] for row in conn.execute("PRAGMA table_xinfo(products)")]
+
+
+def ensure_product_schema(conn):
+    """Add the normalized category and placeholder columns and the secondary indexes if they are missing"""
+    columns = _table_columns(conn)
+    if "subcategory_key" not in columns:
+        conn.execute(ADD_SUBCATEGORY_KEY_SQL)
+    if "placeholder" not in columns:
+        conn.execute(ADD_PLACEHOLDER_SQL)
+    for statement in PRODUCT_INDEXES:
+        conn.execute(statement)
+    conn.commit()
+
+
+def ingest_products(rows, db_path=CATALOG_DB_PATH, replace_missing=False, batch_size=INGEST_BATCH_SIZE, images_folder=None):
+    """
+    Upsert product dicts into ``products``. Columns beyond the base schema
+    (e.g. ``rating`` or ``date`` from a richer CSV) are added to the table on
+    first sight. With ``replace_missing`` the load is a full snapshot: products
+    absent from ``rows`` are deleted in the same transaction. With
+    ``images_folder``, missing placeholders are computed from the images there.
+    Returns the number of rows written.
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(CREATE_PRODUCTS_SQL)
+        conn.commit()
+
+        batches = _batches(rows, batch_size)
+        first = next(batches, None)
+        if first is None:
+            return 0
+        columns = list(PRODUCT_COLUMNS) + [key for key in first[0] if key not in PRODUCT_COLUMNS and key != "subcategory_key"]
+        assignments = [f"{column} = excluded.{column}" for column in columns if column != "product_id"]
+        if "placeholder" not in columns:
+            # A placeholder belongs to the image it was made from
+            assignments.append("placeholder = CASE WHEN products.extract_images IS excluded.extract_images THEN products.placeholder END")
+        upsert_sql = (
+            f"INSERT INTO products ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT (product_id) DO UPDATE SET " + ", ".join(assignments)
+        )
+
+        row_values = operator.itemgetter(*columns)
+        written = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = set(_table_columns(conn))
+            if "placeholder" not in existing:
+                conn.execute(ADD_PLACEHOLDER_SQL)
+                existing.add("placeholder")
+            for column in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE products ADD COLUMN {column}")
+            if replace_missing:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS ingest_ids (product_id INTEGER PRIMARY KEY)")
+                conn.execute("DELETE FROM ingest_ids")
+
+            for batch in _chain(first, batches):
+                try:
+                    values = list(map(row_values, batch))
+                except KeyError:
+                    # Rows missing a column store NULL for it
+                    values = [tuple(row.get(column) for column in columns) for row in batch]
+                conn.executemany(upsert_sql, values)
+                if replace_missing:
+                    conn.executemany("INSERT OR IGNORE INTO ingest_ids VALUES (?)", [(value[0],) for value in values])
+                written += len(values)
+
+            if replace_missing:
+                deleted = conn.execute(
+                    "DELETE FROM products WHERE product_id NOT IN (SELECT product_id FROM ingest_ids)"
+                ).rowcount
+                print(f"Removed {deleted} products missing from the load")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Building indexes once over the loaded table is far cheaper than maintaining them per row
+        ensure_product_schema(conn)
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+        print(f"Upserted {written} products into {db_path} in {time.perf_counter() - start:.2f}s")
+        if images_folder is not None:
+            update_placeholders(conn, images_folder)
+    finally:
+        conn.close()
+    return written
+
+
+def read_csv_rows(csv_path):
+    """Stream CSV rows as dicts, without the pandas index column if the file has one"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row.pop("", None)
+            row.pop("Unnamed: 0", None)
+            if all(row.get(column) not in (None, "") for column in PRODUCT_COLUMNS):
+                yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upsert products from a CSV file into the catalog database")
+    parser.add_argument("csv_path")
+    parser.add_argument("--db", default=CATALOG_DB_PATH)
+    parser.add_argument("--replace", action="store_true", help="delete products that are not in the CSV")
+    parser.add_argument("--images", default=FITTED_IMAGES_FOLDER, help="folder of the extract_images files")
+    parser.add_argument("--no-placeholders", action="store_true", help="skip computing image placeholders")
+    args = parser.parse_args()
+    ingest_products(read_csv_rows(args.csv_path), args.db, replace_missing=args.replace,
+                    images_folder=None if args.no_placeholders else args.images)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Process-wide, immutable in-memory copy of the product catalog.
+
+The catalog changes about once a day but is read on every request, so it
+is loaded once into column arrays (NumPy for numeric columns, object arrays
+for text) ordered by ``product_id``. Row-id indexes per subcategory and main
+category are built alongside, so a category page is an index lookup and a
+slice. Records are only materialized for the rows a request returns.
+
+``catalog.current()`` returns the snapshot in use. At most every
+``CATALOG_CHECK_SECONDS`` it compares ``PRAGMA data_version`` and the
+database file's identity and mtime with the values the snapshot was built
+from. When they differ, a new snapshot is built in the background and
+swapped in with a single assignment. Readers keep the snapshot they already
+have, so they never see a partly loaded catalog.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from db import CATALOG_DB_PATH
+from product_listing import OPTIONAL_FIELDS
+from search_filters import FILTER_FIELDS
+
+CATALOG_CHECK_SECONDS = float(os.getenv("CATALOG_CHECK_SECONDS", "1.0"))
+SNAPSHOT_CHUNK_ROWS = 50000
+
+_EMPTY_ROWS = np.empty(0, dtype=np.int64)
+# Derived by SQLite for the listing index; the snapshot keeps its own normalized index
+_SKIPPED_COLUMNS = {"subcategory_key"}
+
+
+def category_key(value):
+    return (value or "").strip().lower()
+
+
+def _column_array(values, declared_type):
+    declared_type = (declared_type or "").upper()
+    if None not in values:
+        if "INT" in declared_type:
+            try:
+                return np.asarray(values, dtype=np.int64)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        elif any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+            try:
+                return np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                pass
+    # Text, and numbers with NULLs, which must come back as None rather than NaN
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class _ColumnReader:
+    """
+    Accumulates one column across chunks. SQLite returns a new string per row;
+    low-cardinality columns (categories, sellers) keep one object per distinct
+    value instead, which is most of the snapshot's memory saving.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._distinct = {}
+
+    def extend(self, chunk):
+        if self._distinct is None:
+            self.values.extend(chunk)
+            return
+        setdefault = self._distinct.setdefault
+        self.values.extend([setdefault(value, value) for value in chunk])
+        if len(self._distinct) > len(self.values) // 2:
+            # Mostly unique (names, image paths): sharing saves nothing
+            self._distinct = None
+
+
+def _row_index(values, rows):
+    """{value: row ids in product_id order} over ``rows``"""
+    if not len(rows):
+        return {}
+    codes_by_value = {}
+    codes = np.fromiter(
+        (codes_by_value.setdefault(value, len(codes_by_value)) for value in values[rows].tolist()),
+        dtype=np.int64, count=len(rows),
+    )
+    # A stable sort groups rows by value and keeps product_id order inside each group
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(codes_by_value) + 1))
+    grouped = rows[order]
+    return {value: grouped[bounds[code]:bounds[code + 1]] for value, code in codes_by_value.items()}
+
+
+class CatalogSnapshot:
+    def __init__(self, columns, version=None):
+        """``columns``: {name: array}, every array in ascending ``product_id`` order"""
+        self.columns = columns
+        # Default fields for records; opt-in ones such as placeholders only when asked for
+        self.fields = [name for name in columns if name not in OPTIONAL_FIELDS]
+        self.version = version
+        self.loaded_at = time.time()
+        self.product_ids = columns["product_id"]
+        count = len(self.product_ids)
+        all_rows = np.arange(count, dtype=np.int64)
+
+        images = columns.get("extract_images")
+        self.listable = all_rows if images is None else np.flatnonzero(images != None)  # noqa: E711
+        subcategories = columns["subcategory"].tolist()
+        keys = {value: category_key(value) for value in set(subcategories)}
+        subcategory_keys = np.empty(count, dtype=object)
+        subcategory_keys[:] = [keys[value] for value in subcategories]
+        # Listing pages, by lower-cased trimmed subcategory
+        self.by_category = _row_index(subcategory_keys, self.listable)
+        self.by_subcategory = _row_index(columns["subcategory"], all_rows)
+        self.by_main_category = _row_index(columns["main_category"], all_rows)
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def row(self, product_id):
+        """Row of a product_id, or None"""
+        position = int(np.searchsorted(self.product_ids, product_id))
+        if position < len(self.product_ids) and self.product_ids[position] == product_id:
+            return position
+        return None
+
+    def records(self, rows, fields=None):
+        """Product dicts for row ids, in the given order"""
+        fields = fields or self.fields
+        rows = np.asarray(rows, dtype=np.int64)
+        values = [self.columns[field][rows].tolist() for field in fields]
+        return [dict(zip(fields, row)) for row in zip(*values)]
+
+    def get(self, product_id, fields=None):
+        row = self.row(product_id)
+        return None if row is None else self.records([row], fields)[0]
+
+    def list_products(self, category=None, fields=None, cursor=None, limit=None):
+        """
+        Same page shape as ``product_listing.list_products``:
+        {"items": [...], "next_cursor": id or None, "total": count}
+        """
+        rows = self.by_category.get(category_key(category), _EMPTY_ROWS) if category else self.listable
+        start = 0
+        if cursor is not None:
+            # First row with a larger product_id, then its position among this category's rows
+            start = int(np.searchsorted(rows, np.searchsorted(self.product_ids, cursor, side="right")))
+        end = len(rows) if limit is None else min(start + limit, len(rows))
+        items = self.records(rows[start:end], fields)
+        return {
+            "items": items,
+            "next_cursor": items[-1]["product_id"] if items and end < len(rows) else None,
+            "total": len(rows),
+        }
+
+    def _equal_rows(self, column, values):
+        if column == "subcategory":
+            index = self.by_subcategory
+        elif column == "main_category":
+            index = self.by_main_category
+        else:
+            wanted = set(values)
+            column_values = self.columns[column].tolist()
+            return np.flatnonzero(np.fromiter((value in wanted for value in column_values), dtype=bool, count=len(column_values)))
+        matches = [index[value] for value in values if value in index]
+        return np.unique(np.concatenate(matches)) if matches else _EMPTY_ROWS
+
+    def search(self, subcategories=None, text=None, filters=None, limit=None, fields=None):
+        """
+        Products in any of ``subcategories``, whose name or subcategory contains
+        ``text`` (case-insensitive), and matching the search filters (see
+        search_filters.py), in product_id order.
+        """
+        rows = None
+        if subcategories:
+            rows = self._equal_rows("subcategory", subcategories)
+        for name, value in (filters or {}).items():
+            column, op = FILTER_FIELDS[name]
+            if column not in self.columns:
+                return []
+            if op == "$eq":
+                matched = self._equal_rows(column, value if isinstance(value, list) else [value])
+            else:
+                values = self.columns[column] if rows is None else self.columns[column][rows]
+                numbers = np.array([np.nan if v is None else v for v in values.tolist()], dtype=np.float64) \
+                    if values.dtype == object else values
+                mask = numbers >= value if op == "$gte" else numbers <= value
+                matched = np.flatnonzero(mask) if rows is None else rows[mask]
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(self), dtype=np.int64)
+
+        if text:
+            text = text.lower()
+            names, subcategories = self.columns["name"][rows].tolist(), self.columns["subcategory"][rows].tolist()
+            selected = []
+            for row, name, subcategory in zip(rows.tolist(), names, subcategories):
+                if text in (name or "").lower() or text in (subcategory or "").lower():
+                    selected.append(row)
+                    if limit is not None and len(selected) >= limit:
+                        break
+            rows = np.asarray(selected, dtype=np.int64)
+        return self.records(rows[:limit] if limit is not None else rows, fields)
+
+
+def load_snapshot(db_path=CATALOG_DB_PATH, version=None):
+    """Read the whole products table into a new snapshot"""
+    start = time.perf_counter()
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, timeout=30)
+    try:
+        declared = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(products)")}
+        columns = [name for name in declared if name not in _SKIPPED_COLUMNS]
+        # Read in chunks straight into per-column lists, never holding every row tuple at once
+        readers = [_ColumnReader() for _ in columns]
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM products ORDER BY product_id")
+        while True:
+            rows = cursor.fetchmany(SNAPSHOT_CHUNK_ROWS)
+            if not rows:
+                break
+            for reader, chunk in zip(readers, zip(*rows)):
+                reader.extend(chunk)
+    finally:
+        conn.close()
+    snapshot = CatalogSnapshot(
+        {name: _column_array(reader.values, declared[name]) for name, reader in zip(columns, readers)}, version
+    )
+    print(f"Loaded catalog snapshot: {len(snapshot)} products in {time.perf_counter() - start:.2f}s")
+    return snapshot
+
+
+class CatalogStore:
+    """Holds the current snapshot and replaces it when the database changes"""
+
+    def __init__(self, db_path=CATALOG_DB_PATH, check_seconds=CATALOG_CHECK_SECONDS):
+        self.db_path = db_path
+        self.check_seconds = check_seconds
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._rebuilding = False
+        self._conn = None
+        self._conn_file = None
+
+    def _file_identity(self):
+        stat = os.stat(self.db_path)
+        return stat.st_dev, stat.st_ino
+
+    def version(self):
+        """(data_version, file identity, mtime): changes with every commit, from any connection"""
+        with self._lock:
+            identity = self._file_identity()
+            if self._conn is None or self._conn_file != identity:
+                # A replaced file needs a new connection; data_version is per connection and per file
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True,
+                                             timeout=30, check_same_thread=False)
+                self._conn_file = identity
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return data_version, identity, os.stat(self.db_path).st_mtime_ns
+
+    def _build(self):
+        with self._build_lock:
+            version = self.version()
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = load_snapshot(self.db_path, version)
+            return self._snapshot
+
+    def _build_in_background(self):
+        try:
+            self._build()
+        except Exception as e:
+            print(f"Reloading the catalog snapshot failed, keeping the previous one: {e}")
+        finally:
+            self._rebuilding = False
+
+    def current(self):
+        """The snapshot to serve from; loads on first use, then refreshes in the background"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._build()
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_seconds and not self._rebuilding:
+            self._checked_at = now
+            try:
+                changed = self.version() != snapshot.version
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not check the catalog version: {e}")
+                changed = False
+            if changed:
+                self._rebuilding = True
+                threading.Thread(target=self._build_in_background, daemon=True).start()
+        return snapshot
+
+    def refresh(self):
+        """The snapshot, rebuilt first if the database changed; blocks while building"""
+        self._checked_at = time.monotonic()
+        return self._build()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+catalog = CatalogStore()
@@ -0,0 +1,97 @@
+"""
+Item-item complement graph built from try-on and purchase sessions.
+
+Products that the same session tries on (or buys) within
+``COMPLEMENT_SESSION_WINDOW_SECONDS`` of each other are counted as worn
+together. The counts form a sparse symmetric co-occurrence matrix stored as
+one row per (item, neighbour) pair, indexed by (item, weight), so "top-k
+complements for X" is a single index range read. Each new session item only
+updates its pairs with the session's recent items, so the graph stays
+current without any batch rebuild.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+COMPLEMENTS_DB_PATH = os.getenv("COMPLEMENTS_DB_PATH") or os.path.join(os.path.dirname(__file__), "complements.db")
+COMPLEMENT_SESSION_WINDOW_SECONDS = float(os.getenv("COMPLEMENT_SESSION_WINDOW_SECONDS", "3600"))
+# Only the most recent items of a session pair up with a new one, which bounds the work per event
+COMPLEMENT_SESSION_ITEMS = int(os.getenv("COMPLEMENT_SESSION_ITEMS", "20"))
+
+# How strongly each kind of signal links two products
+SIGNAL_WEIGHTS = {"tryon": 1.0, "add_to_cart": 2.0, "purchase": 3.0}
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS session_items ("
+    "session_id TEXT NOT NULL, product_id INTEGER NOT NULL, seen_at REAL NOT NULL, PRIMARY KEY (session_id, product_id))",
+    "CREATE INDEX IF NOT EXISTS idx_session_items_recent ON session_items (session_id, seen_at)",
+    "CREATE TABLE IF NOT EXISTS cooccurrence ("
+    "product_id INTEGER NOT NULL, other_id INTEGER NOT NULL, weight REAL NOT NULL, PRIMARY KEY (product_id, other_id))",
+    "CREATE INDEX IF NOT EXISTS idx_cooccurrence_top ON cooccurrence (product_id, weight DESC, other_id)",
+]
+
+
+class ComplementIndex:
+    def __init__(self, path=COMPLEMENTS_DB_PATH, window_seconds=COMPLEMENT_SESSION_WINDOW_SECONDS,
+                 session_items=COMPLEMENT_SESSION_ITEMS):
+        self.path = path
+        self.window_seconds = window_seconds
+        self.session_items = session_items
+        # Reads reuse one connection per thread; a fresh connect would cost more than the lookup
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, session_id, product_id, signal="tryon", seen_at=None):
+        """Add one session interaction and strengthen its links to the session's recent items"""
+        weight = SIGNAL_WEIGHTS[signal]
+        seen_at = time.time() if seen_at is None else seen_at
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            recent = [
+                other for (other,) in conn.execute(
+                    "SELECT product_id FROM session_items WHERE session_id = ? AND seen_at >= ? AND product_id != ? "
+                    "ORDER BY seen_at DESC LIMIT ?",
+                    (session_id, seen_at - self.window_seconds, product_id, self.session_items),
+                )
+            ]
+            conn.executemany(
+                "INSERT INTO cooccurrence (product_id, other_id, weight) VALUES (?, ?, ?) "
+                "ON CONFLICT (product_id, other_id) DO UPDATE SET weight = weight + excluded.weight",
+                [pair for other in recent for pair in ((product_id, other, weight), (other, product_id, weight))],
+            )
+            conn.execute(
+                "INSERT INTO session_items (session_id, product_id, seen_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id, product_id) DO UPDATE SET seen_at = excluded.seen_at",
+                (session_id, product_id, seen_at),
+            )
+            # Items that fell out of the window can no longer pair with anything
+            conn.execute(
+                "DELETE FROM session_items WHERE session_id = ? AND seen_at < ?", (session_id, seen_at - self.window_seconds)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(recent)
+
+    def top_complements(self, product_id, k=10):
+        """[(other_product_id, weight)] strongest first"""
+        return self._connection().execute(
+            "SELECT other_id, weight FROM cooccurrence WHERE product_id = ? ORDER BY weight DESC, other_id LIMIT ?",
+            (product_id, k),
+        ).fetchall()
@@ -0,0 +1,151 @@
+"""
+Response compression middleware: brotli when the client accepts it and the
+``brotli`` package is installed, gzip otherwise.
+
+Responses under ``minimum_size`` bytes, responses that are already encoded,
+and types that do not compress (images) are passed through untouched.
+Streaming responses, like the NDJSON catalog export, are compressed chunk
+by chunk and flushed after every chunk, so the client keeps receiving rows
+as they are produced.
+
+A compressed body is a different representation, so its ETag gets an
+encoding suffix (``"abc"`` becomes ``"abc-br"``). ``http_cache.etag_matches``
+strips the suffix again when a client revalidates.
+"""
+
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Quality 4-5 is the usual sweet spot for on-the-fly brotli; 11 is for precompressed assets
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, final=False):
+        if final:
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data, final=False):
+        if final:
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.process(data) + self._compressor.flush()
+
+
+def _accepted(accept_encoding):
+    """Encodings the client accepts, ignoring ones it refuses with q=0"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if name and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name)
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    accepted = _accepted(accept_encoding or "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compressible(headers):
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoder(self, encoding):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not _compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                else:
+                    encoder = self._encoder(encoding)
+                    headers["Content-Encoding"] = encoder.name
+                    headers.add_vary_header("Accept-Encoding")
+                    etag = headers.get("etag")
+                    if etag and etag.endswith('"'):
+                        headers["ETag"] = f'{etag[:-1]}-{encoder.name}"'
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        body = encoder.compress(body, final=True)
+                        headers["Content-Length"] = str(len(body))
+                        message = {**message, "body": body}
+                        encoder = None
+                await send(start_message)
+                start_message = None
+                if encoder is None:
+                    await send(message)
+                    return
+
+            if passthrough or encoder is None:
+                await send(message)
+                return
+            await send({**message, "body": encoder.compress(body, final=not more_body)})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,136 @@
+"""
+Shared read access to the SQLite catalog.
+
+Every thread that reads the catalog keeps one read-only connection
+(``mode=ro`` URI, ``query_only``), opened on first use and reused for the
+life of the thread. Each connection keeps a cache of prepared statements,
+so a repeated query is only compiled once per thread. The database is put
+in WAL mode once so readers never block on, or are blocked by, an ingest.
+``mmap_size`` lets pages be read straight from the OS page cache, and a
+larger ``cache_size`` keeps hot index pages in process.
+
+Async routes should not touch SQLite on the event loop. ``await
+catalog_db.run(fn, *args)`` calls ``fn(conn, *args)`` on one of a fixed
+number of worker threads, each with its own connection:
+
+    rows = await catalog_db.fetch_all_async("SELECT * FROM products WHERE product_id = ?", (42,))
+"""
+
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH") or os.path.join(os.path.dirname(__file__), "myntra.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_MMAP_BYTES = int(os.getenv("DB_MMAP_BYTES", str(256 * 1024 * 1024)))
+DB_CACHE_KIB = int(os.getenv("DB_CACHE_KIB", str(32 * 1024)))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+
+def enable_wal(db_path):
+    """Switch the database to WAL; the setting is persistent, so this only needs to run once"""
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            return conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Could not enable WAL on {db_path}: {e}")
+        return None
+
+
+class ReadPool:
+    def __init__(self, db_path=CATALOG_DB_PATH, size=DB_POOL_SIZE, mmap_bytes=DB_MMAP_BYTES,
+                 cache_kib=DB_CACHE_KIB, statement_cache=DB_STATEMENT_CACHE):
+        self.db_path = db_path
+        self.size = size
+        self.mmap_bytes = mmap_bytes
+        self.cache_kib = cache_kib
+        self.statement_cache = statement_cache
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        # Bumped by reset() so every thread reopens its connection on next use
+        self._generation = 0
+        self._wal_checked = False
+        self._executor = None
+
+    def open(self):
+        """A new read-only connection with the pool's settings, owned by the caller; usable from any thread"""
+        if not self._wal_checked:
+            with self._lock:
+                if not self._wal_checked:
+                    enable_wal(self.db_path)
+                    self._wal_checked = True
+        uri = "file:" + os.path.abspath(self.db_path).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False,
+                               cached_statements=self.statement_cache)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def connection(self):
+        """This thread's read-only connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        if conn is not None:
+            # Stale after reset(); closed here, by the only thread that uses it
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+        conn = self.open()
+        self._local.conn, self._local.generation = conn, self._generation
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def fetch_all(self, sql, params=()):
+        """Rows as dicts, on this thread's connection"""
+        return [dict(row) for row in self.connection().execute(sql, params)]
+
+    def fetch_one(self, sql, params=()):
+        row = self.connection().execute(sql, params).fetchone()
+        return dict(row) if row is not None else None
+
+    def _call(self, fn, args, kwargs):
+        return fn(self.connection(), *args, **kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        """``fn(conn, *args, **kwargs)`` on a pool thread, without blocking the event loop"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="catalog-db")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, fn, args, kwargs))
+
+    async def fetch_all_async(self, sql, params=()):
+        return await self.run(lambda conn: [dict(row) for row in conn.execute(sql, params)])
+
+    def reset(self):
+        """Make every thread reopen its connection on next use, e.g. after the database file was replaced"""
+        with self._lock:
+            self._generation += 1
+
+    def close(self):
+        """Stop the worker threads and close all connections, at shutdown"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            self._generation += 1
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+catalog_db = ReadPool()
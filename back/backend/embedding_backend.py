@@ -0,0 +1,137 @@
+"""
+Embedding backends for product search.
+
+``create_embedding_function()`` returns the encoder used by both ``rag.py``
+queries and ``populate_chromadb.py`` ingestion, selected with
+``EMBEDDING_BACKEND``:
+
+* ``sentence-transformers`` (default): fp32 gte-base through PyTorch.
+* ``onnx``: gte-base exported to ONNX and int8-quantized, run with onnxruntime.
+  Export it once with ``python embedding_backend.py``.
+
+Vectors from the two backends are close but not identical, so re-run
+``populate_chromadb.py`` after switching.
+"""
+
+import json
+import os
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+EMBEDDING_MODEL = "thenlper/gte-base"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR") or os.path.join(os.path.dirname(__file__), "onnx_models", "gte-base")
+
+# Namespaces cached embeddings so vectors from different backends never mix
+EMBEDDING_NAMESPACE = f"{EMBEDDING_MODEL}/{EMBEDDING_BACKEND}"
+
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+CONFIG_FILE = "embedding_config.json"
+
+
+def export_onnx_model(model_name=EMBEDDING_MODEL, output_dir=ONNX_MODEL_DIR):
+    """Export the sentence-transformers model to ONNX and write an int8-quantized copy"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    transformer.tokenizer.save_pretrained(output_dir)
+
+    # Mirror the sentence-transformers pipeline: mean pooling, then optional L2 normalization
+    config = {
+        "model_name": model_name,
+        "max_seq_length": st_model.max_seq_length,
+        "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+    }
+    with open(os.path.join(output_dir, CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+
+    model = transformer.auto_model.eval()
+    sample = transformer.tokenizer(["red party dress"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=14,
+        )
+    print(f"Exported {model_name} to {fp32_path}")
+
+    int8_path = os.path.join(output_dir, INT8_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Quantized model written to {int8_path}")
+    return int8_path
+
+
+class OnnxEmbeddingFunction(EmbeddingFunction[Documents]):
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=True, batch_size=32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, INT8_MODEL_FILE if quantized else FP32_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"ONNX model not found at {model_path}. Run `python embedding_backend.py` to export it.")
+
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            config = json.load(f)
+        self.normalize = config["normalize"]
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        print(f"Loaded ONNX embedding model: {model_path}")
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        embeddings = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def __call__(self, input: Documents) -> Embeddings:
+        if not input:
+            return []
+        batches = [self._encode_batch(input[i:i + self.batch_size]) for i in range(0, len(input), self.batch_size)]
+        return np.concatenate(batches).astype(np.float32).tolist()
+
+
+def create_embedding_function(backend=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL):
+    """Build the configured embedding function for queries and ingestion"""
+    if backend == "onnx":
+        return OnnxEmbeddingFunction()
+    if backend != "sentence-transformers":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+    import chromadb.utils.embedding_functions as embedding_functions
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+
+if __name__ == "__main__":
+    export_onnx_model()
@@ -0,0 +1,177 @@
+"""
+Memoizing wrapper for the query embedding function.
+
+Search terms repeat constantly ("t-shirt", "party dress", ...), so embeddings
+are kept in a bounded LRU keyed by the normalized term text, optionally backed
+by a SQLite file so the cache survives restarts. The file is bounded too: rows
+carry a last-used time and the least recently used ones are pruned once the
+table grows past its cap. Only cache misses reach the underlying encoder, in a
+single batched call.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# Leave unset to keep the cache in memory only
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "100000"))
+# Pruning scans the table, so it only runs after this many new rows
+_PRUNE_EVERY = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_term(text):
+    """Cache key for a term: lowercased with whitespace collapsed"""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    def __init__(self, embedding_function, namespace="default", max_entries=EMBEDDING_CACHE_SIZE, cache_path=EMBEDDING_CACHE_PATH,
+                 max_disk_entries=EMBEDDING_CACHE_DISK_SIZE):
+        self.embedding_function = embedding_function
+        # Entries from different models must never mix, so every key is scoped by namespace
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._writes_since_prune = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_calls = 0
+        self.encode_seconds = 0.0
+
+        self._db = None
+        if cache_path:
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "namespace TEXT NOT NULL, term TEXT NOT NULL, vector BLOB NOT NULL, "
+                "last_used REAL NOT NULL DEFAULT 0, PRIMARY KEY (namespace, term))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (namespace, last_used)")
+            self._db.commit()
+
+    def _remember(self, key, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, keys):
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT term, vector FROM embedding_cache WHERE namespace = ? AND term IN ({placeholders})",
+                [self.namespace, *chunk],
+            ).fetchall()
+            for term, blob in rows:
+                found[term] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            now = time.time()
+            self._db.executemany(
+                "UPDATE embedding_cache SET last_used = ? WHERE namespace = ? AND term = ?",
+                [(now, self.namespace, term) for term in found],
+            )
+            self._db.commit()
+        return found
+
+    def _save_to_disk(self, vectors):
+        if self._db is None or not vectors:
+            return
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embedding_cache (namespace, term, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(self.namespace, key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()],
+        )
+        self._writes_since_prune += len(vectors)
+        if self._writes_since_prune >= _PRUNE_EVERY:
+            self._prune_disk()
+        self._db.commit()
+
+    def _prune_disk(self):
+        """Drop the least recently used rows beyond ``max_disk_entries``"""
+        self._writes_since_prune = 0
+        self._db.execute(
+            "DELETE FROM embedding_cache WHERE namespace = ? AND term NOT IN ("
+            "SELECT term FROM embedding_cache WHERE namespace = ? ORDER BY last_used DESC LIMIT ?)",
+            (self.namespace, self.namespace, self.max_disk_entries),
+        )
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [normalize_term(text) for text in input]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                if key in vectors:
+                    continue
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    vectors[key] = self._entries[key]
+
+            missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+            from_disk = self._load_from_disk(missing)
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+            vectors.update(from_disk)
+
+            self.disk_hits += sum(1 for key in keys if key in from_disk)
+
+        to_encode = [key for key in missing if key not in from_disk]
+        if to_encode:
+            start = time.perf_counter()
+            encoded = self.embedding_function(to_encode)
+            elapsed = time.perf_counter() - start
+            encoded = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(to_encode, encoded)}
+
+            with self._lock:
+                self.encode_calls += 1
+                self.encode_seconds += elapsed
+                for key, vector in encoded.items():
+                    self._remember(key, vector)
+                self._save_to_disk(encoded)
+            vectors.update(encoded)
+
+        with self._lock:
+            # One miss per distinct encoded term; repeats of it in the same call are served from that encode
+            self.misses += len(to_encode)
+            self.hits += len(keys) - len(to_encode)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def stats(self):
+        """Hit-rate and encode-time metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+                "max_disk_entries": self.max_disk_entries if self._db is not None else None,
+                "lookups": lookups,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "encode_calls": self.encode_calls,
+                "encode_time_ms_total": self.encode_seconds * 1000,
+                "encode_time_ms_per_term": self.encode_seconds * 1000 / self.misses if self.misses else 0.0,
+            }
@@ -0,0 +1,132 @@
+"""
+HTTP validators for responses derived from the catalog.
+
+A response that is a pure function of the catalog version and the request
+parameters gets a strong ETag computed from exactly those two things. That
+means a matching ``If-None-Match`` is answered with an empty 304 before
+any product is read or serialized. ``Last-Modified`` is the database mtime
+the catalog snapshot was built from, for clients that only revalidate by
+date.
+
+Search goes through an LLM, so the same query can come back with different
+products. Its results are kept per ETag in a ``ResponseCache``, which makes
+a query deterministic for a given catalog version; the ETag then really
+does identify one body.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+from compression import ENCODING_SUFFIXES
+
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+SEARCH_MAX_AGE = int(os.getenv("SEARCH_MAX_AGE", "300"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+
+
+def make_etag(version, params):
+    """Strong ETag for the catalog ``version`` and the parameters that shape the body"""
+    key = json.dumps([repr(version), params], sort_keys=True, default=str)
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def http_date(mtime_ns):
+    return email.utils.formatdate(mtime_ns / 1e9, usegmt=True)
+
+
+def cache_control(max_age):
+    # Fresh for max_age, then revalidated with the ETag; a 304 costs a round trip but no body
+    return f"public, max-age={max_age}, must-revalidate"
+
+
+def _base_etag(tag):
+    tag = tag[2:] if tag.startswith("W/") else tag
+    # Compressed responses carry the encoding in their ETag (see compression.py)
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match uses the weak comparison: W/ prefixes and encoding suffixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (_base_etag(tag.strip()) for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since, mtime_ns):
+    if not if_modified_since or mtime_ns is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return int(mtime_ns / 1e9) <= since
+
+
+def validator_headers(etag, max_age, mtime_ns=None):
+    headers = {"ETag": etag, "Cache-Control": cache_control(max_age)}
+    if mtime_ns is not None:
+        headers["Last-Modified"] = http_date(mtime_ns)
+    return headers
+
+
+def is_fresh(request, etag, mtime_ns=None):
+    """Whether the client already has this representation; If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    return not_modified_since(request.headers.get("if-modified-since"), mtime_ns)
+
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
+
+
+def json_response(body, headers=None):
+    # Serialized by orjson directly, skipping FastAPI's jsonable_encoder pass over every value
+    return ORJSONResponse(body, headers=headers)
+
+
+class ResponseCache:
+    """Bounded LRU of response bodies by ETag"""
+
+    def __init__(self, max_entries=SEARCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag):
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag, body):
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,116 @@
+"""
+Tiny blurred placeholders for product images, stored in ``products.placeholder``.
+
+Each garment is shrunk to ``PLACEHOLDER_WIDTH`` pixels wide and saved as a
+low-quality WebP data URI (about 230 characters). The collections grid paints
+it, scaled up and blurred, while the real image loads. A data URI needs no
+extra request and no decoder on the page; a BlurHash string would be shorter
+but needs a JavaScript decoder the frontend does not have.
+
+JPEG sources (most garment files, whatever their extension) are decoded at
+1/8 scale with ``Image.draft``, so a placeholder costs a few milliseconds.
+Images are processed in a process pool and written back in chunks, one
+transaction per chunk, so memory stays flat for any catalog size.
+
+    python image_placeholders.py            # products without a placeholder
+    python image_placeholders.py --all      # recompute every placeholder
+"""
+
+import argparse
+import base64
+import io
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from db import CATALOG_DB_PATH
+
+FITTED_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), "fitted_images")
+PLACEHOLDER_WIDTH = int(os.getenv("PLACEHOLDER_WIDTH", "16"))
+PLACEHOLDER_QUALITY = int(os.getenv("PLACEHOLDER_QUALITY", "40"))
+PLACEHOLDER_WORKERS = int(os.getenv("PLACEHOLDER_WORKERS", "0")) or None
+PLACEHOLDER_CHUNK_SIZE = 2000
+ADD_PLACEHOLDER_SQL = "ALTER TABLE products ADD COLUMN placeholder TEXT"
+
+
+def make_placeholder(path, width=PLACEHOLDER_WIDTH, quality=PLACEHOLDER_QUALITY):
+    """``data:image/webp;base64,...`` of the image at ``path`` scaled to ``width`` pixels wide"""
+    with Image.open(path) as image:
+        source_width, source_height = image.size
+        target = (width, max(1, round(source_height * width / source_width)))
+        image.draft("RGB", target)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB").resize(target, Image.LANCZOS, reducing_gap=2.0)
+    out = io.BytesIO()
+    image.save(out, "WEBP", quality=quality, method=6)
+    return "data:image/webp;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def _placeholder_job(path):
+    try:
+        return make_placeholder(path)
+    except (OSError, ValueError) as e:
+        print(f"Could not make a placeholder for {path}: {e}")
+        return None
+
+
+def ensure_placeholder_column(conn):
+    if "placeholder" not in [row[1] for row in conn.execute("PRAGMA table_xinfo(products)")]:
+        conn.execute(ADD_PLACEHOLDER_SQL)
+        conn.commit()
+
+
+def update_placeholders(conn, folder=FITTED_IMAGES_FOLDER, recompute=False, workers=PLACEHOLDER_WORKERS,
+                        chunk_size=PLACEHOLDER_CHUNK_SIZE):
+    """
+    Compute placeholders for products that lack one (every product with
+    ``recompute``) from their ``extract_images`` file in ``folder``.
+    Products whose image file is missing are left as they are.
+    Returns the number of products updated.
+    """
+    start = time.perf_counter()
+    ensure_placeholder_column(conn)
+    condition = "extract_images IS NOT NULL" + ("" if recompute else " AND placeholder IS NULL")
+    # Distinct image names: products sharing an image share its placeholder
+    names = [name for (name,) in conn.execute(f"SELECT DISTINCT extract_images FROM products WHERE {condition}")]
+    names = [name for name in names if os.path.isfile(os.path.join(folder, name))]
+    if not names:
+        return 0
+
+    updated = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if len(names) >= 32 else None
+    try:
+        for offset in range(0, len(names), chunk_size):
+            chunk = names[offset:offset + chunk_size]
+            paths = [os.path.join(folder, name) for name in chunk]
+            results = pool.map(_placeholder_job, paths, chunksize=32) if pool else map(_placeholder_job, paths)
+            values = [(placeholder, name) for name, placeholder in zip(chunk, results) if placeholder is not None]
+            with conn:
+                updated += conn.executemany(f"UPDATE products SET placeholder = ? WHERE extract_images = ? AND {condition}",
+                                            values).rowcount
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    seconds = time.perf_counter() - start
+    print(f"Placeholders: {len(names)} images for {updated} products in {seconds:.1f}s ({len(names) / seconds:.0f} images/s)")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute image placeholders for catalog products")
+    parser.add_argument("--db", default=CATALOG_DB_PATH)
+    parser.add_argument("--images", default=FITTED_IMAGES_FOLDER)
+    parser.add_argument("--all", action="store_true", help="recompute placeholders that already exist")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db, timeout=60)
+    try:
+        update_placeholders(conn, args.images, recompute=args.all)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+On-demand resizing for images that only exist at full size: try-on results
+and user uploads.
+
+``/img/fitted_images/tryon_cache/abc.png?w=192`` decodes the source in a
+thread pool, scales it down and encodes it as WebP or JPEG. Requested widths
+are rounded up to one of ``RESIZE_WIDTHS``, so there are a few renders per
+image rather than one per pixel width, and images are never scaled up.
+
+JPEG sources are decoded at reduced size with ``Image.draft`` (the decoder
+skips the DCT work for the pixels it drops); other formats are shrunk by an
+integer factor with ``reduce`` before the final Lanczos pass, which
+``resize(reducing_gap=...)`` does for us.
+
+Renders are kept in a size-bounded LRU cache on disk (``IMAGE_CACHE_DIR``),
+keyed by source path, size and mtime, width and format, so a changed source
+never serves a stale render. Identical requests that arrive while a render
+is running wait for that render instead of starting another.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR") or os.path.join(os.path.dirname(__file__), "image_cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+IMAGE_RESIZE_WORKERS = int(os.getenv("IMAGE_RESIZE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+RESIZE_WIDTHS = (64, 96, 128, 192, 256, 320, 384, 480, 640, 768, 960, 1280, 1600, 1920)
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+# One year, the longest max-age caches honour
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+EXIF_ORIENTATION = 0x0112
+
+OUTPUT_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def snap_width(width):
+    """The smallest allowed width at least ``width`` wide"""
+    for allowed in RESIZE_WIDTHS:
+        if allowed >= width:
+            return allowed
+    return RESIZE_WIDTHS[-1]
+
+
+def source_version(path):
+    """Short hash of a source's size and mtime, for ``?v=`` in versioned URLs"""
+    stat = os.stat(path)
+    return hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode("ascii")).hexdigest()[:12]
+
+
+def resize_image(source_path, width, fmt):
+    """Encoded bytes of ``source_path`` scaled to ``width`` pixels wide (never wider than the source)"""
+    image_format, _, options = OUTPUT_FORMATS[fmt]
+    with Image.open(source_path) as image:
+        source_width, source_height = image.size
+        # Phone photos are often stored sideways with an EXIF orientation that turns them upright
+        rotated = image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+        if rotated:
+            source_width, source_height = source_height, source_width
+        target_width = min(width, source_width)
+        target = (target_width, max(1, round(source_height * target_width / source_width)))
+        # JPEG only: decode at the smallest 1/2, 1/4 or 1/8 scale that still covers the target
+        image.draft("RGB", target[::-1] if rotated else target)
+        image = ImageOps.exif_transpose(image)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        if image.size != target:
+            image = image.resize(target, Image.LANCZOS, reducing_gap=2.0)
+        if has_alpha and image_format == "JPEG":
+            flat = Image.new("RGB", image.size, (255, 255, 255))
+            flat.paste(image, mask=image.getchannel("A"))
+            image = flat
+
+        out = io.BytesIO()
+        image.save(out, image_format, **options)
+        return out.getvalue()
+
+
+class DiskLRU:
+    """Files in ``folder`` evicted least recently used first once they pass ``max_bytes``"""
+
+    def __init__(self, folder=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # name -> size, least recently used first
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        # Last use survives restarts as the file mtime
+        found = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(".tmp"):
+                    os.remove(entry.path)
+                    continue
+                stat = entry.stat()
+                found.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def get(self, name):
+        """Path of a cached file, marking it recently used, or None"""
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        try:
+            os.utime(self.path(name))
+        except OSError:
+            # Removed behind our back
+            with self._lock:
+                self.total_bytes -= self._entries.pop(name, 0)
+            return None
+        return self.path(name)
+
+    def put(self, name, data):
+        path = self.path(name)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Never evicts the entry just added, however large
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ImageResizer:
+    """
+    Resized copies of images under ``roots`` ({url prefix: folder}), e.g.
+    {"fitted_images": ".../fitted_images", "user_images": ".../user_images"}.
+    """
+
+    def __init__(self, roots, cache=None, workers=IMAGE_RESIZE_WORKERS, mutable_roots=()):
+        self.roots = {prefix: os.path.realpath(folder) for prefix, folder in roots.items()}
+        # Roots whose files can be overwritten under the same name (uploads)
+        self.mutable_roots = set(mutable_roots)
+        self.cache = cache if cache is not None else DiskLRU()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-resize")
+        self._inflight = {}  # cache name -> future of the render
+        self._stats = {"hits": 0, "joined": 0, "renders": 0, "render_ms": 0.0}
+
+    def source_path(self, path):
+        """Filesystem path for "<root>/<relative path>"; ValueError outside the roots, FileNotFoundError if missing"""
+        prefix, _, relative = path.strip("/").partition("/")
+        root = self.roots.get(prefix)
+        if root is None or not relative or not relative.lower().endswith(SOURCE_EXTENSIONS):
+            raise ValueError(f"Not a resizable image: {path}")
+        source = os.path.realpath(os.path.join(root, relative))
+        if os.path.commonpath([root, source]) != root:
+            raise ValueError(f"Not a resizable image: {path}")
+        if not os.path.isfile(source):
+            raise FileNotFoundError(path)
+        return source
+
+    def cache_control(self, path, requested_version, version):
+        """
+        Immutable for write-once sources, and for any source when the URL names
+        its current version; otherwise the browser revalidates against the ETag.
+        """
+        if requested_version == version or path.strip("/").partition("/")[0] not in self.mutable_roots:
+            return IMMUTABLE_CACHE_CONTROL
+        return "no-cache"
+
+    async def get(self, path, width, fmt):
+        """(cached file path, version of the source) for ``path`` resized to ``width`` in ``fmt``"""
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"fmt must be one of {', '.join(OUTPUT_FORMATS)}")
+        source = self.source_path(path)
+        version = source_version(source)
+        width = snap_width(width)
+        name = hashlib.sha1(f"{source}|{version}|{width}".encode("utf-8")).hexdigest()[:32] + f".{fmt}"
+
+        cached = self.cache.get(name)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return cached, version
+
+        future = self._inflight.get(name)
+        if future is not None:
+            self._stats["joined"] += 1
+        else:
+            future = asyncio.get_running_loop().run_in_executor(self._pool, self._render, source, width, fmt, name)
+            self._inflight[name] = future
+            future.add_done_callback(lambda done: self._inflight.pop(name) if self._inflight.get(name) is done else None)
+        # Shield so a disconnecting client does not cancel a render other requests share
+        return await asyncio.shield(future), version
+
+    def _render(self, source, width, fmt, name):
+        start = time.perf_counter()
+        data = resize_image(source, width, fmt)
+        path = self.cache.put(name, data)
+        self._stats["renders"] += 1
+        self._stats["render_ms"] += (time.perf_counter() - start) * 1000
+        return path
+
+    @property
+    def stats(self):
+        renders = self._stats["renders"]
+        return {
+            "hits": self._stats["hits"], "joined": self._stats["joined"], "renders": renders,
+            "avg_render_ms": round(self._stats["render_ms"] / renders, 1) if renders else 0.0,
+            "cached_files": len(self.cache), "cached_bytes": self.cache.total_bytes, "evictions": self.cache.evictions,
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
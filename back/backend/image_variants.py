@@ -0,0 +1,294 @@
+"""
+Responsive thumbnails for the garment images in ``fitted_images``.
+
+Each garment is resized once to every width in ``IMAGE_VARIANT_WIDTHS`` and
+saved as WebP and as JPEG (the fallback for browsers without WebP):
+
+    fitted_images/variants/320/1234_extracted.webp
+    fitted_images/variants/320/1234_extracted.jpg
+
+They sit under the ``/fitted_images`` static mount, so a variant URL is just
+``/fitted_images/variants/{width}/{stem}.{webp|jpg}``. Widths at or above the
+source width are not generated; the original is the largest candidate in
+the srcset instead. Transparent garments keep their alpha in WebP and are
+flattened onto white for JPEG.
+
+A manifest records each source's size and mtime. A rebuild only renders
+new or changed images and drops variants of images that are gone. Renders
+run in a process pool and every file is written to a temp name and moved
+into place. Run ``python image_variants.py`` to build or refresh them.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from visual_index import is_garment_image
+
+FITTED_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), "fitted_images")
+VARIANTS_FOLDER = os.getenv("IMAGE_VARIANTS_FOLDER") or os.path.join(FITTED_IMAGES_FOLDER, "variants")
+VARIANTS_URL = "/fitted_images/variants"
+ORIGINALS_URL = "/fitted_images"
+IMAGE_VARIANT_WIDTHS = tuple(sorted(int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "160,320,640").split(",")))
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "0")) or None
+# The size a grid card asks for when it gives no width
+DEFAULT_VARIANT_WIDTH = int(os.getenv("DEFAULT_VARIANT_WIDTH", "320"))
+# How often a running API checks fitted_images for new or changed garments
+IMAGE_VARIANT_REFRESH_SECONDS = float(os.getenv("IMAGE_VARIANT_REFRESH_SECONDS", "60"))
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+MANIFEST_FILE = "manifest.json"
+
+
+def variant_path(folder, width, name, extension):
+    return os.path.join(folder, str(width), f"{os.path.splitext(name)[0]}.{extension}")
+
+
+def variant_url(width, name, extension):
+    return f"{VARIANTS_URL}/{width}/{os.path.splitext(name)[0]}.{extension}"
+
+
+def _save_atomic(image, path, image_format, options):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        image.save(temp_path, image_format, **options)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def render_variants(source_path, folder=VARIANTS_FOLDER, widths=IMAGE_VARIANT_WIDTHS):
+    """Write every variant of one image; returns (source width, source height, widths written)"""
+    name = os.path.basename(source_path)
+    with Image.open(source_path) as image:
+        image.load()
+        source_width, source_height = image.size
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    written = []
+    current = image
+    # Largest first, each smaller size resized from the one before it instead of from the full image
+    for width in sorted((w for w in widths if w < source_width), reverse=True):
+        height = max(1, round(source_height * width / source_width))
+        current = current.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        _save_atomic(current, variant_path(folder, width, name, "webp"), *FORMATS["webp"])
+        flat = current
+        if has_alpha:
+            flat = Image.new("RGB", current.size, (255, 255, 255))
+            flat.paste(current, mask=current.getchannel("A"))
+        _save_atomic(flat, variant_path(folder, width, name, "jpg"), *FORMATS["jpg"])
+        written.append(width)
+    return source_width, source_height, sorted(written)
+
+
+def _render_job(job):
+    source_path, folder, widths = job
+    try:
+        return render_variants(source_path, folder, widths)
+    except (OSError, ValueError) as e:
+        print(f"Could not render variants of {source_path}: {e}")
+        return None
+
+
+def load_manifest(folder=VARIANTS_FOLDER):
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"widths": [], "images": {}}
+
+
+def _save_manifest(manifest, folder):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def _remove_variants(folder, name, widths):
+    for width in widths:
+        for extension in FORMATS:
+            try:
+                os.remove(variant_path(folder, width, name, extension))
+            except OSError:
+                pass
+
+
+def build_variants(source_folder=FITTED_IMAGES_FOLDER, folder=VARIANTS_FOLDER, widths=IMAGE_VARIANT_WIDTHS,
+                   workers=IMAGE_VARIANT_WORKERS):
+    """Bring the variants of every garment in ``source_folder`` up to date; returns the manifest"""
+    start = time.perf_counter()
+    widths = sorted(widths)
+    manifest = load_manifest(folder)
+    previous = manifest["images"] if manifest.get("widths") == widths else {}
+
+    sources = {}
+    with os.scandir(source_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and is_garment_image(entry.name):
+                stat = entry.stat()
+                sources[entry.name] = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    images, todo = {}, []
+    for name, stamp in sorted(sources.items()):
+        entry = previous.get(name)
+        if entry is not None and entry["stamp"] == stamp and all(
+            os.path.exists(variant_path(folder, width, name, extension))
+            for width in entry["widths"] for extension in FORMATS
+        ):
+            images[name] = entry
+        else:
+            todo.append(name)
+    for name, entry in previous.items():
+        if name not in sources:
+            _remove_variants(folder, name, entry["widths"])
+
+    unchanged = len(images)
+    if todo:
+        jobs = [(os.path.join(source_folder, name), folder, widths) for name in todo]
+        if len(todo) < 16:
+            results = list(map(_render_job, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_render_job, jobs, chunksize=8))
+        for name, result in zip(todo, results):
+            if result is not None:
+                source_width, source_height, written = result
+                images[name] = {"stamp": sources[name], "width": source_width, "height": source_height, "widths": written}
+
+    manifest = {"widths": widths, "images": images}
+    _save_manifest(manifest, folder)
+    seconds = time.perf_counter() - start
+    print(f"Image variants: {unchanged} images unchanged, {len(images) - unchanged} of {len(todo)} rendered in {seconds:.1f}s")
+    return manifest
+
+
+def variant_set(name, entry, url_for=None):
+    """What the catalog API returns for one image: srcsets per format and a default src"""
+    url_for = url_for or (lambda url: url)
+    original = url_for(f"{ORIGINALS_URL}/{name}")
+    srcsets = {}
+    for extension in FORMATS:
+        parts = [f"{url_for(variant_url(width, name, extension))} {width}w" for width in entry["widths"]]
+        parts.append(f"{original} {entry['width']}w")
+        srcsets[extension] = ", ".join(parts)
+    default_width = next((width for width in entry["widths"] if width >= DEFAULT_VARIANT_WIDTH), None)
+    return {
+        "src": url_for(variant_url(default_width, name, "jpg")) if default_width else original,
+        "webp": srcsets["webp"],
+        "jpg": srcsets["jpg"],
+        "width": entry["width"],
+        "height": entry["height"],
+    }
+
+
+class ImageVariants:
+    """
+    The variants manifest as served by the API, with precomputed URLs per
+    image. Re-renders in the background when files in ``source_folder`` change.
+    ``url_for`` rewrites each URL, e.g. to a content-hashed one.
+    """
+
+    def __init__(self, source_folder=FITTED_IMAGES_FOLDER, folder=VARIANTS_FOLDER, refresh_seconds=IMAGE_VARIANT_REFRESH_SECONDS,
+                 url_for=None):
+        self.source_folder = source_folder
+        self.folder = folder
+        self.url_for = url_for
+        self.refresh_seconds = refresh_seconds
+        self.version = None
+        self._sets = {}
+        self._widths = {}
+        self._marker = None
+        self._checked_at = 0.0
+        self._updating = False
+        self._lock = threading.Lock()
+
+    def _folder_marker(self):
+        try:
+            return os.stat(self.source_folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _use(self, manifest):
+        self._sets = {name: variant_set(name, entry, self.url_for) for name, entry in manifest["images"].items()}
+        self._widths = {name: entry["widths"] for name, entry in manifest["images"].items()}
+        self.version = time.time_ns()
+
+    def load(self):
+        """Serve whatever is on disk now"""
+        self._use(load_manifest(self.folder))
+
+    def build(self):
+        """Render what is missing or stale, then serve it; blocking"""
+        marker = self._folder_marker()
+        try:
+            self._use(build_variants(self.source_folder, self.folder))
+            self._marker = marker
+        except Exception as e:
+            print(f"Could not update image variants: {e}")
+        finally:
+            self._updating = False
+
+    def build_in_background(self):
+        """Start a build unless one is already running"""
+        with self._lock:
+            if self._updating:
+                return
+            self._updating = True
+        threading.Thread(target=self.build, daemon=True).start()
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._updating or time.monotonic() - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = time.monotonic()
+            if self._folder_marker() == self._marker:
+                return
+            self._updating = True
+        threading.Thread(target=self.build, daemon=True).start()
+
+    def get(self, name):
+        """Variant URLs for an image name, or None if it has none yet"""
+        self._maybe_refresh()
+        return self._sets.get(name)
+
+    def annotate(self, products):
+        """Add ``img_variants`` to product dicts that carry an ``extract_images`` name"""
+        self._maybe_refresh()
+        sets = self._sets
+        for product in products:
+            name = product.get("extract_images")
+            if name is not None:
+                product["img_variants"] = sets.get(name)
+        return products
+
+    def best_url(self, name, width, extension="jpg"):
+        """URL of the smallest variant at least ``width`` wide, or the original when none is"""
+        self._maybe_refresh()
+        if extension not in FORMATS:
+            raise ValueError(f"Unknown image format: {extension}")
+        widths = self._widths.get(name)
+        if widths is None:
+            return None
+        url_for = self.url_for or (lambda url: url)
+        for candidate in widths:
+            if candidate >= width:
+                return url_for(variant_url(candidate, name, extension))
+        return url_for(f"{ORIGINALS_URL}/{name}")
+
+
+if __name__ == "__main__":
+    build_variants()
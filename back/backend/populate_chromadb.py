@@ -1,6 +1,5 @@
 import sqlite3
 import chromadb
-import chromadb.utils.embedding_functions as embedding_functions
 import os
 from dotenv import load_dotenv
 import pandas as pd
@@ -9,6 +8,9 @@ import pandas as pd
 load_dotenv("../../.env")
 load_dotenv()
 
+from vector_index import build_vector_index
+from embedding_backend import create_embedding_function, EMBEDDING_BACKEND
+
 # Get paths from environment
 CHROMADB_PATH = os.getenv("CHROMADB_PATH")
 SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH")
@@ -30,7 +32,8 @@ def populate_chromadb():
         
         # Initialize ChromaDB
         chromadb_client = chromadb.PersistentClient(path=CHROMADB_PATH)
-        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="thenlper/gte-base")
+        embedding_function = create_embedding_function()
+        print(f"Embedding backend: {EMBEDDING_BACKEND}")
         
         # Delete existing collection if it exists
         try:
@@ -89,6 +92,9 @@ def populate_chromadb():
         
         print(f"Successfully populated ChromaDB with {len(documents)} products!")
         
+        # Refresh the in-process index that serves small catalogs
+        build_vector_index(collection, embedding_function)
+        
         # Test the collection
         test_query = "red dress"
         results = collection.query(query_texts=[test_query], n_results=5)
@@ -0,0 +1,143 @@
+"""
+Paginated, projected product listing for the collections page.
+
+Pages are read with keyset pagination on ``product_id``: the client passes
+the last id it has as ``cursor`` and gets the next ``limit`` rows. Each page
+is one index range read, so page 1000 costs the same as page 1. The
+category filter compares against ``subcategory_key``, a generated
+``lower(trim(subcategory))`` column. Together with ``product_id`` it is
+covered by a partial index over listable products, which serves the filter,
+the ordering and the total count. Counting still visits every matching index
+entry, so totals are cached until the database files change.
+"""
+
+import os
+import threading
+
+from catalog_ingest import PRODUCT_COLUMNS
+
+DEFAULT_PAGE_SIZE = 60
+MAX_PAGE_SIZE = 500
+LISTABLE = "extract_images IS NOT NULL"
+# Returned only when asked for by name: placeholders are a few hundred bytes each
+OPTIONAL_FIELDS = ("placeholder",)
+
+
+def parse_fields(raw):
+    """Comma-separated column names to return, validated against the product columns"""
+    if not raw:
+        return list(PRODUCT_COLUMNS)
+    fields = []
+    for name in (part.strip() for part in raw.split(",")):
+        if not name:
+            continue
+        if name not in PRODUCT_COLUMNS and name not in OPTIONAL_FIELDS:
+            raise ValueError(f"Unknown field: {name}")
+        if name not in fields:
+            fields.append(name)
+    # The cursor is a product_id, so it is always returned
+    if "product_id" not in fields:
+        fields.insert(0, "product_id")
+    return fields
+
+
+def parse_cursor(raw):
+    if raw in (None, ""):
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("cursor must be a product_id")
+
+
+def parse_limit(raw):
+    if raw in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+_count_cache = {}
+_count_marker = None
+_count_lock = threading.Lock()
+
+
+def db_marker(db_path):
+    """Changes whenever a write is committed to the database or its WAL"""
+    marker = [db_path]
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            marker.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            marker.append(None)
+    return tuple(marker)
+
+
+def _where(category):
+    if category:
+        return f"{LISTABLE} AND subcategory_key = lower(trim(?))", [category]
+    return LISTABLE, []
+
+
+def count_products(conn, category=None, marker=None):
+    """Listable products, optionally in one category; cached per ``marker`` when one is given"""
+    global _count_cache, _count_marker
+    key = (category or "").strip().lower()
+    if marker is not None:
+        with _count_lock:
+            if marker != _count_marker:
+                _count_cache, _count_marker = {}, marker
+            if key in _count_cache:
+                return _count_cache[key]
+    condition, params = _where(category)
+    total = conn.execute(f"SELECT COUNT(*) FROM products WHERE {condition}", params).fetchone()[0]
+    if marker is not None:
+        with _count_lock:
+            if marker == _count_marker:
+                _count_cache[key] = total
+    return total
+
+
+def list_products(conn, category=None, fields=None, cursor=None, limit=DEFAULT_PAGE_SIZE, include_total=True, marker=None):
+    """
+    One page of products ordered by product_id:
+    {"items": [...], "next_cursor": id or None, "total": count or None}
+    Pass the database's ``db_marker`` as ``marker`` to reuse cached totals.
+    """
+    fields = fields or list(PRODUCT_COLUMNS)
+    condition, params = _where(category)
+    page_condition, page_params = condition, list(params)
+    if cursor is not None:
+        page_condition += " AND product_id > ?"
+        page_params.append(cursor)
+
+    # Fetch one extra row to know whether another page exists without a second query.
+    # No limit returns every matching product, as the endpoint did before pagination
+    rows = conn.execute(
+        f"SELECT {', '.join(fields)} FROM products WHERE {page_condition} ORDER BY product_id LIMIT ?",
+        (*page_params, -1 if limit is None else limit + 1),
+    ).fetchall()
+    has_more = limit is not None and len(rows) > limit
+    items = [dict(zip(fields, row)) for row in rows[:limit]]
+
+    return {
+        "items": items,
+        "next_cursor": items[-1]["product_id"] if has_more else None,
+        "total": count_products(conn, category, marker) if include_total else None,
+    }
+
+
+def iter_product_chunks(conn, category=None, fields=None, chunk_size=1000):
+    """Every listable product as lists of row tuples, streamed from one cursor in product_id order"""
+    fields = fields or list(PRODUCT_COLUMNS)
+    condition, params = _where(category)
+    cursor = conn.execute(f"SELECT {', '.join(fields)} FROM products WHERE {condition} ORDER BY product_id", params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
@@ -1,6 +1,5 @@
 import pandas as pd
 import chromadb
-import chromadb.utils.embedding_functions as embedding_functions
 from langchain_google_genai import ChatGoogleGenerativeAI
 from gradio_client import Client, handle_file
 import aiohttp
@@ -12,6 +11,13 @@ from dotenv import load_dotenv
 load_dotenv(".env")
 load_dotenv()
 
+# Imported after the .env is loaded so their settings pick it up
+from vector_index import select_search_backend
+from embedding_cache import CachedEmbeddingFunction
+from embedding_backend import create_embedding_function, EMBEDDING_NAMESPACE
+from search_filters import filters_to_where
+from catalog_snapshot import catalog
+
 os.environ["GOOGLE_API_KEY"] = os.environ["GEMINI_API_KEY"]
 
 llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
@@ -31,33 +37,83 @@ if EXTRACTED_CLOTH_IMAGES_FOLDER and not os.path.isabs(EXTRACTED_CLOTH_IMAGES_FO
     EXTRACTED_CLOTH_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), EXTRACTED_CLOTH_IMAGES_FOLDER)
 
 chromadb_client = chromadb.PersistentClient(path=CHROMADB_PATH)
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="thenlper/gte-base")
+# Query terms repeat a lot, so embeddings are memoized in front of the encoder
+embedding_function = CachedEmbeddingFunction(create_embedding_function(), namespace=EMBEDDING_NAMESPACE)
 
 collection = chromadb_client.get_or_create_collection(name="myntra_data", embedding_function=embedding_function) # If not specified, by default uses the embedding function "all-MiniLM-L6-v2"
 
+# Small catalogs are searched with an exact in-process index, large ones stay on Chroma
+search_collection = select_search_backend(collection, embedding_function, chroma_path=CHROMADB_PATH)
+
+
+def to_viton_category(main_category):
+    if main_category == "Top Wear":
+        return "Upper-body"
+    elif main_category == "Bottom Wear":
+        return "Lower-body"
+    elif main_category == "Dress (Full Length)":
+        return "Dress"
+    return None
+
+
+def get_data_from_db_batch(clothing_items):
+    """
+    Best catalog match for every item, resolved with one embedding pass and one
+    vector query. Returns one product record per item, in the same order.
+    """
+    if not clothing_items:
+        return []
+    result = search_collection.query(query_texts=list(clothing_items), n_results=1, include=["documents", "metadatas"])
+
+    records = []
+    for item, documents, metadatas in zip(clothing_items, result["documents"], result["metadatas"]):
+        if not metadatas:
+            print(f"No catalog match for '{item}'")
+            continue
+        metadata = metadatas[0]
+        print("Location of Image:", os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, metadata["extract_images"]))
+        records.append({
+            "item": item,
+            "product_id": metadata.get("product_id"),
+            "name": metadata.get("name", documents[0]),
+            "document": documents[0],
+            "extract_images": metadata["extract_images"],
+            "img": metadata["img"],
+            "main_category": metadata["main_category"],
+            "subcategory": metadata.get("subcategory", ""),
+            "category": to_viton_category(metadata["main_category"]),
+            "seller": metadata["seller"],
+            "price": metadata["price"],
+            "discount": metadata["discount"],
+        })
+    return records
+
 
 def get_data_from_db(clothing_item):
-    result = collection.query(query_texts=clothing_item, n_results=1, include=["documents", "metadatas"])
-    extracted_image = result["metadatas"][0][0]["extract_images"]
-    print("Location of Image:", os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, extracted_image))
+    record = get_data_from_db_batch([clothing_item])[0]
     return {
-        "clothing_item_found": result["documents"],
-        "extracted_image": extracted_image,
-        "image": result["metadatas"][0][0]["img"],
-        "main_category": result["metadatas"][0][0]["main_category"],
-        "seller": result["metadatas"][0][0]["seller"],
-        "price": result["metadatas"][0][0]["price"],
-        "discount": result["metadatas"][0][0]["discount"],
+        "clothing_item_found": [[record["document"]]],
+        "extracted_image": record["extract_images"],
+        "image": record["img"],
+        "main_category": record["main_category"],
+        "seller": record["seller"],
+        "price": record["price"],
+        "discount": record["discount"],
     }
 
 
-def search_products_rag(query, num_results=20):
+def search_products_rag(query, num_results=20, filters=None):
     """
-    Search products using RAG with ChromaDB and Gemini LLM, with SQL fallback
+    Search products using RAG with ChromaDB and Gemini LLM, with SQL fallback.
+    ``filters`` (see search_filters.py) are applied inside the vector/SQL query.
     """
+    filters = filters or {}
+    where = filters_to_where(filters)
     try:
         print(f"=== RAG SEARCH WITH GEMINI ===")
         print(f"Original Query: '{query}'")
+        if where:
+            print(f"Filters: {where}")
         
         # First, try Gemini + ChromaDB approach
         try:
@@ -79,8 +135,8 @@ def search_products_rag(query, num_results=20):
             
             # Try ChromaDB search first
             chroma_results = []
-            if collection.count() > 0:
-                print(f"ChromaDB has {collection.count()} items, searching...")
+            if search_collection.count() > 0:
+                print(f"Vector search ({search_collection.backend_name}) over {search_collection.count()} items, searching...")
                 
                 # Search ChromaDB with multiple terms
                 all_results = []
@@ -88,9 +144,10 @@ def search_products_rag(query, num_results=20):
                 
                 for term in search_terms[:5]:  # Limit to first 5 terms
                     try:
-                        result = collection.query(
+                        result = search_collection.query(
                             query_texts=[term],
                             n_results=min(10, num_results),
+                            where=where,
                             include=["documents", "metadatas", "distances"]
                         )
                         
@@ -134,76 +191,61 @@ def search_products_rag(query, num_results=20):
         
         # Fallback to direct SQL search
         print("=== FALLING BACK TO SQL SEARCH ===")
-        return sql_fallback_search(query, num_results)
+        return sql_fallback_search(query, num_results, filters)
         
     except Exception as e:
         print(f"Error in RAG search: {e}")
         import traceback
         traceback.print_exc()
-        return sql_fallback_search(query, num_results)
+        return sql_fallback_search(query, num_results, filters)
 
 
-def sql_fallback_search(query, num_results=20):
+def sql_fallback_search(query, num_results=20, filters=None):
     """
-    Fallback SQL search when Gemini/ChromaDB fails
+    Fallback keyword search when Gemini/ChromaDB fails, over the in-memory catalog
     """
     try:
-        # Connect to database
-        import sqlite3
-        
-        # Construct the database path
-        SQLITE_DB_PATH = os.path.join(os.path.dirname(__file__), "myntra.db")
-        
-        conn = sqlite3.connect(SQLITE_DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         print(f"SQL fallback for query: '{query}'")
         
         # Direct keyword matching
         query_lower = query.lower()
-        products = []
+        subcategories, text = None, None
         
         # Search logic based on keywords in query
         if any(term in query_lower for term in ['t-shirt', 'tshirt', 't shirt', 'tee']):
             print("SQL: Searching for T-Shirt items...")
-            cursor.execute("SELECT * FROM products WHERE subcategory = 'T-Shirt' LIMIT ?", (num_results,))
+            subcategories = ['T-Shirt']
         elif 'shirt' in query_lower:
             print("SQL: Searching for Shirt items...")
-            cursor.execute("SELECT * FROM products WHERE subcategory IN ('Shirt', 'T-Shirt') LIMIT ?", (num_results,))
+            subcategories = ['Shirt', 'T-Shirt']
         elif 'dress' in query_lower:
             print("SQL: Searching for Dress items...")
-            cursor.execute("SELECT * FROM products WHERE subcategory = 'Dress' LIMIT ?", (num_results,))
+            subcategories = ['Dress']
         elif any(term in query_lower for term in ['jean', 'jeans']):
             print("SQL: Searching for Jeans items...")
-            cursor.execute("SELECT * FROM products WHERE subcategory = 'Jeans' LIMIT ?", (num_results,))
+            subcategories = ['Jeans']
         elif any(term in query_lower for term in ['pant', 'pants']):
             print("SQL: Searching for Pants items...")
-            cursor.execute("SELECT * FROM products WHERE subcategory = 'Pants' LIMIT ?", (num_results,))
+            subcategories = ['Pants']
         elif 'blazer' in query_lower:
             print("SQL: Searching for Blazer items...")
-            cursor.execute("SELECT * FROM products WHERE subcategory = 'Blazer' LIMIT ?", (num_results,))
+            subcategories = ['Blazer']
         else:
             # Generic search across name and subcategory
             print("SQL: Performing generic search...")
             search_terms = query_lower.split()
             if search_terms:
                 # Search for any term in name or subcategory
-                term = search_terms[0]  # Use first term
-                cursor.execute("SELECT * FROM products WHERE LOWER(name) LIKE ? OR LOWER(subcategory) LIKE ? LIMIT ?", 
-                             (f'%{term}%', f'%{term}%', num_results))
-            else:
-                cursor.execute("SELECT * FROM products LIMIT ?", (num_results,))
+                text = search_terms[0]  # Use first term
         
-        rows = cursor.fetchall()
-        products = [dict(row) for row in rows]
+        # Structured filters narrow the keyword match through the snapshot's category indexes
+        products = catalog.current().search(subcategories=subcategories, text=text, filters=filters, limit=num_results)
         
         print(f"SQL search found {len(products)} products")
         
         if products:
             print(f"Sample SQL results: {[p['name'] + ' (' + p['subcategory'] + ')' for p in products[:3]]}")
         
-        conn.close()
         return products
         
     except Exception as e:
@@ -214,7 +256,7 @@ def sql_fallback_search(query, num_results=20):
 
 
 def get_images_using_llm(query):
-    
+    """Extract clothing items from the query with the LLM and return a product record for each"""
     prompt = f"""
     You are a clothing store helper bot. You have to figure out what clothing items the user wants to wear. The user has said: "{query}". Please output the clothing items that the user wants to wear in the following format:
     "item1, item2, item3, ..."
@@ -225,40 +267,9 @@ def get_images_using_llm(query):
     items = final_response[0].split(", ")
     
     print("LLM extracted these items from the query:", items)
-    # print(response.content)
-    
-    images = []
-    categories = []
-    names = []
-    sellers = []
-    prices = []
-    discounts = []
-    extracted_images = []
     
-    for item in items:
-        result = get_data_from_db(item)
-        images.append(result["image"])
-        names.append(result["clothing_item_found"])
-        sellers.append(result["seller"])
-        prices.append(result["price"])
-        discounts.append(result["discount"])
-        extracted_images.append(result["extracted_image"])
-        
-        category = result["main_category"]
-        
-        if category == "Top Wear":
-            category = "Upper-body"
-        elif category == "Bottom Wear":
-            category = "Lower-body"
-        elif category == "Dress (Full Length)":
-            category = "Dress"
-        else:
-            category = None
-        
-        categories.append(category)
-        
-    # print(images)
-    return extracted_images, images, categories, names, sellers, prices, discounts
+    # One embedding pass and one vector query for all items
+    return get_data_from_db_batch([item.strip() for item in items if item.strip()])
 
 
 def ootdiffusion_model(garment_img, clothing_category, person_img = 'https://levihsu-ootdiffusion.hf.space/file=/tmp/gradio/aa9673ab8fa122b9c5cdccf326e5f6fc244bc89b/model_8.png'):
@@ -305,7 +316,7 @@ def local_image_to_base64(image_path):
         return base64.b64encode(image_file.read()).decode("utf-8")
 
     
-async def segmind_diffusion(cloth_image_url: str = None, model_image_url: str = 'https://levihsu-ootdiffusion.hf.space/file=/tmp/gradio/aa9673ab8fa122b9c5cdccf326e5f6fc244bc89b/model_8.png', cloth_image_path: str = None, model_image_path: str = None, clothing_category: str = None):
+async def segmind_diffusion(cloth_image_url: str = None, model_image_url: str = 'https://levihsu-ootdiffusion.hf.space/file=/tmp/gradio/aa9673ab8fa122b9c5cdccf326e5f6fc244bc89b/model_8.png', cloth_image_path: str = None, model_image_path: str = None, clothing_category: str = None, output_name: str = None):
     api_key = os.getenv("SEGMIND_API_KEY")
     print(f"SEGMIND_API_KEY available: {bool(api_key)}")
     
@@ -363,7 +374,9 @@ async def segmind_diffusion(cloth_image_url: str = None, model_image_url: str =
                 print(f"Received image data size: {len(image_data)} bytes")
                 
                 # Generate unique filename for the try-on result
-                if cloth_image_url:
+                if output_name:
+                    img_path = os.path.join(FITTED_IMAGES_FOLDER, *output_name.split('/'))
+                elif cloth_image_url:
                     base_name = cloth_image_url.split('/')[-1].split('.')[0]
                     img_path = os.path.join(FITTED_IMAGES_FOLDER, f"{base_name}_tryon_result.png")
                 elif cloth_image_path:
@@ -384,7 +397,7 @@ async def segmind_diffusion(cloth_image_url: str = None, model_image_url: str =
                     image_file.write(image_data)
                 
                 # Return relative path for web serving
-                relative_path = f"/fitted_images/{os.path.basename(img_path)}"
+                relative_path = "/fitted_images/" + os.path.relpath(img_path, FITTED_IMAGES_FOLDER).replace(os.sep, '/')
                 print(f"Returning relative path: {relative_path}")
                 return relative_path
             else:
@@ -401,7 +414,7 @@ async def segmind_diffusion(cloth_image_url: str = None, model_image_url: str =
                 return {"error": response.status, "message": error_message}
 
 
-async def viton_model(cloth_image: str = None, cloth_category: str = None, person_image: str = 'https://levihsu-ootdiffusion.hf.space/file=/tmp/gradio/aa9673ab8fa122b9c5cdccf326e5f6fc244bc89b/model_8.png', cloth_image_path: str = None, person_image_path: str = None, model: str = DEFAULT_MODEL):
+async def viton_model(cloth_image: str = None, cloth_category: str = None, person_image: str = 'https://levihsu-ootdiffusion.hf.space/file=/tmp/gradio/aa9673ab8fa122b9c5cdccf326e5f6fc244bc89b/model_8.png', cloth_image_path: str = None, person_image_path: str = None, model: str = DEFAULT_MODEL, output_name: str = None):
     
     # Force use of Segmind model for virtual try-on
     model = "2"
@@ -428,6 +441,6 @@ async def viton_model(cloth_image: str = None, cloth_category: str = None, perso
         print(f"Calling Segmind API with category: {cloth_category}")
         print("Person Image Path:", person_image_path)
         print("Cloth Image Path:", cloth_image_path)
-        result = await segmind_diffusion(cloth_image_url=cloth_image, model_image_url=person_image, clothing_category=cloth_category, cloth_image_path=cloth_image_path, model_image_path=person_image_path)
+        result = await segmind_diffusion(cloth_image_url=cloth_image, model_image_url=person_image, clothing_category=cloth_category, cloth_image_path=cloth_image_path, model_image_path=person_image_path, output_name=output_name)
     
     return result
\ No newline at end of file
@@ -1,100 +1,229 @@
+import numpy as np
 import pandas as pd
+import datetime
 import os
 import sqlite3
+import threading
+import time
+
+from sales_events import SalesEventStore, SALES_DB_PATH
+from catalog_snapshot import catalog
 
 EXTRACTED_CLOTH_IMAGES_FOLDER = os.getenv("EXTRACTED_CLOTH_IMAGES_FOLDER")
+DB_PATH = os.path.join(os.path.dirname(__file__), 'myntra.db')
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), 'fitted_images')
+# How often requests check whether myntra.db changed since the dataset was loaded
+RECOMMENDATION_REFRESH_SECONDS = float(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "30"))
+# How far back the sales rollups feed the seasonal/trend windows (0 = all rollups)
+SALES_HISTORY_DAYS = int(os.getenv("SALES_HISTORY_DAYS", "0"))
+
+categories = ['Top Wear', 'Bottom Wear', 'Western Wear', 'Sports Wear']
+audiences = ['Male', 'Female', 'Unisex']
+
+# Ensure all required columns are present
+required_columns = ['product_id', 'price', 'rating', 'subcategory', 'img', 'name', 'main_category', 'target_audience', 'date', 'quantity', 'extract_images', 'seller', 'discount']
+
+SEASONAL_COLUMNS = ['name', 'product_id', 'price', 'main_category', 'subcategory', 'img', 'extract_images']
+TREND_COLUMNS = ['name', 'product_id', 'price', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']
 
 # Load data from SQLite database instead of CSV to get updated image URLs
 def load_data_from_db():
     # Use absolute path to ensure we find the database
-    db_path = os.path.join(os.path.dirname(__file__), 'myntra.db')
-    if not os.path.exists(db_path):
-        raise FileNotFoundError(f"Database not found at {db_path}")
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT * FROM products", conn)
-    conn.close()
-    return df
+    if not os.path.exists(DB_PATH):
+        raise FileNotFoundError(f"Database not found at {DB_PATH}")
+    # Built from the shared in-memory catalog instead of reading the table again
+    return pd.DataFrame(catalog.refresh().columns)
 
 def filter_available_products(df):
-    """Filter products to only include   those with available image files"""
-    def check_image_exists(extract_images):
-        if pd.isna(extract_images):
-            return False
-        # Use absolute path to fitted_images folder
-        images_dir = os.path.join(os.path.dirname(__file__), 'fitted_images')
-        image_path = os.path.join(images_dir, extract_images)
-        return os.path.exists(image_path)
+    """Filter products to only include those with available image files"""
+    # One directory listing instead of a stat call per product
+    try:
+        with os.scandir(IMAGES_DIR) as entries:
+            available_images = {entry.name for entry in entries}
+    except FileNotFoundError:
+        available_images = set()
     
     # Filter out products without valid image files
-    df_available = df[df['extract_images'].apply(check_image_exists)].copy()
+    df_available = df[df['extract_images'].isin(available_images)].copy()
     
     print(f"Total products in database: {len(df)}")
     print(f"Products with available images: {len(df_available)}")
     
     return df_available
 
-# Load and preprocess the data
-df = load_data_from_db()
-df = filter_available_products(df)  # Only include products with available images
-df.dropna(inplace=True)
+def load_dataset():
+    """Load and preprocess the product data used for ranking"""
+    df = load_data_from_db()
+    df = filter_available_products(df)  # Only include products with available images
+    df.dropna(inplace=True)
 
-# Add missing columns with default values
-import datetime
-if 'date' not in df.columns:
-    df['date'] = datetime.datetime.now()  # Use current date for all products
-if 'rating' not in df.columns:
-    df['rating'] = 4.2  # Default rating
-if 'quantity' not in df.columns:
-    df['quantity'] = 100  # Default quantity
+    # Real sales history: one row per product per day with sales, from the daily rollups.
+    # Products without sales keep a single row with no date, so they stay in the catalog
+    # but fall outside every ranking window
+    store = get_sales_store()
+    if store is not None and store.has_sales():
+        since_day = None
+        if SALES_HISTORY_DAYS > 0:
+            since_day = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=SALES_HISTORY_DAYS)).strftime("%Y-%m-%d")
+        sales = store.daily_sales(since_day)
+        df = df.drop(columns=[col for col in ('date', 'quantity') if col in df.columns]).merge(sales, on='product_id', how='left')
+        df = df.sort_values('date', kind='stable', na_position='first').reset_index(drop=True)
+        print(f"Loaded {len(sales)} daily sales rollups")
 
-# Update the 'extract_images' column
-# df['extract_images'] = df['extract_images'].apply(lambda x: os.path.join(EXTRACTED_CLOTH_IMAGES_FOLDER, x))
+    # Add missing columns with default values
+    if 'date' not in df.columns:
+        df['date'] = datetime.datetime.now()  # Use current date for all products
+    if 'rating' not in df.columns:
+        df['rating'] = 4.2  # Default rating
+    if 'quantity' not in df.columns:
+        df['quantity'] = 100  # Default quantity
 
-# Ensure all required columns are present
-required_columns = ['product_id', 'price', 'rating', 'subcategory', 'img', 'name', 'main_category', 'target_audience', 'date', 'quantity', 'extract_images', 'seller', 'discount']
-missing_columns = [col for col in required_columns if col not in df.columns]
-if missing_columns:
-    raise ValueError(f"Missing columns in the DataFrame: {', '.join(missing_columns)}")
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing columns in the DataFrame: {', '.join(missing_columns)}")
+    return df
 
-categories = ['Top Wear', 'Bottom Wear', 'Western Wear', 'Sports Wear']
-audiences = ['Male', 'Female', 'Unisex']
 
-def get_top_products(main_category, target_audience):
+# (dataset, version, db marker). Replaced as a whole so readers never see a mix;
+# the version is bumped on every swap so the precomputed rankings know to rebuild
+_state = (None, 0, None)
+_state_lock = threading.Lock()
+_load_lock = threading.Lock()
+_checked_at = 0.0
+_reloading = False
 
-    target_year = 2024
+_trending_tables = None
+_trending_version = None
+_product_records = {}
+_product_ids_by_image = {}
+_trending_lock = threading.Lock()
 
-    if main_category not in categories:
-        return {"error": "Invalid main_category"}
-    
-    if target_audience not in audiences:
-        return {"error": "Invalid target_audience"}
-    
-    # Seasonal Top Products
-    df_july_past_years = df[(df['date'].dt.month == 7) & (df['date'].dt.year < target_year)]
-    df_july_past_years_filtered = df_july_past_years[~df_july_past_years['name'].str.contains('Infant', case=False, na=False)]
-    seasonal_top_products = df_july_past_years_filtered.groupby(['main_category', 'target_audience']).apply(
-        lambda x: x.nlargest(10, 'quantity')
-    ).reset_index(drop=True)
+_sales_store = None
+_sales_store_lock = threading.Lock()
+
+
+def get_sales_store():
+    """The shared sales event store, or None if it cannot be opened"""
+    global _sales_store
+    if _sales_store is None:
+        with _sales_store_lock:
+            if _sales_store is None:
+                try:
+                    _sales_store = SalesEventStore()
+                except sqlite3.Error as e:
+                    print(f"Sales event store unavailable: {e}")
+                    return None
+    return _sales_store
+
+
+def _db_marker():
+    """Latest mtime of myntra.db, the sales store and their WALs, a cheap signal that the data changed"""
+    mtimes = []
+    for path in (DB_PATH, DB_PATH + "-wal", SALES_DB_PATH, SALES_DB_PATH + "-wal"):
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            pass
+    return max(mtimes, default=None)
+
+
+def set_dataset(df, marker=None):
+    """Swap in a new dataset, by default treated as current with the database as it is now"""
+    global _state
+    if marker is None:
+        marker = _db_marker()
+    with _state_lock:
+        _state = (df, _state[1] + 1, marker)
+
+
+def _reload_in_background(marker):
+    global _reloading
+    try:
+        set_dataset(load_dataset(), marker)
+        print("Reloaded recommendation dataset after the products or sales changed")
+    except Exception as e:
+        print(f"Reloading recommendation dataset failed, keeping the previous one: {e}")
+    finally:
+        _reloading = False
+
+
+def _dataset_state():
+    global _checked_at, _reloading
+    if _state[0] is None:
+        # First use loads synchronously; concurrent callers wait for the same load
+        with _load_lock:
+            if _state[0] is None:
+                marker = _db_marker()
+                set_dataset(load_dataset(), marker)
+                _checked_at = time.monotonic()
+    elif time.monotonic() - _checked_at >= RECOMMENDATION_REFRESH_SECONDS:
+        with _load_lock:
+            if not _reloading and time.monotonic() - _checked_at >= RECOMMENDATION_REFRESH_SECONDS:
+                _checked_at = time.monotonic()
+                marker = _db_marker()
+                if marker != _state[2]:
+                    # Keep serving the current data while the new copy loads
+                    _reloading = True
+                    threading.Thread(target=_reload_in_background, args=(marker,), daemon=True).start()
+    return _state
 
-    seasonal_top_10 = seasonal_top_products[
-        (seasonal_top_products['main_category'] == main_category) & 
-        (seasonal_top_products['target_audience'] == target_audience)
-    ][['name', 'product_id', 'price', 'main_category', 'subcategory', 'img','extract_images']].to_dict(orient='records')
+
+def get_dataset():
+    """The product dataset, loaded on first use and reloaded in the background when myntra.db or the sales change"""
+    return _dataset_state()[0]
+
+
+def preload_in_background():
+    """Load the dataset and rankings off the startup path"""
+    threading.Thread(target=get_trending_tables, daemon=True).start()
+
+
+def _records_by_combo(frame, columns):
+    """Split a ranked frame into {(main_category, target_audience): records}, keeping row order"""
+    if frame.empty:
+        return {}
+    return {
+        key: group[columns].to_dict(orient='records')
+        for key, group in frame.groupby(['main_category', 'target_audience'], sort=False)
+    }
+
+
+def _by_code(unique_mask, codes):
+    """Expand a per-unique-value mask to rows; code -1 (missing) maps to False"""
+    return np.append(unique_mask.to_numpy(dtype=bool), False)[codes]
+
+
+def compute_trending_tables(df, target_year=2024):
+    """Seasonal and trend rankings for every (main_category, target_audience) pair in one pass"""
+    # Names repeat across sales rows, so match the exclusion patterns once per distinct name
+    name_codes, unique_names = pd.factorize(df['name'])
+    unique_names = pd.Series(unique_names)
+    is_infant = _by_code(unique_names.str.contains('Infant', case=False, na=False), name_codes)
+    is_infant_or_bra = _by_code(unique_names.str.contains('Infant|Bra', case=False, na=False), name_codes)
+    month, year = df['date'].dt.month.to_numpy(), df['date'].dt.year.to_numpy()
+
+    # Seasonal Top Products: top 10 by quantity per pair. A stable sort on quantity followed
+    # by head() keeps nlargest's tie order (earlier rows first) without a per-group apply
+    df_july_past_years_filtered = df[(month == 7) & (year < target_year) & ~is_infant]
+    seasonal_top_products = df_july_past_years_filtered.sort_values(by='quantity', ascending=False, kind='stable').groupby(
+        ['main_category', 'target_audience']
+    ).head(10)
+    # groupby().apply() emitted the groups in key order
+    seasonal_top_products = seasonal_top_products.sort_values(
+        by=['main_category', 'target_audience'], kind='stable'
+    ).reset_index(drop=True)
     
     # Fashion Trend Products
-    df_recent_months = df[(df['date'] >= '2024-05-01') & (df['date'] <= '2024-06-30')]
-    df_recent_months_filtered = df_recent_months[~df_recent_months['name'].str.contains('Infant', case=False, na=False)]
-    df_recent_months_filtered = df_recent_months_filtered[~df_recent_months_filtered['name'].str.contains('Bra', case=False, na=False)]
+    dates = df['date']
+    df_recent_months_filtered = df[~is_infant_or_bra & (dates >= '2024-05-01').to_numpy() & (dates <= '2024-06-30').to_numpy()]
     
     recent_spike_products = df_recent_months_filtered.groupby(['main_category', 'target_audience', 'name']).agg(
         quantity_sum=('quantity', 'sum'),
-        last_month_quantity=('quantity', lambda x: x.iloc[-1]),
-        last_month_date=('date', lambda x: x.iloc[-1])
+        last_month_quantity=('quantity', 'last'),
+        last_month_date=('date', 'last')
     ).reset_index()
 
-    df_july_2023 = df[(df['date'].dt.month == 7) & (df['date'].dt.year == 2023)]
-    df_july_2023_filtered = df_july_2023[~df_july_2023['name'].str.contains('Infant', case=False, na=False)]
-    df_july_2023_filtered = df_july_2023_filtered[~df_july_2023_filtered['name'].str.contains('Bra', case=False, na=False)]
+    df_july_2023_filtered = df[~is_infant_or_bra & (month == 7) & (year == 2023)]
     
     previous_year_products = df_july_2023_filtered.groupby(['main_category', 'target_audience', 'name']).agg(
         quantity_sum_last_year=('quantity', 'sum')
@@ -104,23 +233,94 @@ def get_top_products(main_category, target_audience):
     recent_spike_products['quantity_sum_last_year'] = recent_spike_products['quantity_sum_last_year'].fillna(0)
 
     recent_spike_products['has_spike'] = recent_spike_products['quantity_sum'] > recent_spike_products['quantity_sum_last_year'] * 1.5
-    recent_spike_products['weight'] = recent_spike_products['quantity_sum_last_year'].apply(lambda x: 2 if x == 0 else 1)
+    recent_spike_products['weight'] = np.where(recent_spike_products['quantity_sum_last_year'] == 0, 2, 1)
     recent_spike_products['weighted_spike'] = recent_spike_products['has_spike'] * recent_spike_products['quantity_sum'] * recent_spike_products['weight']
 
     fashion_trend_products = recent_spike_products[recent_spike_products['has_spike']].sort_values(by=['weighted_spike', 'quantity_sum'], ascending=[False, False])
     fashion_top_products = fashion_trend_products.groupby(['main_category', 'target_audience']).head(10).reset_index(drop=True)
 
-    # Merge to include product details
-    fashion_top_products_details = fashion_top_products.merge(df[['name', 'product_id', 'price', 'rating', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']], on=['name', 'main_category'], how='left')
+    # Merge to include product details, only scanning rows for the ranked names
+    details = df[df['name'].isin(fashion_top_products['name'])]
+    fashion_top_products_details = fashion_top_products.merge(details[['name', 'product_id', 'price', 'rating', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']], on=['name', 'main_category'], how='left')
+
+    seasonal = _records_by_combo(seasonal_top_products, SEASONAL_COLUMNS)
+    fashion = _records_by_combo(fashion_top_products_details, TREND_COLUMNS)
+    return {
+        (category, audience): {
+            "seasonal_top_products": seasonal.get((category, audience), []),
+            "fashion_trend_products": fashion.get((category, audience), []),
+        }
+        for category in categories
+        for audience in audiences
+    }
+
+
+def get_trending_tables():
+    """Precomputed rankings, rebuilt only after the dataset changes"""
+    global _trending_tables, _trending_version, _product_records, _product_ids_by_image
+    df, version, _ = _dataset_state()
+    if _trending_tables is None or _trending_version != version:
+        with _trending_lock:
+            if _trending_tables is None or _trending_version != version:
+                _trending_tables = compute_trending_tables(df)
+                _product_records = {
+                    record['product_id']: record
+                    for record in df.drop_duplicates('product_id')[TREND_COLUMNS].to_dict(orient='records')
+                }
+                _product_ids_by_image = {record['extract_images']: product_id for product_id, record in _product_records.items()}
+                _trending_version = version
+                print(f"Computed trending tables for {len(_trending_tables)} category/audience pairs")
+    return _trending_tables
+
+
+def get_live_trending(main_category, target_audience, limit=10):
+    """Products with the highest decayed interaction score right now, from the sales event store"""
+    store = get_sales_store()
+    if store is None:
+        return []
+    try:
+        # Over-fetch a little, some trending products may no longer be available
+        trending = store.trending(main_category, target_audience, limit=limit * 2)
+    except sqlite3.Error as e:
+        print(f"Live trending unavailable: {e}")
+        return []
+    return get_products([item['product_id'] for item in trending])[:limit]
+
+
+def product_id_for_image(extract_image):
+    """Catalog product_id for an extracted cloth image name, or None"""
+    get_trending_tables()
+    return _product_ids_by_image.get(extract_image)
+
+
+def catalog_images(main_category=None):
+    """Extracted image names of catalog products, optionally limited to one category"""
+    get_trending_tables()
+    return {
+        image for image, product_id in _product_ids_by_image.items()
+        if main_category is None or _product_records[product_id]['main_category'] == main_category
+    }
+
+
+def get_products(product_ids, main_category=None):
+    """Catalog records for product ids, in the given order, optionally limited to one category"""
+    get_trending_tables()
+    records = (_product_records.get(product_id) for product_id in product_ids)
+    return [record for record in records if record and (main_category is None or record['main_category'] == main_category)]
+
+
+def get_top_products(main_category, target_audience):
+
+    if main_category not in categories:
+        return {"error": "Invalid main_category"}
+    
+    if target_audience not in audiences:
+        return {"error": "Invalid target_audience"}
     
-    fashion_top_10 = fashion_top_products_details[
-        (fashion_top_products_details['main_category'] == main_category) & 
-        (fashion_top_products_details['target_audience'] == target_audience)
-    ][['name', 'product_id', 'price', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']].to_dict(orient='records')
-
-    result = {
-        "seasonal_top_products": seasonal_top_10,
-        "fashion_trend_products": fashion_top_10
+    tables = get_trending_tables()[(main_category, target_audience)]
+    return {
+        "seasonal_top_products": list(tables["seasonal_top_products"]),
+        "fashion_trend_products": list(tables["fashion_trend_products"]),
+        "trending_products": get_live_trending(main_category, target_audience)
     }
 
-    return result
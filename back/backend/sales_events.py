@@ -0,0 +1,241 @@
+"""
+Append-only sales/interaction event store with incremental rollups.
+
+Every ingest batch is written in one transaction that
+  * appends the raw events to ``sales_events``,
+  * adds them to the per-(product, day, event type) totals in ``sales_daily``,
+  * folds them into each product's trending score in ``trending_scores``.
+
+Trending uses forward exponential decay: an event at time t contributes
+``weight * 2 ** (t / half_life)``. Every score is scaled by the same factor at
+read time, so the stored ``rank_key`` (the log2 of the running sum) never has
+to be decayed or recomputed and can be ordered with an index. Reads therefore
+touch only the rows they return, however many events have been ingested.
+
+The store lives in its own SQLite file so ingesting events does not look like
+a catalog change to the readers of myntra.db.
+"""
+
+import datetime
+import math
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+SALES_DB_PATH = os.getenv("SALES_DB_PATH") or os.path.join(os.path.dirname(__file__), "sales_events.db")
+CATALOG_DB_PATH = os.path.join(os.path.dirname(__file__), "myntra.db")
+TRENDING_HALF_LIFE_DAYS = float(os.getenv("TRENDING_HALF_LIFE_DAYS", "7"))
+
+# How much one unit of each event type counts towards trending
+EVENT_WEIGHTS = {"purchase": 1.0, "add_to_cart": 0.5, "tryon": 0.3, "view": 0.1}
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS sales_events ("
+    "event_id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, event_type TEXT NOT NULL, "
+    "quantity INTEGER NOT NULL, occurred_at REAL NOT NULL, session_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS sales_daily ("
+    "product_id INTEGER NOT NULL, day TEXT NOT NULL, event_type TEXT NOT NULL, "
+    "quantity INTEGER NOT NULL, events INTEGER NOT NULL, PRIMARY KEY (product_id, day, event_type))",
+    "CREATE INDEX IF NOT EXISTS idx_sales_daily_day ON sales_daily (day, event_type)",
+    "CREATE TABLE IF NOT EXISTS trending_scores ("
+    "product_id INTEGER PRIMARY KEY, main_category TEXT, target_audience TEXT, "
+    "rank_key REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_trending_scores_rank ON trending_scores (rank_key DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_trending_scores_pair ON trending_scores (main_category, target_audience, rank_key DESC)",
+]
+
+
+def _chunks(values, size=500):
+    """Split IN (...) parameter lists below SQLite's variable limit"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _log2_add(a, b):
+    """log2(2**a + 2**b) without overflowing"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+def _timestamp(value):
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.datetime.fromisoformat(str(value))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def _day(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+def parse_event(raw):
+    """Validate one event from the API. Raises ValueError on bad input."""
+    if not isinstance(raw, dict) or "product_id" not in raw:
+        raise ValueError("Each event needs a product_id")
+    event_type = raw.get("event_type", "purchase")
+    if event_type not in EVENT_WEIGHTS:
+        raise ValueError(f"Unknown event_type: {event_type}")
+    try:
+        product_id = int(raw["product_id"])
+        quantity = int(raw.get("quantity", 1))
+        occurred_at = _timestamp(raw.get("occurred_at"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid event: {raw}")
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+    return {
+        "product_id": product_id,
+        "event_type": event_type,
+        "quantity": quantity,
+        "occurred_at": occurred_at,
+        "session_id": raw.get("session_id"),
+    }
+
+
+class SalesEventStore:
+    def __init__(self, path=SALES_DB_PATH, catalog_path=CATALOG_DB_PATH, half_life_days=TRENDING_HALF_LIFE_DAYS):
+        self.path = path
+        self.catalog_path = catalog_path
+        self.half_life_seconds = half_life_days * 86400
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _product_pairs(self, product_ids):
+        """(main_category, target_audience) for each product, read from the catalog"""
+        if not product_ids or not os.path.exists(self.catalog_path):
+            return {}
+        rows = []
+        conn = sqlite3.connect(self.catalog_path)
+        try:
+            for ids in _chunks(product_ids):
+                rows += conn.execute(
+                    f"SELECT product_id, main_category, target_audience FROM products WHERE product_id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall()
+        finally:
+            conn.close()
+        return {product_id: (main_category, target_audience) for product_id, main_category, target_audience in rows}
+
+    def record_events(self, events):
+        """Append already-validated events and update rollups and trending scores; returns the count"""
+        if not events:
+            return 0
+
+        daily = {}
+        contributions = {}
+        for event in events:
+            key = (event["product_id"], _day(event["occurred_at"]), event["event_type"])
+            quantity, count = daily.get(key, (0, 0))
+            daily[key] = (quantity + event["quantity"], count + 1)
+
+            weight = EVENT_WEIGHTS[event["event_type"]] * event["quantity"]
+            log_weight = math.log2(weight) + event["occurred_at"] / self.half_life_seconds
+            contributions[event["product_id"]] = _log2_add(contributions.get(event["product_id"]), log_weight)
+
+        pairs = self._product_pairs(contributions)
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front, so concurrent workers cannot interleave
+            # the read-modify-write of rank_key below
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO sales_events (product_id, event_type, quantity, occurred_at, session_id) "
+                "VALUES (:product_id, :event_type, :quantity, :occurred_at, :session_id)",
+                events,
+            )
+            conn.executemany(
+                "INSERT INTO sales_daily (product_id, day, event_type, quantity, events) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (product_id, day, event_type) DO UPDATE SET "
+                "quantity = quantity + excluded.quantity, events = events + excluded.events",
+                [(*key, quantity, count) for key, (quantity, count) in daily.items()],
+            )
+
+            current = {}
+            for ids in _chunks(contributions):
+                current.update(conn.execute(
+                    f"SELECT product_id, rank_key FROM trending_scores WHERE product_id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall())
+            conn.executemany(
+                "INSERT INTO trending_scores (product_id, main_category, target_audience, rank_key, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (product_id) DO UPDATE SET "
+                "rank_key = excluded.rank_key, updated_at = excluded.updated_at, "
+                "main_category = COALESCE(excluded.main_category, main_category), "
+                "target_audience = COALESCE(excluded.target_audience, target_audience)",
+                [
+                    (product_id, *pairs.get(product_id, (None, None)), _log2_add(current.get(product_id), key), now)
+                    for product_id, key in contributions.items()
+                ],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(events)
+
+    def trending(self, main_category=None, target_audience=None, limit=10, now=None):
+        """Top products by decayed interaction score, read straight off the rank index"""
+        conditions, params = [], []
+        if main_category:
+            conditions.append("main_category = ?")
+            params.append(main_category)
+        if target_audience:
+            conditions.append("target_audience = ?")
+            params.append(target_audience)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT product_id, rank_key FROM trending_scores {where} ORDER BY rank_key DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        decay = (now if now is not None else time.time()) / self.half_life_seconds
+        return [{"product_id": product_id, "score": 2.0 ** (rank_key - decay)} for product_id, rank_key in rows]
+
+    def daily_sales(self, since_day=None, event_type="purchase"):
+        """Per-(product, day) totals as a DataFrame with product_id, date and quantity"""
+        conn = self._connect()
+        try:
+            query = "SELECT product_id, day, quantity FROM sales_daily WHERE event_type = ?"
+            params = [event_type]
+            if since_day:
+                query += " AND day >= ?"
+                params.append(since_day)
+            df = pd.read_sql_query(query + " ORDER BY day, product_id", conn, params=params)
+        finally:
+            conn.close()
+        df["date"] = pd.to_datetime(df.pop("day"))
+        return df
+
+    def has_sales(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM sales_daily WHERE event_type = 'purchase' LIMIT 1").fetchone() is not None
+        finally:
+            conn.close()
@@ -0,0 +1,113 @@
+"""
+Structured filters and facet counts for product search.
+
+Filters arrive as a plain dict from the API, e.g.
+``{"category": "Top Wear", "min_price": 500, "max_price": 1500}``, and are
+pushed down into the vector search ``where`` clause and the SQL fallback so
+only matching products are ever fetched.
+"""
+
+from collections import Counter
+
+# API filter name -> product column, and how to compare against it
+FILTER_FIELDS = {
+    "category": ("main_category", "$eq"),
+    "subcategory": ("subcategory", "$eq"),
+    "seller": ("seller", "$eq"),
+    "min_price": ("price", "$gte"),
+    "max_price": ("price", "$lte"),
+    "min_discount": ("discount", "$gte"),
+}
+_SQL_OPERATORS = {"$eq": "=", "$gte": ">=", "$lte": "<=", "$in": "IN"}
+
+FACET_FIELDS = ["main_category", "subcategory", "seller"]
+PRICE_BUCKETS = [(0, 500), (500, 1000), (1000, 2000), (2000, 5000), (5000, None)]
+
+
+def parse_search_filters(raw):
+    """Validate filters from a request body. Raises ValueError on bad input."""
+    if not raw:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+
+    filters = {}
+    for name, value in raw.items():
+        if name not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter: {name}")
+        if value is None or value == "" or value == []:
+            continue
+        column, op = FILTER_FIELDS[name]
+        if op == "$eq":
+            # A list of values means "any of these"
+            if isinstance(value, list):
+                filters[name] = [str(v) for v in value]
+            else:
+                filters[name] = str(value)
+        else:
+            try:
+                filters[name] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number")
+
+    if filters.get("min_price") is not None and filters.get("max_price") is not None and filters["min_price"] > filters["max_price"]:
+        raise ValueError("min_price must not be greater than max_price")
+    return filters
+
+
+def _conditions(filters):
+    for name, value in filters.items():
+        column, op = FILTER_FIELDS[name]
+        if isinstance(value, list):
+            op = "$in"
+        yield column, op, value
+
+
+def filters_to_where(filters):
+    """Chroma-style ``where`` clause for the filters, or None when there are none"""
+    clauses = [{column: {op: value}} for column, op, value in _conditions(filters)]
+    if not clauses:
+        return None
+    # Chroma rejects an $and with a single operand
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def filters_to_sql(filters):
+    """SQL condition (without WHERE) and parameters for the filters"""
+    conditions, params = [], []
+    for column, op, value in _conditions(filters):
+        if op == "$in":
+            conditions.append(f"{column} IN ({','.join('?' * len(value))})")
+            params.extend(value)
+        else:
+            conditions.append(f"{column} {_SQL_OPERATORS[op]} ?")
+            params.append(value)
+    return " AND ".join(conditions), params
+
+
+def price_bucket(price):
+    for low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return f"{low}+" if high is None else f"{low}-{high}"
+    return None
+
+
+def facet_counts(products):
+    """Counts per category, subcategory, seller and price bucket over a result set"""
+    facets = {field: Counter() for field in FACET_FIELDS}
+    prices = Counter()
+    for product in products:
+        for field in FACET_FIELDS:
+            value = product.get(field)
+            if value:
+                facets[field][value] += 1
+        if product.get("price") is not None:
+            prices[price_bucket(float(product["price"]))] += 1
+
+    result = {field: dict(counts.most_common()) for field, counts in facets.items()}
+    result["price"] = {
+        label: prices[label]
+        for label in (price_bucket(low) for low, _ in PRICE_BUCKETS)
+        if prices[label]
+    }
+    return result
@@ -2,6 +2,7 @@ import sqlite3
 import pandas as pd
 import os
 from dotenv import load_dotenv
+from catalog_ingest import ingest_products
 load_dotenv()
 
 # Define the path to your CSV file
@@ -31,16 +32,9 @@ if sqlite_db_dir and not os.path.exists(sqlite_db_dir):
     # Create the required directories
     os.makedirs(sqlite_db_dir)
 
-# Connect to the SQLite database (it will be created if it doesn't exist)
-conn = sqlite3.connect(sqlite_db_path)
-
-# Define the table name
+# Upsert every row by product_id in one transaction; products no longer in the CSV are removed.
+# Unlike replacing the table, readers keep seeing the old catalog until the load commits
 table_name = 'products'
-
-# Store the DataFrame in the SQLite database
-df.to_sql(table_name, conn, if_exists='replace', index=False)
-
-# Close the database connection
-conn.close()
+ingest_products(df.to_dict(orient='records'), sqlite_db_path, replace_missing=True)
 
 print(f"Data from {csv_file_path} has been successfully stored in {sqlite_db_path} in the table '{table_name}'")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test content-hashed asset URLs: hashing, invalidation on change and immutable serving
+"""
+
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from asset_manifest import AssetManifest, HashedStaticFiles, split_hashed_name
+from image_resize import IMMUTABLE_CACHE_CONTROL
+from image_variants import ImageVariants, build_variants
+from test_image_variants import make_garment
+
+
+class BrowserCache:
+    """Honours immutable responses like a browser would: a stored URL is never requested again"""
+
+    def __init__(self, client):
+        self.client = client
+        self.stored = {}
+        self.requests = 0
+
+    def get(self, url):
+        if url in self.stored:
+            return self.stored[url]
+        self.requests += 1
+        response = self.client.get(url)
+        assert response.status_code == 200
+        if "immutable" in response.headers.get("cache-control", ""):
+            self.stored[url] = response.content
+        return response.content
+
+
+def test_hashed_urls():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "fitted_images")
+        os.makedirs(os.path.join(folder, "tryon_cache"))
+        for product_id in range(1, 4):
+            make_garment(os.path.join(folder, f"{product_id}_extracted.png"), size=(200, 300))
+        make_garment(os.path.join(folder, "tryon_cache", "abc.png"), size=(200, 300))
+        manifest_path = os.path.join(tmp, "asset_manifest.json")
+
+        assets = AssetManifest(folder, manifest_path, check_seconds=3600)
+        assets.build()
+        url = assets.url("/fitted_images/1_extracted.png")
+        assert url.startswith("/assets/1_extracted.") and url.endswith(".png")
+        assert split_hashed_name(url[len("/assets/"):]) == ("1_extracted.png", url.split(".")[1])
+        # Bare names and subfolders work; what is not an asset is left alone
+        assert assets.url("1_extracted.png") == url
+        assert assets.url("/fitted_images/tryon_cache/abc.png").startswith("/assets/tryon_cache/abc.")
+        assert assets.url("/fitted_images/missing.png") == "/fitted_images/missing.png"
+        assert assets.url("https://cdn.example.com/x.png") == "https://cdn.example.com/x.png"
+        assert assets.url("/fitted_images/../asset_manifest.json") == "/fitted_images/../asset_manifest.json"
+        # Same bytes, same hash: only the name differs
+        assert url.split(".")[1] == assets.url("2_extracted.png").split(".")[1]
+
+        app = FastAPI()
+        app.mount("/assets", HashedStaticFiles(assets), name="assets")
+        client = TestClient(app)
+        response = client.get(url)
+        assert response.status_code == 200 and response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+        browser = BrowserCache(client)
+        urls = [assets.url(f"{product_id}_extracted.png") for product_id in range(1, 4)]
+        for _ in range(5):
+            for page_url in urls:
+                browser.get(page_url)
+        assert browser.requests == len(urls)
+        print(f"✅ 5 visits to {len(urls)} images: {browser.requests} image requests")
+
+        # New bytes, new URL; the old URL stops resolving instead of serving different bytes
+        version = assets.version
+        time.sleep(0.01)
+        make_garment(os.path.join(folder, "1_extracted.png"), size=(200, 300), color=(20, 20, 200))
+        new_url = assets.url("1_extracted.png")
+        assert new_url != url and assets.version != version
+        assert client.get(new_url).status_code == 200 and client.get(url).status_code == 404
+        assert client.get("/assets/1_extracted.png").status_code == 404
+
+        # The manifest survives a restart and unchanged files are not hashed again
+        assets.build()
+        reopened = AssetManifest(folder, manifest_path, check_seconds=3600)
+        assert reopened._entries == assets._entries
+        os.remove(os.path.join(folder, "3_extracted.png"))
+        reopened.build()
+        assert "3_extracted.png" not in reopened._entries
+    print("✅ Hashes follow content, outdated URLs 404, manifest persists")
+
+
+def test_variant_urls_are_hashed():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "fitted_images")
+        os.makedirs(folder)
+        make_garment(os.path.join(folder, "1_extracted.png"))
+        build_variants(folder, os.path.join(folder, "variants"), (160, 320))
+        assets = AssetManifest(folder, os.path.join(tmp, "asset_manifest.json"), check_seconds=3600)
+        variants = ImageVariants(folder, os.path.join(folder, "variants"), refresh_seconds=3600, url_for=assets.url)
+        variants.load()
+        urls = variants.get("1_extracted.png")
+        assert urls["src"].startswith("/assets/variants/320/1_extracted.") and urls["src"].endswith(".jpg")
+        assert all(candidate.startswith("/assets/") for candidate in urls["webp"].split(", "))
+        assert variants.best_url("1_extracted.png", 100, "webp").startswith("/assets/variants/160/1_extracted.")
+    print("✅ Variant srcsets use hashed URLs")
+
+
+if __name__ == "__main__":
+    test_hashed_urls()
+    test_variant_urls_are_hashed()
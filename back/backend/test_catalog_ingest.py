@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test bulk catalog ingestion: upserts, snapshot replacement, indexes and readers during a load
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from catalog_ingest import ingest_products
+
+CATEGORIES = [("Top Wear", "T-Shirt"), ("Bottom Wear", "Jeans"), ("Western Wear", "Dress")]
+
+
+def make_rows(count, start=1, price=1000):
+    for product_id in range(start, start + count):
+        main_category, subcategory = CATEGORIES[product_id % len(CATEGORIES)]
+        yield {
+            "product_id": product_id, "name": f"{subcategory} {product_id}", "img": f"/fitted_images/{product_id}_extracted.png",
+            "subcategory": subcategory, "main_category": main_category, "seller": "FashionStore", "price": price,
+            "discount": product_id % 70, "target_audience": "Unisex", "extract_images": f"{product_id}_extracted.png",
+        }
+
+
+def test_upsert_and_replace():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        assert ingest_products(make_rows(100), db_path) == 100
+        # Re-ingesting overlapping ids updates in place instead of duplicating
+        ingest_products(make_rows(50, start=51, price=1500), db_path)
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 100
+        assert conn.execute("SELECT price FROM products WHERE product_id = 75").fetchone()[0] == 1500
+        assert conn.execute("SELECT price FROM products WHERE product_id = 10").fetchone()[0] == 1000
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(products)")}
+        assert {"idx_products_subcategory", "idx_products_main_category", "idx_products_target_audience"} <= indexes
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM products WHERE subcategory = 'Jeans'"))
+        assert "idx_products_subcategory" in plan, plan
+        conn.close()
+
+        # A full snapshot drops products that are no longer listed, and extra columns are kept
+        ingest_products(({**row, "rating": 4.5} for row in make_rows(30)), db_path, replace_missing=True)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*), MIN(rating), MAX(product_id) FROM products").fetchone() == (30, 4.5, 30)
+        conn.close()
+    print("✅ Upserts, snapshot replacement and post-load indexes")
+
+
+def test_readers_during_large_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(1000), db_path)
+
+        counts, stop = [], threading.Event()
+
+        def reader():
+            conn = sqlite3.connect(db_path, timeout=1)
+            while not stop.is_set():
+                counts.append(conn.execute("SELECT COUNT(*) FROM products").fetchone()[0])
+                time.sleep(0.005)
+            conn.close()
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        start = time.perf_counter()
+        total = 500_000
+        ingest_products(make_rows(total), db_path, replace_missing=True)
+        seconds = time.perf_counter() - start
+        stop.set()
+        thread.join()
+
+        # The reader never blocked or saw a half-loaded catalog: only the old or the new count
+        assert set(counts) <= {1000, total}, set(counts)
+        assert counts and counts[0] == 1000
+        print(f"✅ {total} rows in {seconds:.1f}s ({total / seconds:,.0f} rows/s), {len(counts)} reads during the load")
+
+
+if __name__ == "__main__":
+    test_upsert_and_replace()
+    test_readers_during_large_load()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory catalog snapshot: same pages and search results as SQL, and swaps after writes
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from catalog_ingest import ingest_products
+from catalog_snapshot import CatalogStore, load_snapshot
+from product_listing import list_products
+from search_filters import filters_to_sql
+
+SUBCATEGORIES = ["T-Shirt", " jeans ", "Dress", "Jeans", "Shirt"]
+MAIN_CATEGORIES = ["Top Wear", "Bottom Wear", "Western Wear"]
+
+
+def make_rows(count, price_offset=0):
+    for product_id in range(1, count + 1):
+        yield {
+            "product_id": product_id * 3, "name": f"Casual {SUBCATEGORIES[product_id % 5].strip()} {product_id}",
+            "img": f"/fitted_images/{product_id}.png", "subcategory": SUBCATEGORIES[product_id % 5],
+            "main_category": MAIN_CATEGORIES[product_id % 3], "seller": ["FashionStore", "StyleHub"][product_id % 2],
+            "price": 300 + (product_id * 37) % 3000 + price_offset, "discount": None if product_id % 11 == 0 else product_id % 50,
+            "target_audience": "Unisex", "extract_images": None if product_id % 10 == 0 else f"{product_id}_extracted.png",
+        }
+
+
+def test_matches_sql():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(500), db_path)
+        snapshot = load_snapshot(db_path)
+        conn = sqlite3.connect(db_path)
+
+        for category in [None, "jeans", "DRESS ", "Coat"]:
+            for fields in [None, ["product_id", "price", "discount"]]:
+                cursor = None
+                for _ in range(20):
+                    expected = list_products(conn, category, fields, cursor, 25)
+                    page = snapshot.list_products(category, fields, cursor, 25)
+                    assert page == expected, (category, cursor)
+                    cursor = page["next_cursor"]
+                    if cursor is None:
+                        break
+        # Cursors that are not product ids still continue after them
+        assert snapshot.list_products(None, None, 100, 5) == list_products(conn, None, None, 100, 5)
+        assert snapshot.list_products()["items"] == list_products(conn, limit=None)["items"]
+
+        conn.row_factory = sqlite3.Row
+        for subcategories, filters in [
+            (["Jeans"], {}),
+            (["Shirt", "T-Shirt"], {"category": "Top Wear"}),
+            (None, {"seller": ["StyleHub"], "min_price": 1000, "max_price": 2500, "min_discount": 20}),
+        ]:
+            condition = f"subcategory IN ({','.join('?' * len(subcategories))})" if subcategories else "1 = 1"
+            filter_condition, params = filters_to_sql(filters)
+            if filter_condition:
+                condition += f" AND {filter_condition}"
+            rows = conn.execute(f"SELECT * FROM products WHERE {condition} ORDER BY product_id",
+                                (*(subcategories or []), *params)).fetchall()
+            expected = [{key: row[key] for key in snapshot.fields} for row in rows]
+            assert snapshot.search(subcategories, filters=filters) == expected, (subcategories, filters)
+        casual = snapshot.search(text="JEANS", limit=7)
+        assert len(casual) == 7 and all("jeans" in product["name"].lower() for product in casual)
+        conn.close()
+
+        assert snapshot.get(30)["name"] == "Casual T-Shirt 10" and snapshot.get(31) is None
+        start = time.perf_counter()
+        for _ in range(1000):
+            snapshot.list_products("jeans", ["product_id", "name", "price", "img"], 150, 60)
+        print(f"✅ Snapshot pages and search match SQL ({(time.perf_counter() - start) * 1000:.0f} µs per 60-item page)")
+
+
+def test_swaps_after_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(100), db_path)
+        store = CatalogStore(db_path, check_seconds=0)
+        first = store.current()
+        assert store.current() is first
+
+        ingest_products(make_rows(120, price_offset=1), db_path)
+        # The old snapshot keeps serving while the new one loads in the background
+        assert store.current() is first
+        deadline = time.monotonic() + 10
+        while store.current() is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+        second = store.current()
+        assert second is not first and len(second) == 120 and len(first) == 100
+        assert second.get(3)["price"] == first.get(3)["price"] + 1
+
+        # A single-row update from another connection is picked up too
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE products SET name = 'Renamed' WHERE product_id = 3")
+        conn.commit()
+        conn.close()
+        assert store.refresh().get(3)["name"] == "Renamed"
+        store.close()
+    print("✅ Snapshot swapped atomically after the catalog changed")
+
+
+if __name__ == "__main__":
+    test_matches_sql()
+    test_swaps_after_writes()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the complement graph: session pairing, window expiry and lookup latency
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from complements import ComplementIndex
+
+NOW = 1_720_000_000.0
+
+
+def test_sessions_build_pairs():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ComplementIndex(os.path.join(tmp, "complements.db"), window_seconds=3600)
+
+        # Two sessions pair shirt 1 with jeans 10, one pairs it with jeans 11
+        for session in ("a", "b"):
+            index.record(session, 1, seen_at=NOW)
+            index.record(session, 10, seen_at=NOW + 60)
+        index.record("c", 1, seen_at=NOW)
+        index.record("c", 11, seen_at=NOW + 60)
+        assert index.top_complements(1) == [(10, 2.0), (11, 1.0)]
+        assert index.top_complements(10) == [(1, 2.0)], "Pairs are symmetric"
+
+        # A purchase counts more than a try-on
+        index.record("d", 1, seen_at=NOW)
+        index.record("d", 11, "purchase", seen_at=NOW + 60)
+        assert index.top_complements(1) == [(11, 4.0), (10, 2.0)]
+
+        # Items outside the session window do not pair
+        index.record("e", 2, seen_at=NOW)
+        index.record("e", 20, seen_at=NOW + 7200)
+        assert index.top_complements(2) == []
+        assert index.top_complements(999) == []
+        print("✅ Sessions build weighted, symmetric, windowed pairs")
+
+
+def test_lookup_latency():
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ComplementIndex(os.path.join(tmp, "complements.db"), session_items=10)
+        for session in range(3000):
+            for step in range(rng.randint(2, 6)):
+                index.record(f"s{session}", rng.randrange(1000), seen_at=NOW + session * 10 + step)
+
+        products = [rng.randrange(1000) for _ in range(2000)]
+        index.top_complements(products[0])
+        start = time.perf_counter()
+        for product_id in products:
+            top = index.top_complements(product_id, k=10)
+        per_lookup_ms = (time.perf_counter() - start) * 1000 / len(products)
+        assert [weight for _, weight in top] == sorted((weight for _, weight in top), reverse=True)
+        print(f"✅ Top-10 complement lookup: {per_lookup_ms:.3f} ms")
+        assert per_lookup_ms < 1.0, "Complement lookups should be sub-millisecond"
+
+
+if __name__ == "__main__":
+    test_sessions_build_pairs()
+    test_lookup_latency()
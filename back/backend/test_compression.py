@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test response compression: thresholds, streamed NDJSON, ETag suffixes and revalidation
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from catalog_ingest import ingest_products
+from compression import CompressionMiddleware, brotli, choose_encoding
+from http_cache import etag_matches, is_fresh, json_response, not_modified
+from product_listing import iter_product_chunks, parse_fields
+
+ETAG = '"catalog-v1"'
+
+
+def make_rows(count):
+    for product_id in range(1, count + 1):
+        yield {
+            "product_id": product_id, "name": f"Product {product_id}", "img": f"/fitted_images/{product_id}.png",
+            "subcategory": "Dress", "main_category": "Western Wear", "seller": "FashionStore", "price": 999.0,
+            "discount": 10.0, "target_audience": "Female", "extract_images": f"{product_id}_extracted.png",
+        }
+
+
+def make_app(db_path):
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    products = list(make_rows(500))
+
+    @app.get("/catalog")
+    def catalog(request: Request):
+        headers = {"ETag": ETAG}
+        if is_fresh(request, ETAG):
+            return not_modified(headers)
+        return json_response(products, headers)
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + bytes(4096), media_type="image/png")
+
+    @app.get("/export")
+    def export():
+        fields = parse_fields(None)
+
+        def lines():
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            try:
+                for rows in iter_product_chunks(conn, fields=fields, chunk_size=100):
+                    yield b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+            finally:
+                conn.close()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def test_compression():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(1000), db_path)
+        client = TestClient(make_app(db_path))
+
+        plain = client.get("/catalog", headers={"Accept-Encoding": "identity"})
+        gzipped = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in plain.headers and plain.headers["etag"] == ETAG
+        assert gzipped.headers["content-encoding"] == "gzip" and gzipped.headers["etag"] == '"catalog-v1-gzip"'
+        assert "accept-encoding" in gzipped.headers["vary"].lower()
+        assert gzipped.json() == plain.json()
+        assert gzipped.num_bytes_downloaded * 5 < plain.num_bytes_downloaded
+        print(f"✅ Catalog JSON: {plain.num_bytes_downloaded:,} bytes plain, {gzipped.num_bytes_downloaded:,} gzipped")
+
+        # Revalidating with the compressed representation's ETag still matches
+        assert etag_matches(gzipped.headers["etag"], ETAG)
+        revalidated = client.get("/catalog", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+
+        # Small bodies, images and refused encodings are left alone
+        assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+        assert choose_encoding("gzip;q=0, deflate") is None and choose_encoding("GZIP") == "gzip"
+        if brotli is not None:
+            assert choose_encoding("gzip, br") == "br"
+            br = client.get("/catalog", headers={"Accept-Encoding": "br"})
+            assert br.headers["content-encoding"] == "br" and br.json() == plain.json()
+            print(f"✅ Brotli: {br.num_bytes_downloaded:,} bytes")
+        else:
+            assert choose_encoding("gzip, br") == "gzip"
+            print("⚠️ brotli not installed, gzip only")
+
+        # The export streams every row, compressed chunk by chunk
+        with client.stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip" and "content-length" not in response.headers
+            lines = b"".join(response.iter_bytes()).splitlines()
+        rows = [orjson.loads(line) for line in lines]
+        assert [row["product_id"] for row in rows] == list(range(1, 1001))
+        assert rows[0]["name"] == "Product 1"
+    print("✅ Streamed NDJSON export decompresses to every product")
+
+
+if __name__ == "__main__":
+    test_compression()
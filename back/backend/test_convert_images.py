@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test image normalization: conversion, skipping done files, resuming and parallel runs
+"""
+
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from convert_images import convert_images_to_png, load_manifest, save_manifest
+from test_image_variants import make_garment
+
+
+def mtimes(folder):
+    return {name: os.stat(os.path.join(folder, name)).st_mtime_ns for name in os.listdir(folder)}
+
+
+def test_convert_and_skip():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder, manifest_path = os.path.join(tmp, "fitted_images"), os.path.join(tmp, "convert_manifest.json")
+        os.makedirs(folder)
+        make_garment(os.path.join(folder, "1_extracted.png"), alpha=True)
+        make_garment(os.path.join(folder, "2_extracted.png"), size=(300, 400))
+        Image.new("RGB", (1000, 500), (30, 60, 90)).save(os.path.join(folder, "3_extracted.png"), "JPEG")
+        Image.new("RGB", (10, 10)).save(os.path.join(folder, "notes.jpg"))
+        # Left behind by a killed run
+        open(os.path.join(folder, "4_extracted.png.123.tmp"), "wb").close()
+
+        counts = convert_images_to_png(folder, manifest_path)
+        assert counts["converted"] == 2 and counts["normalized"] == 1 and counts["errors"] == 0
+        with Image.open(os.path.join(folder, "1_extracted.png")) as image:
+            assert image.format == "PNG" and image.mode == "RGB" and image.size == (450, 800)
+            assert image.getpixel((0, 0)) == (255, 255, 255)
+        with Image.open(os.path.join(folder, "3_extracted.png")) as image:
+            assert image.format == "PNG" and image.size == (800, 400)
+        assert sorted(load_manifest(manifest_path)) == ["1_extracted.png", "2_extracted.png", "3_extracted.png"]
+        assert not [name for name in os.listdir(folder) if name.endswith(".tmp")]
+
+        # Second run opens nothing and writes nothing
+        before = mtimes(folder)
+        counts = convert_images_to_png(folder, manifest_path)
+        assert counts["skipped"] == 3 and counts["converted"] == counts["normalized"] == 0
+        assert mtimes(folder) == before
+        print("✅ Images normalized once; a second run skips them all")
+
+        # Touched only: the hash shows nothing changed. New bytes: converted again
+        time.sleep(0.01)
+        os.utime(os.path.join(folder, "1_extracted.png"))
+        make_garment(os.path.join(folder, "2_extracted.png"), size=(900, 900), alpha=True)
+        os.remove(os.path.join(folder, "3_extracted.png"))
+        counts = convert_images_to_png(folder, manifest_path)
+        assert counts["unchanged"] == 1 and counts["converted"] == 1 and counts["skipped"] == 0
+        assert sorted(load_manifest(manifest_path)) == ["1_extracted.png", "2_extracted.png"]
+        assert convert_images_to_png(folder, manifest_path)["skipped"] == 2
+    print("✅ Touched files are recognised by hash, changed files reconverted, deleted ones forgotten")
+
+
+def test_parallel_and_resumed_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder, manifest_path = os.path.join(tmp, "fitted_images"), os.path.join(tmp, "convert_manifest.json")
+        os.makedirs(folder)
+        for image_id in range(1, 41):
+            make_garment(os.path.join(folder, f"{image_id}_extracted.png"), size=(400, 900),
+                         color=(image_id * 5, 40, 200), alpha=image_id % 2 == 0)
+        Image.new("RGB", (10, 10)).save(os.path.join(folder, "broken.png"), "PNG")
+        with open(os.path.join(folder, "broken.png"), "r+b") as f:
+            f.truncate(20)
+
+        counts = convert_images_to_png(folder, manifest_path, workers=2)
+        assert counts["converted"] == 40 and counts["errors"] == 1
+
+        # Killed before the last manifest save: files converted since are only checked, not re-encoded
+        manifest = load_manifest(manifest_path)
+        save_manifest(dict(sorted(manifest.items())[:25]), manifest_path)
+        before = mtimes(folder)
+        counts = convert_images_to_png(folder, manifest_path, workers=2)
+        assert counts["skipped"] == 25 and counts["normalized"] == 15 and counts["converted"] == 0
+        assert mtimes(folder) == before
+        for image_id in range(1, 41):
+            with Image.open(os.path.join(folder, f"{image_id}_extracted.png")) as image:
+                assert image.mode == "RGB" and image.size == (356, 800)
+        assert not [name for name in os.listdir(folder) if name.endswith(".tmp")]
+    print("✅ Parallel run converts 40 images; an interrupted run resumes without re-encoding")
+
+
+if __name__ == "__main__":
+    test_convert_and_skip()
+    test_parallel_and_resumed_runs()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the pooled read-only catalog connections
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+
+from db import ReadPool
+
+
+def make_db(tmp):
+    db_path = os.path.join(tmp, "catalog.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE products (product_id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO products VALUES (?, ?)", [(i, f"Product {i}") for i in range(1, 101)])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_connections_are_read_only_and_reused():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = make_db(tmp)
+        pool = ReadPool(db_path, size=2)
+
+        conn = pool.connection()
+        assert pool.connection() is conn
+        assert pool.fetch_one("SELECT name FROM products WHERE product_id = ?", (7,)) == {"name": "Product 7"}
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == pool.mmap_bytes
+        try:
+            conn.execute("DELETE FROM products")
+            raise AssertionError("the catalog connection must not write")
+        except sqlite3.OperationalError:
+            pass
+
+        # Other threads get their own connection
+        others = []
+        thread = threading.Thread(target=lambda: others.append(pool.connection()))
+        thread.start()
+        thread.join()
+        assert others[0] is not conn
+
+        # Writers commit while readers hold connections, and readers see the new data
+        writer = sqlite3.connect(db_path)
+        writer.execute("UPDATE products SET name = 'Renamed' WHERE product_id = 7")
+        writer.commit()
+        writer.close()
+        assert pool.fetch_one("SELECT name FROM products WHERE product_id = 7")["name"] == "Renamed"
+
+        pool.reset()
+        assert pool.connection() is not conn
+        pool.close()
+    print("✅ Per-thread read-only connections with WAL and mmap")
+
+
+def test_run_off_the_event_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ReadPool(make_db(tmp), size=3)
+
+        def lookup(conn, product_id):
+            return threading.current_thread().name, conn.execute(
+                "SELECT name FROM products WHERE product_id = ?", (product_id,)).fetchone()[0]
+
+        async def main():
+            loop_thread = threading.current_thread().name
+            results = await asyncio.gather(*(pool.run(lookup, i) for i in range(1, 51)))
+            assert [name for _, name in results] == [f"Product {i}" for i in range(1, 51)]
+            threads = {thread for thread, _ in results}
+            assert loop_thread not in threads and len(threads) <= 3, threads
+            assert await pool.fetch_all_async("SELECT COUNT(*) AS total FROM products") == [{"total": 100}]
+
+        asyncio.run(main())
+        # One connection per worker thread, however many requests ran
+        assert len(pool._connections) <= 3
+        pool.close()
+    print("✅ Queries run on a bounded pool of worker threads")
+
+
+if __name__ == "__main__":
+    test_connections_are_read_only_and_reused()
+    test_run_off_the_event_loop()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Parity test: the int8 ONNX gte-base must stay close to the fp32
+sentence-transformers model it was exported from.
+
+Requires the exported model (python embedding_backend.py).
+"""
+
+import numpy as np
+
+from embedding_backend import OnnxEmbeddingFunction, create_embedding_function
+
+TERMS = [
+    "red dress",
+    "party dress",
+    "t-shirt",
+    "black slim fit jeans",
+    "formal white shirt for office",
+    "oversized hoodie",
+    "denim jacket",
+    "floral summer skirt",
+    "navy blue blazer",
+    "sports jacket for running",
+    "Blazer 12 Blazer Top Wear FashionStore color style fashion clothing",
+    "I want something warm for winter",
+]
+
+MIN_COSINE = 0.98
+MEAN_COSINE = 0.99
+
+
+def cosine_similarities(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_onnx_int8_parity():
+    reference = create_embedding_function("sentence-transformers")(TERMS)
+
+    for label, quantized in (("fp32 ONNX", False), ("int8 ONNX", True)):
+        similarities = cosine_similarities(reference, OnnxEmbeddingFunction(quantized=quantized)(TERMS))
+        print(f"{label}: mean cosine {similarities.mean():.5f}, min {similarities.min():.5f}")
+        for term, similarity in zip(TERMS, similarities):
+            assert similarity >= MIN_COSINE, f"{label} drifted on '{term}': cosine {similarity:.5f}"
+        assert similarities.mean() >= MEAN_COSINE, f"{label} mean cosine {similarities.mean():.5f} < {MEAN_COSINE}"
+
+    print("✅ ONNX embeddings match sentence-transformers")
+
+
+if __name__ == "__main__":
+    test_onnx_int8_parity()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the query embedding cache: key normalization, LRU eviction, disk
+persistence and the hit/miss accounting reported by stats()
+"""
+
+import os
+import tempfile
+
+from embedding_cache import CachedEmbeddingFunction
+
+
+class StubEncoder:
+    """Deterministic fake encoder that records every batch it is asked to encode"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(sum(map(ord, text)) % 97)] for text in texts]
+
+
+def test_normalized_keys_are_encoded_once():
+    encoder = StubEncoder()
+    cache = CachedEmbeddingFunction(encoder, namespace="test", cache_path=None)
+
+    vectors = cache(["T-Shirt", "  t-shirt ", "party   dress"])
+    assert encoder.calls == [["t-shirt", "party dress"]]
+    assert vectors[0] == vectors[1]
+
+    stats = cache.stats()
+    # Two distinct terms were encoded; the repeated "t-shirt" is served from that encode
+    assert (stats["misses"], stats["hits"], stats["encode_calls"]) == (2, 1, 1)
+
+    cache(["PARTY DRESS"])
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"]) == (2, 2)
+    assert stats["hit_rate"] == 0.5
+    print("✅ Normalized keys deduplicated and counted")
+
+
+def test_lru_eviction():
+    encoder = StubEncoder()
+    cache = CachedEmbeddingFunction(encoder, namespace="test", max_entries=2, cache_path=None)
+
+    cache(["jeans"])
+    cache(["dress"])
+    cache(["jeans"])  # refresh "jeans" so "dress" is the oldest entry
+    cache(["blazer"])
+    assert cache.stats()["entries"] == 2
+
+    encoder.calls.clear()
+    cache(["jeans", "dress"])
+    assert encoder.calls == [["dress"]], "Least recently used entry should have been evicted"
+    print("✅ LRU evicts the least recently used term")
+
+
+def test_disk_round_trip_and_pruning():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "embedding_cache.db")
+        encoder = StubEncoder()
+        cache = CachedEmbeddingFunction(encoder, namespace="test", cache_path=path, max_disk_entries=3)
+        expected = cache(["hoodie", "skirt"])
+
+        # A fresh process reads the vectors back without encoding
+        restarted_encoder = StubEncoder()
+        restarted = CachedEmbeddingFunction(restarted_encoder, namespace="test", cache_path=path, max_disk_entries=3)
+        assert restarted(["Hoodie", "skirt"]) == expected
+        assert restarted_encoder.calls == []
+        stats = restarted.stats()
+        assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (2, 2, 0)
+
+        # Other namespaces never see these rows
+        other_encoder = StubEncoder()
+        CachedEmbeddingFunction(other_encoder, namespace="other", cache_path=path)(["hoodie"])
+        assert other_encoder.calls == [["hoodie"]]
+
+        restarted(["coat", "polo", "shorts"])
+        restarted._prune_disk()
+        restarted._db.commit()
+        rows = restarted._db.execute("SELECT COUNT(*) FROM embedding_cache WHERE namespace = 'test'").fetchone()[0]
+        assert rows == 3, f"Disk cache should be pruned to 3 rows, found {rows}"
+        print("✅ Disk cache round-trips and stays bounded")
+
+
+if __name__ == "__main__":
+    test_normalized_keys_are_encoded_once()
+    test_lru_eviction()
+    test_disk_round_trip_and_pruning()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test ETag / Last-Modified revalidation for catalog responses and the bytes saved across page loads
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from catalog_ingest import ingest_products
+from catalog_snapshot import CatalogStore, category_key
+from http_cache import (ResponseCache, etag_matches, is_fresh, json_response, make_etag, not_modified,
+                        validator_headers)
+
+
+def make_rows(count):
+    for product_id in range(1, count + 1):
+        yield {
+            "product_id": product_id, "name": f"Product {product_id}", "img": f"/fitted_images/{product_id}.png",
+            "subcategory": ["Dress", "Jeans"][product_id % 2], "main_category": "Top Wear", "seller": "FashionStore",
+            "price": 999.0, "discount": 10.0, "target_audience": "Unisex", "extract_images": f"{product_id}_extracted.png",
+        }
+
+
+def make_app(store):
+    """The /get_myntra_data validator flow from app.py over a test catalog"""
+    app = FastAPI()
+
+    @app.get("/get_myntra_data")
+    def get_myntra_data(request: Request, category: str = None):
+        snapshot = store.current()
+        etag = make_etag(snapshot.version, {"category": category_key(category)})
+        headers = validator_headers(etag, 60, snapshot.version[2])
+        if is_fresh(request, etag, snapshot.version[2]):
+            return not_modified(headers)
+        return json_response(snapshot.list_products(category)["items"], headers)
+
+    return app
+
+
+class BrowserCache:
+    """Keeps the last body and validators per URL and revalidates like a browser whose max-age ran out"""
+
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}
+        self.bytes = 0
+
+    def get(self, url):
+        headers = {}
+        if url in self.entries:
+            headers["If-None-Match"] = self.entries[url][0]
+        response = self.client.get(url, headers=headers)
+        self.bytes += len(response.content)
+        if response.status_code == 304:
+            assert response.content == b""
+            return response, self.entries[url][1]
+        assert response.status_code == 200
+        self.entries[url] = (response.headers["etag"], response.json())
+        return response, response.json()
+
+
+def test_repeated_page_loads():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(2000), db_path)
+        store = CatalogStore(db_path, check_seconds=0)
+        client = TestClient(make_app(store))
+
+        urls = ["/get_myntra_data", "/get_myntra_data?category=Dress"]
+        uncached = sum(len(client.get(url).content) for url in urls)
+        browser = BrowserCache(client)
+        loads = 20
+        statuses = []
+        for _ in range(loads):
+            for url in urls:
+                response, body = browser.get(url)
+                statuses.append(response.status_code)
+        assert statuses.count(200) == len(urls) and statuses.count(304) == len(statuses) - len(urls)
+        assert browser.bytes == uncached
+        assert "must-revalidate" in response.headers["cache-control"] and response.headers["last-modified"]
+        print(f"✅ {loads} loads of {len(urls)} pages: {browser.bytes:,} bytes instead of {uncached * loads:,}")
+
+        # A catalog change gives new validators and the new body
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE products SET price = 1299 WHERE product_id = 2")
+        conn.commit()
+        conn.close()
+        store.refresh()
+        response, body = browser.get("/get_myntra_data?category=Dress")
+        assert response.status_code == 200 and body[0]["price"] == 1299
+        # Category spelling does not split the cache
+        response = client.get("/get_myntra_data?category=%20dress", headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
+
+        # Date-only revalidation
+        last_modified = client.get("/get_myntra_data").headers["last-modified"]
+        assert client.get("/get_myntra_data", headers={"If-Modified-Since": last_modified}).status_code == 304
+        store.close()
+    print("✅ Validators change with the catalog")
+
+
+def test_etag_matching_and_response_cache():
+    assert etag_matches('"abc"', '"abc"') and etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"') and etag_matches("*", '"abc"')
+    assert not etag_matches('"abcd"', '"abc"') and not etag_matches("", '"abc"')
+    assert make_etag((1, 2), {"q": "dress"}) == make_etag((1, 2), {"q": "dress"})
+    assert make_etag((1, 2), {"q": "dress"}) != make_etag((1, 3), {"q": "dress"})
+
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]
+    cache.put("c", [3])
+    # "b" was least recently used
+    assert cache.get("b") is None and cache.get("a") == [1] and cache.get("c") == [3]
+    assert cache.stats == {"entries": 2, "hits": 3, "misses": 1}
+    print("✅ ETag comparison and search result cache")
+
+
+if __name__ == "__main__":
+    test_etag_matching_and_response_cache()
+    test_repeated_page_loads()
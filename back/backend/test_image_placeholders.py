@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test image placeholders: computed during ingest, kept with their image and served by the listing
+"""
+
+import base64
+import io
+import os
+import sqlite3
+import tempfile
+
+from PIL import Image
+
+from catalog_ingest import ingest_products
+from catalog_snapshot import load_snapshot
+from image_placeholders import make_placeholder, update_placeholders
+from product_listing import list_products, parse_fields
+from test_image_variants import make_garment
+
+
+def make_row(product_id, image_id=None, price=999.0):
+    return {
+        "product_id": product_id, "name": f"Product {product_id}", "img": f"/fitted_images/{product_id}.png",
+        "subcategory": "Dress", "main_category": "Western Wear", "seller": "FashionStore", "price": price,
+        "discount": 10.0, "target_audience": "Female", "extract_images": f"{image_id or product_id}_extracted.png",
+    }
+
+
+def decode(placeholder):
+    prefix = "data:image/webp;base64,"
+    assert placeholder.startswith(prefix)
+    return Image.open(io.BytesIO(base64.b64decode(placeholder[len(prefix):])))
+
+
+def test_make_placeholder():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "garment.jpg")
+        Image.new("RGB", (720, 1280), (200, 40, 40)).save(path, "JPEG")
+        placeholder = make_placeholder(path)
+        with decode(placeholder) as image:
+            assert image.format == "WEBP" and image.size == (16, 28)
+            red, green, _ = image.convert("RGB").getpixel((8, 14))
+            assert red > 150 and green < 90
+    print(f"✅ 720x1280 garment: {len(placeholder)}-character placeholder")
+
+
+def test_ingest_computes_placeholders():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder, db_path = os.path.join(tmp, "fitted_images"), os.path.join(tmp, "catalog.db")
+        os.makedirs(folder)
+        for image_id in range(1, 61):
+            make_garment(os.path.join(folder, f"{image_id}_extracted.png"), size=(90, 160),
+                         color=(image_id * 4, 40, 240 - image_id * 4))
+        # 40 products, enough for the process pool; product 99's image is missing
+        ingest_products([make_row(product_id) for product_id in range(1, 41)] + [make_row(99)], db_path, images_folder=folder)
+
+        conn = sqlite3.connect(db_path)
+        placeholders = dict(conn.execute("SELECT product_id, placeholder FROM products"))
+        assert all(placeholders[product_id] for product_id in range(1, 41)) and placeholders[99] is None
+        assert placeholders[1] != placeholders[2]
+        print("✅ Ingest stores a placeholder per product with an image")
+
+        # Same image: the placeholder is kept. New image: recomputed from it
+        before = placeholders[3]
+        ingest_products([make_row(1, image_id=51), make_row(2, image_id=52)], db_path, images_folder=folder)
+        ingest_products([make_row(3, price=1299.0)], db_path)
+        placeholders = dict(conn.execute("SELECT product_id, placeholder FROM products"))
+        assert placeholders[3] == before
+        assert placeholders[1] == make_placeholder(os.path.join(folder, "51_extracted.png"))
+        # Without an images folder the changed image just loses its stale placeholder
+        ingest_products([make_row(1, image_id=53)], db_path)
+        assert conn.execute("SELECT placeholder FROM products WHERE product_id = 1").fetchone()[0] is None
+        assert update_placeholders(conn, folder) == 1
+        conn.close()
+
+        # Listing returns it only when asked for
+        fields = parse_fields("product_id,img,placeholder")
+        conn = sqlite3.connect(db_path)
+        page = list_products(conn, fields=fields, limit=5)
+        conn.close()
+        assert all(item["placeholder"].startswith("data:image/webp") for item in page["items"])
+        assert "placeholder" not in parse_fields(None)
+        snapshot_page = load_snapshot(db_path).list_products(fields=fields, limit=5)
+        assert snapshot_page["items"] == page["items"]
+    print("✅ Changed images get new placeholders; the listing serves them on request")
+
+
+if __name__ == "__main__":
+    test_make_placeholder()
+    test_ingest_computes_placeholders()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test on-demand image resizing: sizes, single-flight renders, the disk LRU and cache headers
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from http_cache import is_fresh, not_modified
+from image_resize import IMMUTABLE_CACHE_CONTROL, OUTPUT_FORMATS, DiskLRU, ImageResizer, resize_image, snap_width
+
+
+def make_photo(path, size=(3000, 4000), orientation=None):
+    image = Image.new("RGB", size, (240, 240, 240))
+    image.paste((30, 60, 200), (size[0] // 4, size[1] // 4, 3 * size[0] // 4, size[1] // 2))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(path, "JPEG", quality=90, exif=exif.tobytes())
+
+
+def make_app(resizer):
+    """The /img endpoint from app.py"""
+    app = FastAPI()
+
+    @app.get("/img/{path:path}")
+    async def resized_image(path: str, request: Request, w: int = 320, fmt: str = None, v: str = None):
+        negotiated = fmt is None
+        if negotiated:
+            fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+        try:
+            file_path, version = await resizer.get(path, max(w, 1), fmt)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"ETag": f'"{os.path.basename(file_path).replace(".", "-")}"',
+                   "Cache-Control": resizer.cache_control(path, v, version)}
+        if negotiated:
+            headers["Vary"] = "Accept"
+        if is_fresh(request, headers["ETag"]):
+            return not_modified(headers)
+        return FileResponse(file_path, media_type=OUTPUT_FORMATS[fmt][1], headers=headers)
+
+    return app
+
+
+def test_resize_image():
+    with tempfile.TemporaryDirectory() as tmp:
+        photo = os.path.join(tmp, "photo.jpg")
+        make_photo(photo)
+        start = time.perf_counter()
+        data = resize_image(photo, 320, "webp")
+        fast = time.perf_counter() - start
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == "WEBP" and image.size == (320, 427)
+
+        # What it would cost without the reduced-size JPEG decode
+        start = time.perf_counter()
+        with Image.open(photo) as image:
+            image.convert("RGB").resize((320, 427), Image.LANCZOS).save(io.BytesIO(), "WEBP", quality=80)
+        full = time.perf_counter() - start
+        print(f"✅ 3000x4000 JPEG to 320px WebP: {fast * 1000:.0f} ms with draft/reduce, {full * 1000:.0f} ms without")
+
+        # Sideways phone photo: scaled to the upright width
+        make_photo(photo, size=(4000, 3000), orientation=6)
+        with Image.open(io.BytesIO(resize_image(photo, 300, "jpg"))) as image:
+            assert image.format == "JPEG" and image.size == (300, 400)
+        # Never scaled up
+        small = os.path.join(tmp, "small.png")
+        Image.new("RGBA", (100, 80), (0, 0, 0, 0)).save(small)
+        with Image.open(io.BytesIO(resize_image(small, 640, "jpg"))) as image:
+            assert image.size == (100, 80) and image.getpixel((5, 5)) == (255, 255, 255)
+    assert snap_width(200) == 256 and snap_width(256) == 256 and snap_width(10_000) == 1920
+    print("✅ EXIF orientation, no upscaling, alpha flattened for JPEG")
+
+
+def test_disk_lru():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskLRU(tmp, max_bytes=3000)
+        for name in "abc":
+            cache.put(name, bytes(1000))
+            # Apart enough for the file system's mtime resolution
+            time.sleep(0.02)
+        assert cache.get("a") is not None
+        time.sleep(0.02)
+        cache.put("d", bytes(1000))
+        # "b" was least recently used
+        assert cache.get("b") is None and not os.path.exists(os.path.join(tmp, "b"))
+        assert cache.total_bytes == 3000 and len(cache) == 3 and cache.evictions == 1
+
+        # Order and size survive a restart
+        reopened = DiskLRU(tmp, max_bytes=2000)
+        assert len(reopened) == 2 and reopened.get("c") is None and reopened.get("a") is not None
+    print("✅ Disk cache evicts least recently used files past its size bound")
+
+
+def test_endpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        fitted, uploads = os.path.join(tmp, "fitted_images"), os.path.join(tmp, "user_images")
+        os.makedirs(os.path.join(fitted, "tryon_cache"))
+        os.makedirs(uploads)
+        make_photo(os.path.join(fitted, "tryon_cache", "abc.png"), size=(768, 1024))
+        make_photo(os.path.join(uploads, "me.jpg"), size=(768, 1024))
+        with open(os.path.join(tmp, "secret.jpg"), "wb") as f:
+            f.write(b"not for you")
+
+        resizer = ImageResizer({"fitted_images": fitted, "user_images": uploads},
+                               cache=DiskLRU(os.path.join(tmp, "cache")), mutable_roots=("user_images",))
+
+        async def burst():
+            return await asyncio.gather(*[resizer.get("fitted_images/tryon_cache/abc.png", 192, "webp") for _ in range(8)])
+
+        results = asyncio.run(burst())
+        assert len({path for path, _ in results}) == 1
+        assert resizer.stats["renders"] == 1 and resizer.stats["joined"] == 7
+        print("✅ 8 concurrent identical requests, 1 render")
+
+        client = TestClient(make_app(resizer))
+        response = client.get("/img/fitted_images/tryon_cache/abc.png?w=192", headers={"Accept": "image/webp,*/*"})
+        assert response.status_code == 200 and response.headers["content-type"] == "image/webp"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL and response.headers["vary"] == "Accept"
+        assert resizer.stats["hits"] == 1 and resizer.stats["renders"] == 1
+        with Image.open(io.BytesIO(response.content)) as image:
+            assert image.size == (192, 256)
+        jpg = client.get("/img/fitted_images/tryon_cache/abc.png?w=192&fmt=jpg")
+        assert jpg.headers["content-type"] == "image/jpeg" and jpg.headers["etag"] != response.headers["etag"]
+        again = client.get("/img/fitted_images/tryon_cache/abc.png?w=192&fmt=webp",
+                           headers={"If-None-Match": response.headers["etag"]})
+        assert again.status_code == 304
+
+        # Uploads can be replaced under the same name: immutable only for a versioned URL
+        upload = client.get("/img/user_images/me.jpg?w=100")
+        assert upload.headers["cache-control"] == "no-cache"
+        _, version = asyncio.run(resizer.get("user_images/me.jpg", 100, "jpg"))
+        versioned = client.get(f"/img/user_images/me.jpg?w=100&v={version}")
+        assert versioned.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+        assert client.get("/img/fitted_images/missing.png").status_code == 404
+        assert client.get("/img/fitted_images/../secret.jpg").status_code in (400, 404)
+        assert client.get("/img/user_images/%2E%2E/secret.jpg").status_code == 400
+        assert client.get("/img/app.py").status_code == 400
+        assert client.get("/img/fitted_images/tryon_cache/abc.png?fmt=gif").status_code == 400
+        resizer.close()
+    print("✅ /img serves cached renders with immutable headers and rejects paths outside its roots")
+
+
+if __name__ == "__main__":
+    test_resize_image()
+    test_disk_lru()
+    test_endpoint()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test responsive image variants: sizes, formats, incremental rebuilds and URLs
+"""
+
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from image_variants import ImageVariants, build_variants, load_manifest, variant_path
+
+WIDTHS = (160, 320, 640)
+
+
+def make_garment(path, size=(720, 1280), color=(200, 40, 40), alpha=False):
+    image = Image.new("RGBA" if alpha else "RGB", size, (235, 235, 235, 0) if alpha else (235, 235, 235))
+    image.paste(color, (size[0] // 4, size[1] // 4, 3 * size[0] // 4, 3 * size[1] // 4))
+    image.save(path)
+
+
+def test_variants_are_rendered_and_incremental():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, folder = os.path.join(tmp, "fitted"), os.path.join(tmp, "variants")
+        os.makedirs(source)
+        make_garment(os.path.join(source, "1_extracted.png"))
+        make_garment(os.path.join(source, "2_extracted.png"), alpha=True)
+        make_garment(os.path.join(source, "3_extracted.png"), size=(300, 400))
+        make_garment(os.path.join(source, "1_tryon_result.png"))
+
+        manifest = build_variants(source, folder, WIDTHS)
+        assert sorted(manifest["images"]) == ["1_extracted.png", "2_extracted.png", "3_extracted.png"]
+        assert manifest["images"]["1_extracted.png"]["widths"] == [160, 320, 640]
+        # No upscaling: a 300px source only gets the 160px variant
+        assert manifest["images"]["3_extracted.png"]["widths"] == [160]
+
+        with Image.open(variant_path(folder, 320, "1_extracted.png", "webp")) as webp:
+            assert webp.format == "WEBP" and webp.size == (320, 569)
+        with Image.open(variant_path(folder, 320, "2_extracted.png", "jpg")) as jpg:
+            # Transparent areas are flattened onto white for JPEG
+            assert jpg.format == "JPEG" and jpg.mode == "RGB" and min(jpg.getpixel((2, 2))) > 245
+        original = os.path.getsize(os.path.join(source, "1_extracted.png"))
+        thumbnail = os.path.getsize(variant_path(folder, 320, "1_extracted.png", "webp"))
+        print(f"✅ Variants rendered: 320px WebP is {thumbnail:,} bytes, original PNG {original:,}")
+
+        # Unchanged sources are not rendered again
+        rendered_at = os.path.getmtime(variant_path(folder, 640, "1_extracted.png", "jpg"))
+        time.sleep(0.01)
+        make_garment(os.path.join(source, "2_extracted.png"), color=(40, 40, 200), alpha=True)
+        os.remove(os.path.join(source, "3_extracted.png"))
+        manifest = build_variants(source, folder, WIDTHS)
+        assert os.path.getmtime(variant_path(folder, 640, "1_extracted.png", "jpg")) == rendered_at
+        with Image.open(variant_path(folder, 320, "2_extracted.png", "webp")) as webp:
+            red, _, blue, _ = webp.convert("RGBA").getpixel((160, 284))
+            assert blue > red
+        # Variants of deleted sources go with them
+        assert "3_extracted.png" not in manifest["images"]
+        assert not os.path.exists(variant_path(folder, 160, "3_extracted.png", "webp"))
+        assert not [name for _, _, files in os.walk(folder) for name in files if name.endswith(".tmp")]
+    print("✅ Rebuilds only render changed images and drop deleted ones")
+
+
+def test_variant_urls():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, folder = os.path.join(tmp, "fitted"), os.path.join(tmp, "variants")
+        os.makedirs(source)
+        make_garment(os.path.join(source, "1_extracted.png"))
+        make_garment(os.path.join(source, "3_extracted.png"), size=(300, 400))
+        build_variants(source, folder, WIDTHS)
+
+        variants = ImageVariants(source, folder, refresh_seconds=3600)
+        variants.load()
+        assert load_manifest(folder)["widths"] == list(WIDTHS)
+        products = variants.annotate([{"product_id": 1, "extract_images": "1_extracted.png"},
+                                      {"product_id": 9, "extract_images": "9_extracted.png"}, {"product_id": 5}])
+        urls = products[0]["img_variants"]
+        assert urls["src"] == "/fitted_images/variants/320/1_extracted.jpg"
+        assert urls["webp"] == ("/fitted_images/variants/160/1_extracted.webp 160w, "
+                                "/fitted_images/variants/320/1_extracted.webp 320w, "
+                                "/fitted_images/variants/640/1_extracted.webp 640w, /fitted_images/1_extracted.png 720w")
+        assert (urls["width"], urls["height"]) == (720, 1280)
+        assert products[1]["img_variants"] is None and "img_variants" not in products[2]
+
+        assert variants.best_url("1_extracted.png", 200, "webp") == "/fitted_images/variants/320/1_extracted.webp"
+        assert variants.best_url("1_extracted.png", 700) == "/fitted_images/1_extracted.png"
+        # No variant as wide as the default: the original is the src
+        assert variants.get("3_extracted.png")["src"] == "/fitted_images/3_extracted.png"
+        assert variants.best_url("9_extracted.png", 320) is None
+    print("✅ Catalog items get srcsets and the smallest sufficient variant")
+
+
+if __name__ == "__main__":
+    test_variants_are_rendered_and_incremental()
+    test_variant_urls()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test keyset-paginated product listing: page chaining, category filter, projection and cached totals
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from catalog_ingest import ingest_products
+from product_listing import db_marker, list_products, parse_cursor, parse_fields, parse_limit
+
+SUBCATEGORIES = ["T-Shirt", " jeans ", "DRESS", "Jeans"]
+
+
+def make_rows(count):
+    for product_id in range(1, count + 1):
+        yield {
+            "product_id": product_id, "name": f"Product {product_id}", "img": f"/fitted_images/{product_id}_extracted.png",
+            "subcategory": SUBCATEGORIES[product_id % len(SUBCATEGORIES)], "main_category": "Top Wear",
+            "seller": "FashionStore", "price": 999, "discount": 10, "target_audience": "Unisex",
+            # Products without an extracted image are not listable
+            "extract_images": None if product_id % 10 == 0 else f"{product_id}_extracted.png",
+        }
+
+
+def collect(conn, category=None, limit=7, marker=None):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = list_products(conn, category, ["product_id", "subcategory"], cursor, limit, marker=marker)
+        items += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, page["total"], pages
+
+
+def test_pages_and_filters():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(200), db_path)
+        conn = sqlite3.connect(db_path)
+
+        items, total, pages = collect(conn)
+        ids = [item["product_id"] for item in items]
+        assert ids == [i for i in range(1, 201) if i % 10], ids[:20]
+        assert total == 180 and pages == 26
+
+        # "jeans", " jeans " and "Jeans" are the same category
+        jeans, total, _ = collect(conn, "  JEANS")
+        assert total == len(jeans) == sum(1 for i in range(1, 201) if i % 10 and i % 4 in (1, 3))
+        assert {item["subcategory"].strip().lower() for item in jeans} == {"jeans"}
+
+        # Only the requested columns come back, plus the cursor column
+        page = list_products(conn, "dress", parse_fields("name,price"), limit=3)
+        assert list(page["items"][0]) == ["product_id", "name", "price"]
+        assert list_products(conn, limit=None, include_total=False)["next_cursor"] is None
+
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT product_id FROM products "
+            "WHERE extract_images IS NOT NULL AND subcategory_key = lower(trim(?)) AND product_id > ? ORDER BY product_id LIMIT 61",
+            ("jeans", 50),
+        ))
+        assert "idx_products_listing" in plan and "TEMP B-TREE" not in plan, plan
+        conn.close()
+    print("✅ Keyset pages cover every listable product once, filtered and projected")
+
+
+def test_totals_cached_until_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        ingest_products(make_rows(50), db_path)
+        conn = sqlite3.connect(db_path)
+
+        marker = db_marker(db_path)
+        assert list_products(conn, limit=5, marker=marker)["total"] == 45
+        # Same marker: the cached total is served even though the table changed underneath
+        conn.execute("DELETE FROM products WHERE product_id <= 5")
+        assert list_products(conn, limit=5, marker=marker)["total"] == 45
+        conn.commit()
+        conn.close()
+
+        # A committed write changes the marker and the total is recounted
+        conn = sqlite3.connect(db_path)
+        assert db_marker(db_path) != marker
+        assert list_products(conn, limit=5, marker=db_marker(db_path))["total"] == 40
+        conn.close()
+    print("✅ Totals cached per database version")
+
+
+def test_parsing():
+    assert parse_limit(None) == 60 and parse_limit("0") == 1 and parse_limit("100000") == 500
+    assert parse_cursor("") is None and parse_cursor("42") == 42
+    assert parse_fields("price, name,price") == ["product_id", "price", "name"]
+    for parse, raw in [(parse_fields, "name,password"), (parse_cursor, "abc"), (parse_limit, "ten")]:
+        try:
+            parse(raw)
+        except ValueError:
+            continue
+        raise AssertionError(f"{parse.__name__}({raw!r}) should fail")
+    print("✅ Query parameters validated")
+
+
+if __name__ == "__main__":
+    test_parsing()
+    test_pages_and_filters()
+    test_totals_cached_until_write()
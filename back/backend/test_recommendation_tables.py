@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test that the precomputed trending tables match the original per-request ranking
+"""
+
+import numpy as np
+import pandas as pd
+
+import recommendation
+from recommendation import categories, audiences, compute_trending_tables
+
+
+def make_sales(num_products=300, seed=5):
+    """Synthetic sales history spanning past Julys and the recent trend window"""
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime(["2022-07-10", "2023-07-05", "2023-07-20", "2024-05-03", "2024-05-28", "2024-06-15", "2024-06-29"])
+    subcategories = ["T-Shirt", "Jeans", "Dress", "Shirt", "Bra", "Infant Romper"]
+    rows = []
+    for product_id in range(num_products):
+        subcategory = subcategories[product_id % len(subcategories)]
+        main_category = categories[product_id % len(categories)]
+        audience = audiences[(product_id // 4) % len(audiences)]
+        for date in dates[rng.random(len(dates)) < 0.7]:
+            rows.append({
+                "product_id": product_id,
+                "name": f"{subcategory} {product_id % 120}",
+                "price": float(rng.integers(500, 3000)),
+                "rating": 4.2,
+                "subcategory": subcategory,
+                "img": f"/fitted_images/{product_id}.png",
+                "main_category": main_category,
+                "target_audience": audience,
+                "date": date,
+                "quantity": int(rng.integers(0, 400)),
+                "extract_images": f"{product_id}_extracted.png",
+                "seller": "FashionStore",
+                "discount": float(rng.integers(0, 40)),
+            })
+    return pd.DataFrame(rows)
+
+
+def reference_top_products(df, main_category, target_audience, target_year=2024):
+    """The original get_top_products, which reran the whole ranking for one pair"""
+    df_july_past_years = df[(df['date'].dt.month == 7) & (df['date'].dt.year < target_year)]
+    df_july_past_years_filtered = df_july_past_years[~df_july_past_years['name'].str.contains('Infant', case=False, na=False)]
+    seasonal_top_products = df_july_past_years_filtered.groupby(['main_category', 'target_audience']).apply(
+        lambda x: x.nlargest(10, 'quantity')
+    ).reset_index(drop=True)
+
+    seasonal_top_10 = seasonal_top_products[
+        (seasonal_top_products['main_category'] == main_category) &
+        (seasonal_top_products['target_audience'] == target_audience)
+    ][['name', 'product_id', 'price', 'main_category', 'subcategory', 'img', 'extract_images']].to_dict(orient='records')
+
+    df_recent_months = df[(df['date'] >= '2024-05-01') & (df['date'] <= '2024-06-30')]
+    df_recent_months_filtered = df_recent_months[~df_recent_months['name'].str.contains('Infant', case=False, na=False)]
+    df_recent_months_filtered = df_recent_months_filtered[~df_recent_months_filtered['name'].str.contains('Bra', case=False, na=False)]
+
+    recent_spike_products = df_recent_months_filtered.groupby(['main_category', 'target_audience', 'name']).agg(
+        quantity_sum=('quantity', 'sum'),
+        last_month_quantity=('quantity', lambda x: x.iloc[-1]),
+        last_month_date=('date', lambda x: x.iloc[-1])
+    ).reset_index()
+
+    df_july_2023 = df[(df['date'].dt.month == 7) & (df['date'].dt.year == 2023)]
+    df_july_2023_filtered = df_july_2023[~df_july_2023['name'].str.contains('Infant', case=False, na=False)]
+    df_july_2023_filtered = df_july_2023_filtered[~df_july_2023_filtered['name'].str.contains('Bra', case=False, na=False)]
+
+    previous_year_products = df_july_2023_filtered.groupby(['main_category', 'target_audience', 'name']).agg(
+        quantity_sum_last_year=('quantity', 'sum')
+    ).reset_index()
+
+    recent_spike_products = recent_spike_products.merge(previous_year_products, on=['main_category', 'target_audience', 'name'], how='left', suffixes=('', '_last_year'))
+    recent_spike_products['quantity_sum_last_year'] = recent_spike_products['quantity_sum_last_year'].fillna(0)
+
+    recent_spike_products['has_spike'] = recent_spike_products['quantity_sum'] > recent_spike_products['quantity_sum_last_year'] * 1.5
+    recent_spike_products['weight'] = recent_spike_products['quantity_sum_last_year'].apply(lambda x: 2 if x == 0 else 1)
+    recent_spike_products['weighted_spike'] = recent_spike_products['has_spike'] * recent_spike_products['quantity_sum'] * recent_spike_products['weight']
+
+    fashion_trend_products = recent_spike_products[recent_spike_products['has_spike']].sort_values(by=['weighted_spike', 'quantity_sum'], ascending=[False, False])
+    fashion_top_products = fashion_trend_products.groupby(['main_category', 'target_audience']).head(10).reset_index(drop=True)
+
+    fashion_top_products_details = fashion_top_products.merge(df[['name', 'product_id', 'price', 'rating', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']], on=['name', 'main_category'], how='left')
+
+    fashion_top_10 = fashion_top_products_details[
+        (fashion_top_products_details['main_category'] == main_category) &
+        (fashion_top_products_details['target_audience'] == target_audience)
+    ][['name', 'product_id', 'price', 'main_category', 'subcategory', 'img', 'extract_images', 'seller', 'discount']].to_dict(orient='records')
+
+    return {"seasonal_top_products": seasonal_top_10, "fashion_trend_products": fashion_top_10}
+
+
+def test_tables_match_reference():
+    df = make_sales()
+    tables = compute_trending_tables(df)
+    assert len(tables) == len(categories) * len(audiences)
+
+    for category in categories:
+        for audience in audiences:
+            expected = reference_top_products(df, category, audience)
+            assert tables[(category, audience)] == expected, f"Ranking differs for {category} / {audience}"
+    print("✅ Trending tables match the per-request ranking for all pairs")
+
+
+def test_tables_rebuild_on_new_data():
+    df = make_sales(seed=9)
+    recommendation.set_dataset(df)
+    expected = reference_top_products(df, "Top Wear", "Female")
+    result = recommendation.get_top_products("Top Wear", "Female")
+    assert {key: result[key] for key in expected} == expected
+    assert recommendation.get_top_products("Top Wear", "Kids") == {"error": "Invalid target_audience"}
+    print("✅ Tables rebuilt after the dataset changed")
+
+
+if __name__ == "__main__":
+    test_tables_match_reference()
+    test_tables_rebuild_on_new_data()
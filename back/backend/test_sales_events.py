@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the sales event store: rollups, decayed trending and concurrent ingest
+"""
+
+import math
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from sales_events import SalesEventStore, parse_event
+
+DAY = 86400
+NOW = 1_720_000_000.0  # 2024-07-03
+
+
+def make_catalog(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (product_id INTEGER PRIMARY KEY, main_category TEXT, target_audience TEXT)")
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?)", [
+        (1, "Top Wear", "Female"), (2, "Top Wear", "Female"), (3, "Bottom Wear", "Male"), (4, "Top Wear", "Male"),
+    ])
+    conn.commit()
+    conn.close()
+
+
+def ingest_worker(args):
+    path, catalog_path, worker = args
+    store = SalesEventStore(path, catalog_path)
+    for i in range(20):
+        store.record_events([parse_event({"product_id": 1 + (i + worker) % 4, "quantity": 1, "occurred_at": NOW})])
+    return worker
+
+
+def test_rollups_and_trending():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, "catalog.db")
+        make_catalog(catalog_path)
+        store = SalesEventStore(os.path.join(tmp, "sales.db"), catalog_path, half_life_days=7)
+
+        # Product 1 sold a lot two weeks ago, product 2 a little today: decay should favour product 2
+        store.record_events([parse_event({"product_id": 1, "quantity": 10, "occurred_at": NOW - 14 * DAY})])
+        store.record_events([parse_event({"product_id": 2, "quantity": 3, "occurred_at": NOW}),
+                             parse_event({"product_id": 2, "quantity": 1, "occurred_at": NOW + 60}),
+                             parse_event({"product_id": 3, "event_type": "view", "occurred_at": NOW})])
+
+        ranked = store.trending(limit=10, now=NOW)
+        assert [item["product_id"] for item in ranked] == [2, 1, 3], ranked
+        # 10 units decayed by two half-lives is 2.5, 4 fresh units are ~4
+        assert math.isclose(ranked[1]["score"], 2.5, rel_tol=1e-9)
+        assert math.isclose(ranked[0]["score"], 3 + 2 ** (60 / (7 * DAY)), rel_tol=1e-9)
+
+        assert [item["product_id"] for item in store.trending("Top Wear", "Female", now=NOW)] == [2, 1]
+        assert store.trending("Sports Wear", "Male", now=NOW) == []
+
+        sales = store.daily_sales()
+        assert sales.groupby("product_id")["quantity"].sum().to_dict() == {1: 10, 2: 4}
+        assert len(sales[sales["product_id"] == 2]) == 1, "Same-day events should share one rollup row"
+        assert len(store.daily_sales(since_day="2024-07-01")) == 1
+        print("✅ Rollups and decayed trending")
+
+        for bad in ({"product_id": 1, "quantity": 0}, {"product_id": 1, "event_type": "refund"}, {"quantity": 1}):
+            try:
+                parse_event(bad)
+            except ValueError:
+                continue
+            raise AssertionError(f"{bad} should be rejected")
+
+
+def test_concurrent_ingest():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, "catalog.db")
+        make_catalog(catalog_path)
+        path = os.path.join(tmp, "sales.db")
+        SalesEventStore(path, catalog_path)
+
+        # Separate processes stand in for separate uvicorn workers
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(ingest_worker, [(path, catalog_path, worker) for worker in range(4)]))
+
+        store = SalesEventStore(path, catalog_path)
+        totals = store.daily_sales().groupby("product_id")["quantity"].sum().to_dict()
+        assert totals == {1: 20, 2: 20, 3: 20, 4: 20}, totals
+        # Every product got 20 identical events, so no update to rank_key was lost
+        scores = [item["score"] for item in store.trending(limit=10, now=NOW)]
+        assert all(math.isclose(score, 20.0, rel_tol=1e-9) for score in scores), scores
+        print("✅ Concurrent ingest from 4 processes")
+
+
+if __name__ == "__main__":
+    test_rollups_and_trending()
+    test_concurrent_ingest()
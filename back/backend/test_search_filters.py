@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test that search filters select the same products in vector search and SQL
+"""
+
+import sqlite3
+
+import chromadb
+import numpy as np
+
+from search_filters import parse_search_filters, filters_to_where, filters_to_sql, facet_counts
+from vector_index import NumpyVectorIndex
+
+FILTERS = [
+    {"category": "Top Wear"},
+    {"subcategory": "Jeans", "max_price": 1500},
+    {"min_price": "1200", "max_price": "1800", "min_discount": 10},
+    {"seller": ["FashionHub", "StyleCraft"], "category": "Bottom Wear"},
+    {"subcategory": "Dress", "seller": "NoSuchSeller"},
+]
+
+
+def make_catalog(num_products=80):
+    subcategories = ["T-Shirt", "Jeans", "Dress", "Shirt"]
+    main_categories = {"T-Shirt": "Top Wear", "Shirt": "Top Wear", "Jeans": "Bottom Wear", "Dress": "Western Wear"}
+    sellers = ["FashionHub", "StyleCraft", "UrbanThreads"]
+    products = []
+    for i in range(num_products):
+        subcategory = subcategories[i % len(subcategories)]
+        products.append({
+            "product_id": i,
+            "name": f"{subcategory} {i}",
+            "main_category": main_categories[subcategory],
+            "subcategory": subcategory,
+            "seller": sellers[i % len(sellers)],
+            "price": float(1000 + (i * 37) % 1000),
+            "discount": float(i % 30),
+        })
+    return products
+
+
+def test_parse_search_filters():
+    assert parse_search_filters(None) == {}
+    assert parse_search_filters({"min_price": "100", "seller": ""}) == {"min_price": 100.0}
+    for bad in ({"colour": "red"}, {"min_price": "cheap"}, {"min_price": 10, "max_price": 5}):
+        try:
+            parse_search_filters(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} should be rejected")
+    assert filters_to_where({"category": "Top Wear"}) == {"main_category": {"$eq": "Top Wear"}}
+    print("✅ Filters validated")
+
+
+def test_filters_match_across_backends():
+    products = make_catalog()
+    ids = [f"product_{p['product_id']}" for p in products]
+    embeddings = np.random.default_rng(1).standard_normal((len(products), 8)).astype(np.float32)
+
+    collection = chromadb.EphemeralClient().get_or_create_collection(name="test_search_filters")
+    collection.add(ids=ids, embeddings=embeddings.tolist(), documents=[p["name"] for p in products], metadatas=products)
+    index = NumpyVectorIndex(embeddings, ids, [p["name"] for p in products], products)
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE products (product_id INTEGER PRIMARY KEY, name TEXT, main_category TEXT, "
+                 "subcategory TEXT, seller TEXT, price REAL, discount REAL)")
+    conn.executemany("INSERT INTO products VALUES (:product_id, :name, :main_category, :subcategory, :seller, :price, :discount)", products)
+
+    for raw in FILTERS:
+        filters = parse_search_filters(raw)
+        where = filters_to_where(filters)
+        condition, params = filters_to_sql(filters)
+
+        chroma_ids = set(collection.get(where=where)["ids"])
+        numpy_ids = set(np.array(ids)[index.where_mask(where)])
+        sql_ids = {f"product_{row[0]}" for row in conn.execute(f"SELECT product_id FROM products WHERE {condition}", params)}
+        assert chroma_ids == numpy_ids == sql_ids, f"Backends disagree for {raw}"
+
+        # Filtered vector queries only ever return matching products
+        result = index.query(query_embeddings=[embeddings[0]], n_results=10, where=where)
+        assert set(result["ids"][0]) <= chroma_ids
+        print(f"✅ {raw}: {len(chroma_ids)} matches")
+
+
+def test_facet_counts():
+    products = make_catalog(12)
+    facets = facet_counts(products)
+    assert sum(facets["main_category"].values()) == len(products)
+    assert facets["subcategory"] == {"T-Shirt": 3, "Jeans": 3, "Dress": 3, "Shirt": 3}
+    assert sum(facets["price"].values()) == len(products)
+    assert set(facets["price"]) <= {"0-500", "500-1000", "1000-2000", "2000-5000", "5000+"}
+    print(f"✅ Facets: {facets}")
+
+
+if __name__ == "__main__":
+    test_parse_search_filters()
+    test_filters_match_across_backends()
+    test_facet_counts()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the try-on cache and speculative prefetching with a stub renderer
+"""
+
+import asyncio
+import os
+import tempfile
+
+from tryon_prefetch import TryOnPrefetcher
+
+RENDER_SECONDS = 0.05
+
+
+class StubRenderer:
+    """Stands in for the try-on API: sleeps, then writes the requested output file"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, cloth_image_path, category, person_image_path, output_name):
+        self.calls.append(os.path.basename(cloth_image_path))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(RENDER_SECONDS)
+        finally:
+            self.running -= 1
+        with open(os.path.join(self.folder, *output_name.split("/")), "wb") as f:
+            f.write(b"png")
+        return f"/fitted_images/{output_name}"
+
+
+def make_images(folder, names):
+    paths = []
+    for name in names:
+        path = os.path.join(folder, name)
+        with open(path, "wb") as f:
+            f.write(name.encode())
+        paths.append(path)
+    return paths
+
+
+def test_cache_and_join():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            renderer = StubRenderer(tmp)
+            prefetcher = TryOnPrefetcher(renderer, tmp, budget=2)
+            person, shirt, jeans = make_images(tmp, ["person.png", "shirt.png", "jeans.png"])
+
+            first = await prefetcher.tryon(shirt, "Upper body", person)
+            assert first.startswith("/fitted_images/tryon_cache/")
+            assert await prefetcher.tryon(shirt, "Upper body", person) == first, "Repeat should hit the cache"
+            assert renderer.calls == ["shirt.png"]
+
+            # The recommendation panel asks for a render that is already being prefetched
+            prefetcher.prefetch("s1", [(jeans, "Lower body", prefetcher.absolute_path(first))])
+            await asyncio.sleep(0)
+            result = await prefetcher.tryon(jeans, "Lower body", prefetcher.absolute_path(first))
+            assert os.path.exists(prefetcher.absolute_path(result))
+            assert renderer.calls == ["shirt.png", "jeans.png"], "Joined render must not run twice"
+            assert prefetcher.stats["hits"] == 1 and prefetcher.stats["joined"] == 1
+
+            # A new upload of the person image invalidates its renders
+            with open(person, "wb") as f:
+                f.write(b"another person")
+            os.utime(person, ns=(1, 1))
+            assert await prefetcher.tryon(shirt, "Upper body", person) != first
+        print("✅ Try-ons are cached and in-flight renders are shared")
+
+    asyncio.run(run())
+
+
+def test_budget_and_cancel():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            renderer = StubRenderer(tmp)
+            prefetcher = TryOnPrefetcher(renderer, tmp, budget=2)
+            person = make_images(tmp, ["person.png"])[0]
+            items = make_images(tmp, [f"item{i}.png" for i in range(6)])
+
+            assert prefetcher.prefetch("s1", [(item, "Upper body", person) for item in items[:5]]) == 5
+            await asyncio.sleep(RENDER_SECONDS / 2)
+            assert renderer.running == 2, "Only the budget's worth of speculative renders may run"
+
+            # The user moves on: the previous item's predictions are dropped
+            prefetcher.prefetch("s1", [(items[5], "Upper body", person)])
+            await asyncio.sleep(RENDER_SECONDS * 3)
+            assert renderer.peak == 2
+            assert prefetcher.stats["cancelled"] == 5
+            assert "item2.png" not in renderer.calls, "Queued renders should never start"
+            cached = os.listdir(prefetcher.cache_dir)
+            assert len(cached) == 1, cached
+
+            # A real request for a queued speculative render does not wait for the budget
+            prefetcher.prefetch("s2", [(item, "Lower body", person) for item in items[:3]])
+            await asyncio.sleep(0)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await prefetcher.tryon(items[2], "Lower body", person)
+            assert loop.time() - start < RENDER_SECONDS * 1.8
+            await asyncio.sleep(RENDER_SECONDS * 2)
+        print("✅ Speculative renders respect the budget and cancel on navigation")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_cache_and_join()
+    test_budget_and_cancel()
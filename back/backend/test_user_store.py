@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test per-session preferences, the visited cap and personalized re-ranking
+"""
+
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from user_store import UserStore, rerank, resolve_session_id
+
+SUBCATEGORIES = ["T-Shirt", "Jeans", "Dress", "Shirt", "Blazer", "Hoodie"]
+
+
+def reference_rank(candidates, preferences, k):
+    """The original adjust_weights + weighted_sort from app.py"""
+    weights = {}
+    for subcat, count in preferences["positive"].items():
+        weights[subcat] = weights.get(subcat, 1) + count
+    for subcat, count in preferences["negative"].items():
+        weights[subcat] = weights.get(subcat, 1) - count
+    for subcat in weights:
+        if weights[subcat] < 0:
+            weights[subcat] = 0
+    return sorted(candidates, key=lambda product: weights.get(product.get("subcategory", ""), 1), reverse=True)[:k]
+
+
+def feedback_worker(args):
+    path, worker = args
+    store = UserStore(path)
+    for _ in range(25):
+        store.record_feedback("shared", ["Dress"], ["Jeans"] if worker % 2 else [])
+    return worker
+
+
+def test_rerank_matches_reference():
+    rng = random.Random(4)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UserStore(os.path.join(tmp, "users.db"))
+        for trial in range(20):
+            session = f"session-{trial}"
+            store.record_feedback(session, rng.choices(SUBCATEGORIES, k=rng.randint(0, 6)), rng.choices(SUBCATEGORIES, k=rng.randint(0, 6)))
+            candidates = [{"img": f"{i}.png", "subcategory": rng.choice(SUBCATEGORIES + [""])} for i in range(rng.randint(0, 40))]
+            for k in (1, 3, 50):
+                expected = reference_rank(candidates, store.preferences(session), k)
+                assert rerank(candidates, store.weights(session), k) == expected, f"Ranking differs in trial {trial}, k={k}"
+    print("✅ Re-ranking matches the original weighted sort")
+
+
+def test_sessions_are_isolated_and_capped():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UserStore(os.path.join(tmp, "users.db"), visited_limit=5)
+        store.record_feedback("alice", ["Dress", "Dress"], ["Jeans"])
+        assert store.preferences("alice") == {"positive": {"Dress": 2}, "negative": {"Jeans": 1}}
+        assert store.preferences("bob") == {"positive": {}, "negative": {}}
+        assert store.weights("alice") == {"Dress": 3, "Jeans": 0}
+
+        for i in range(8):
+            store.add_visited("alice", [f"{i}.png"])
+        store.add_visited("alice", ["3.png"])  # revisiting refreshes an entry
+        assert store.visited("alice") == {"4.png", "5.png", "6.png", "7.png", "3.png"}
+        assert store.visited("bob") == set()
+
+        # State survives a new store instance, as after a restart
+        assert UserStore(os.path.join(tmp, "users.db")).preferences("alice")["positive"] == {"Dress": 2}
+        assert resolve_session_id(None, "  ", "abc") == "abc"
+        assert resolve_session_id(None, "") == "default"
+    print("✅ Sessions isolated, visited list capped, state persisted")
+
+
+def test_feedback_across_workers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.db")
+        UserStore(path)
+        # Separate processes stand in for separate uvicorn workers
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(feedback_worker, [(path, worker) for worker in range(4)]))
+        assert UserStore(path).preferences("shared") == {"positive": {"Dress": 100}, "negative": {"Jeans": 50}}
+    print("✅ No feedback lost across 4 processes")
+
+
+if __name__ == "__main__":
+    test_rerank_matches_reference()
+    test_sessions_are_isolated_and_capped()
+    test_feedback_across_workers()
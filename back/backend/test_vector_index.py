@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test that the in-memory vector index filters and ranks like ChromaDB
+"""
+
+import tempfile
+
+import chromadb
+import numpy as np
+
+from vector_index import NumpyVectorIndex, SearchBackend
+
+WHERE_CLAUSES = [
+    {"main_category": "Top Wear"},
+    {"main_category": {"$ne": "Top Wear"}},
+    {"price": {"$gt": 1500.0}},
+    {"price": {"$lte": 1200.0}},
+    {"subcategory": {"$in": ["Dress", "Jeans"]}},
+    {"subcategory": {"$nin": ["Dress", "Jeans"]}},
+    # "seller" is missing on some records, which must never match
+    {"seller": "FashionHub"},
+    {"seller": {"$ne": "FashionHub"}},
+    {"seller": {"$nin": ["FashionHub"]}},
+    {"$and": [{"main_category": "Bottom Wear"}, {"discount": {"$gte": 10.0}}]},
+    {"$or": [{"subcategory": "Dress"}, {"price": {"$lt": 1100.0}}]},
+]
+
+
+def make_catalog(num_products=60, dimensions=16):
+    rng = np.random.default_rng(3)
+    embeddings = rng.standard_normal((num_products, dimensions)).astype(np.float32)
+    subcategories = ["T-Shirt", "Jeans", "Dress", "Shirt"]
+    main_categories = {"T-Shirt": "Top Wear", "Shirt": "Top Wear", "Jeans": "Bottom Wear", "Dress": "Western Wear"}
+    ids, documents, metadatas = [], [], []
+    for i in range(num_products):
+        subcategory = subcategories[i % len(subcategories)]
+        metadata = {
+            "product_id": i,
+            "main_category": main_categories[subcategory],
+            "subcategory": subcategory,
+            "price": float(1000 + (i * 37) % 1000),
+            "discount": float(i % 30),
+        }
+        if i % 3:
+            metadata["seller"] = "FashionHub" if i % 2 else "StyleCraft"
+        ids.append(f"product_{i}")
+        documents.append(f"{subcategory} {i}")
+        metadatas.append(metadata)
+    return embeddings, ids, documents, metadatas
+
+
+def make_collection(name, embeddings, ids, documents, metadatas):
+    collection = chromadb.EphemeralClient().get_or_create_collection(name=name)
+    collection.add(ids=ids, embeddings=embeddings.tolist(), documents=documents, metadatas=metadatas)
+    return collection
+
+
+def test_filtered_queries_match_chroma():
+    embeddings, ids, documents, metadatas = make_catalog()
+    collection = make_collection("test_vector_index_filters", embeddings, ids, documents, metadatas)
+    index = NumpyVectorIndex(embeddings, ids, documents, metadatas)
+    queries = np.random.default_rng(5).standard_normal((5, embeddings.shape[1])).astype(np.float32)
+
+    for where in WHERE_CLAUSES:
+        # Ask for every match so HNSW approximation cannot change the result set
+        expected_ids = set(collection.get(where=where)["ids"])
+        assert set(np.array(ids)[index.where_mask(where)]) == expected_ids, f"Filter mismatch for {where}"
+
+        for query in queries:
+            chroma = collection.query(query_embeddings=[query.tolist()], n_results=len(ids), where=where)
+            ours = index.query(query_embeddings=[query], n_results=len(ids), where=where)
+            assert ours["ids"][0] == chroma["ids"][0], f"Ranking mismatch for {where}"
+            assert np.allclose(ours["distances"][0], chroma["distances"][0], rtol=1e-4, atol=1e-4)
+        print(f"✅ {where}: {len(expected_ids)} matches")
+
+
+def test_stale_index_is_rebuilt():
+    embeddings, ids, documents, metadatas = make_catalog(num_products=20)
+    collection = make_collection("test_vector_index_stale", embeddings, ids, documents, metadatas)
+
+    with tempfile.TemporaryDirectory() as path:
+        backend = SearchBackend(collection, path=path)
+        assert backend.backend_name == "numpy"
+        fingerprint = backend._active.fingerprint
+
+        # Same number of products, different metadata: the saved index must not be reused
+        collection.update(ids=["product_0"], metadatas=[{**metadatas[0], "price": 9999.0}])
+        backend = SearchBackend(collection, path=path)
+        assert backend._active.fingerprint != fingerprint
+        assert backend.query(query_embeddings=[embeddings[0]], n_results=1)["metadatas"][0][0]["price"] == 9999.0
+        print("✅ Stale index rebuilt after a same-size update")
+
+
+if __name__ == "__main__":
+    test_filtered_queries_match_chroma()
+    test_stale_index_is_rebuilt()
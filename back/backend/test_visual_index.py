@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the visual similarity index on synthetic garments
+"""
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from visual_index import VisualIndex, image_features
+
+# BGR garment colors
+COLORS = {"red": (30, 30, 220), "crimson": (60, 20, 200), "navy": (120, 40, 20), "blue": (200, 90, 30),
+          "green": (40, 160, 40), "yellow": (30, 220, 230)}
+
+
+def draw_garment(path, color, background=(235, 235, 235), alpha=False, seed=0):
+    rng = np.random.default_rng(seed)
+    image = np.empty((200, 150, 3), dtype=np.uint8)
+    image[:] = background
+    # A shirt-like blob with some texture, at a slightly random position
+    x, y = rng.integers(10, 30, size=2)
+    garment = np.clip(np.array(color) + rng.normal(0, 8, size=(140, 100, 3)), 0, 255).astype(np.uint8)
+    image[y:y + 140, x:x + 100] = garment
+    if alpha:
+        mask = np.zeros((200, 150, 1), dtype=np.uint8)
+        mask[y:y + 140, x:x + 100] = 255
+        image = np.concatenate([image, mask], axis=2)
+    cv2.imwrite(path, image)
+
+
+def test_similar_colors_rank_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, name in enumerate(COLORS):
+            # Alternate backdrops and alpha so neither drives the match
+            draw_garment(os.path.join(tmp, f"{name}_extracted.png"), COLORS[name],
+                         background=(235, 235, 235) if i % 2 else (90, 110, 120), alpha=i % 3 == 0, seed=i)
+        draw_garment(os.path.join(tmp, "red_extracted_tryon_result.png"), COLORS["red"])
+
+        index = VisualIndex.build(tmp)
+        assert index.count() == len(COLORS), "Try-on renders are not garments"
+        assert index.similar("red_extracted.png", k=1)[0][0] == "crimson_extracted.png"
+        assert index.similar("navy_extracted.png", k=1)[0][0] == "blue_extracted.png"
+        scores = [score for _, score in index.similar("green_extracted.png", k=5)]
+        assert scores == sorted(scores, reverse=True)
+        only = index.similar("red_extracted.png", k=3, candidates={"green_extracted.png", "yellow_extracted.png"})
+        assert {name for name, _ in only} == {"green_extracted.png", "yellow_extracted.png"}
+
+        index.save(os.path.join(tmp, "index"))
+        loaded = VisualIndex.load(os.path.join(tmp, "index"))
+        assert loaded.similar("red_extracted.png", k=5) == index.similar("red_extracted.png", k=5)
+        assert loaded.histograms.flags["C_CONTIGUOUS"]
+    print("✅ Similar colors rank first, with or without alpha")
+
+
+def test_parallel_and_incremental_build():
+    with tempfile.TemporaryDirectory() as tmp:
+        names = list(COLORS)
+        for i in range(60):
+            draw_garment(os.path.join(tmp, f"{i}_extracted.png"), COLORS[names[i % len(names)]], seed=i)
+
+        start = time.perf_counter()
+        index = VisualIndex.build(tmp, workers=2)
+        full_seconds = time.perf_counter() - start
+        row = index.names.index("7_extracted.png")
+        histogram, palette = image_features(os.path.join(tmp, "7_extracted.png"))
+        assert np.array_equal(index.histograms[row], histogram), "Pool workers must compute the same features"
+        assert np.array_equal(index.palettes[row], palette)
+
+        # Ingest two garments in a new color and replace one
+        draw_garment(os.path.join(tmp, "60_extracted.png"), (200, 20, 200), seed=60)
+        draw_garment(os.path.join(tmp, "61_extracted.png"), (200, 20, 200), seed=61)
+        os.remove(os.path.join(tmp, "59_extracted.png"))
+        draw_garment(os.path.join(tmp, "3_extracted.png"), COLORS["green"], seed=3)
+        os.utime(os.path.join(tmp, "3_extracted.png"), ns=(1, 1))
+
+        start = time.perf_counter()
+        updated = VisualIndex.build(tmp, previous=index)
+        update_seconds = time.perf_counter() - start
+        assert updated.count() == 61 and "59_extracted.png" not in updated
+        assert updated.similar("60_extracted.png", k=1)[0][0] == "61_extracted.png"
+        row = updated.names.index("3_extracted.png")
+        assert np.array_equal(updated.histograms[row], image_features(os.path.join(tmp, "3_extracted.png"))[0])
+        print(f"✅ Full build {full_seconds:.2f}s, incremental update of 3 images {update_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    test_similar_colors_rank_first()
+    test_parallel_and_incremental_build()
@@ -0,0 +1,169 @@
+"""
+Try-on result cache with speculative pre-rendering of likely recommendations.
+
+Every try-on is written to its own file under ``fitted_images/tryon_cache``,
+named after a hash of (person image, cloth image, category), so a repeated
+try-on is served from disk instead of calling the try-on API again.
+
+After a session's first try-on, the items the recommendation panel is
+predicted to show are rendered in the background. At most
+``TRYON_PREFETCH_BUDGET`` speculative renders run at once. When the session
+moves on to another item, its queued and running speculative work is
+cancelled. A real request for a render that is already in flight awaits that
+render instead of starting a duplicate.
+"""
+
+import asyncio
+import hashlib
+import os
+
+FITTED_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), "fitted_images")
+TRYON_CACHE_SUBDIR = "tryon_cache"
+TRYON_PREFETCH_BUDGET = int(os.getenv("TRYON_PREFETCH_BUDGET", "2"))
+TRYON_PREFETCH_ITEMS = int(os.getenv("TRYON_PREFETCH_ITEMS", "3"))
+TRYON_CACHE_MAX_FILES = int(os.getenv("TRYON_CACHE_MAX_FILES", "500"))
+
+
+def _file_identity(path):
+    """Path plus size and mtime, so a re-uploaded image with the same name gets a new key"""
+    try:
+        stat = os.stat(path)
+        return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return os.path.realpath(path)
+
+
+def tryon_cache_key(cloth_image_path, category, person_image_path):
+    identity = "|".join((_file_identity(person_image_path), _file_identity(cloth_image_path), category or ""))
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:24]
+
+
+class TryOnPrefetcher:
+    def __init__(self, render, fitted_images_folder=FITTED_IMAGES_FOLDER, budget=TRYON_PREFETCH_BUDGET,
+                 max_cached=TRYON_CACHE_MAX_FILES):
+        # render(cloth_image_path, category, person_image_path, output_name) -> "/fitted_images/..." path
+        self.render = render
+        self.fitted_images_folder = fitted_images_folder
+        self.cache_dir = os.path.join(fitted_images_folder, TRYON_CACHE_SUBDIR)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_cached = max_cached
+        self._budget = asyncio.Semaphore(budget)
+        self._inflight = {}     # key -> task rendering it
+        self._speculative = {}  # session_id -> keys it prefetched
+        self._started = set()   # speculative keys that got past the budget and are rendering
+        self._claimed = set()   # keys a real request is waiting on; these are never cancelled
+        self.stats = {"hits": 0, "joined": 0, "misses": 0, "prefetched": 0, "cancelled": 0}
+
+    def _output_name(self, key):
+        return f"{TRYON_CACHE_SUBDIR}/{key}.png"
+
+    def cached(self, key):
+        """Served path of a finished render, or None"""
+        if os.path.exists(os.path.join(self.cache_dir, f"{key}.png")):
+            return f"/fitted_images/{self._output_name(key)}"
+        return None
+
+    def absolute_path(self, fitted_image):
+        """Filesystem path of a "/fitted_images/..." result, for use as the next person image"""
+        if isinstance(fitted_image, str) and fitted_image.startswith("/fitted_images/"):
+            return os.path.join(self.fitted_images_folder, *fitted_image[len("/fitted_images/"):].split("/"))
+        return fitted_image
+
+    async def tryon(self, cloth_image_path, category, person_image_path):
+        """Render a try-on for a real request, reusing the cache or an in-flight render"""
+        key = tryon_cache_key(cloth_image_path, category, person_image_path)
+        cached = self.cached(key)
+        if cached:
+            self.stats["hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None and key not in self._claimed and key not in self._started:
+            # Still queued behind the speculative budget: render it now instead
+            task.cancel()
+            task = None
+        if task is not None:
+            self.stats["joined"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = self._start(key, cloth_image_path, category, person_image_path, speculative=False)
+        self._claimed.add(key)
+        # Shield so a disconnecting client does not cancel a render other requests may share
+        return await asyncio.shield(task)
+
+    def prefetch(self, session_id, jobs):
+        """
+        Start speculative renders for ``jobs`` [(cloth_image_path, category, person_image_path)],
+        replacing whatever this session was prefetching before.
+        """
+        keys = [tryon_cache_key(*job) for job in jobs]
+        self.cancel(session_id, keep=set(keys))
+        pending = self._speculative.setdefault(session_id, set())
+        for key, job in zip(keys, jobs):
+            if key in self._inflight or self.cached(key):
+                continue
+            self._start(key, *job, speculative=True)
+            pending.add(key)
+            self.stats["prefetched"] += 1
+        return len(pending)
+
+    def cancel(self, session_id, keep=()):
+        """Drop a session's speculative renders, except ``keep`` and any a real request is waiting on"""
+        kept = set()
+        for key in self._speculative.pop(session_id, ()):
+            task = self._inflight.get(key)
+            if key in keep or key in self._claimed:
+                kept.add(key)
+            elif task is not None and not task.done():
+                task.cancel()
+                self.stats["cancelled"] += 1
+        if kept:
+            self._speculative[session_id] = kept
+
+    def cancel_all(self):
+        for session_id in list(self._speculative):
+            self.cancel(session_id)
+
+    def _start(self, key, cloth_image_path, category, person_image_path, speculative):
+        task = asyncio.create_task(self._render(key, cloth_image_path, category, person_image_path, speculative))
+        self._inflight[key] = task
+        if speculative:
+            task.add_done_callback(self._log_failure)
+        return task
+
+    async def _render(self, key, cloth_image_path, category, person_image_path, speculative):
+        try:
+            if speculative:
+                async with self._budget:
+                    self._started.add(key)
+                    return await self._render_uncached(key, cloth_image_path, category, person_image_path)
+            return await self._render_uncached(key, cloth_image_path, category, person_image_path)
+        finally:
+            # A replacement task may already own this key
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+                self._started.discard(key)
+                self._claimed.discard(key)
+
+    async def _render_uncached(self, key, cloth_image_path, category, person_image_path):
+        cached = self.cached(key)
+        if cached:
+            return cached
+        result = await self.render(cloth_image_path, category, person_image_path, self._output_name(key))
+        # Anything else is a fallback (e.g. the cloth image itself) and must not be cached
+        if result == f"/fitted_images/{self._output_name(key)}":
+            self._prune()
+        return result
+
+    def _prune(self):
+        entries = sorted(os.scandir(self.cache_dir), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:max(len(entries) - self.max_cached, 0)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Speculative try-on failed: {task.exception()}")
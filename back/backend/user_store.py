@@ -0,0 +1,140 @@
+"""
+Per-session feedback preferences and visited items, stored in SQLite.
+
+Everything lives in the database rather than in process memory, so state
+survives restarts and every uvicorn worker sees the same data. Each session's
+visited list is capped at ``VISITED_ITEMS_LIMIT`` entries; the oldest entries
+are evicted first.
+"""
+
+import heapq
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+USER_STORE_PATH = os.getenv("USER_STORE_PATH") or os.path.join(os.path.dirname(__file__), "user_store.db")
+VISITED_ITEMS_LIMIT = int(os.getenv("VISITED_ITEMS_LIMIT", "500"))
+DEFAULT_SESSION_ID = "default"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS user_preferences ("
+    "session_id TEXT NOT NULL, subcategory TEXT NOT NULL, positive INTEGER NOT NULL DEFAULT 0, "
+    "negative INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (session_id, subcategory))",
+    "CREATE TABLE IF NOT EXISTS visited_items ("
+    "session_id TEXT NOT NULL, img TEXT NOT NULL, visited_at REAL NOT NULL, PRIMARY KEY (session_id, img))",
+    "CREATE INDEX IF NOT EXISTS idx_visited_items_age ON visited_items (session_id, visited_at)",
+]
+
+
+def resolve_session_id(*candidates):
+    """First non-empty session id from the body, query or header, else the shared default"""
+    for candidate in candidates:
+        if candidate and str(candidate).strip():
+            return str(candidate).strip()[:128]
+    return DEFAULT_SESSION_ID
+
+
+class UserStore:
+    def __init__(self, path=USER_STORE_PATH, visited_limit=VISITED_ITEMS_LIMIT):
+        self.path = path
+        self.visited_limit = visited_limit
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record_feedback(self, session_id, positive, negative):
+        rows = [(session_id, subcat, 1, 0) for subcat in positive] + [(session_id, subcat, 0, 1) for subcat in negative]
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            # Increments happen inside SQLite, so concurrent workers never lose an update
+            conn.executemany(
+                "INSERT INTO user_preferences (session_id, subcategory, positive, negative) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (session_id, subcategory) DO UPDATE SET "
+                "positive = positive + excluded.positive, negative = negative + excluded.negative",
+                rows,
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def preferences(self, session_id):
+        """Feedback counts in the {"positive": {...}, "negative": {...}} shape the API returns"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT subcategory, positive, negative FROM user_preferences WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            "positive": {subcat: positive for subcat, positive, _ in rows if positive},
+            "negative": {subcat: negative for subcat, _, negative in rows if negative},
+        }
+
+    def weights(self, session_id):
+        """Subcategory weights: 1 plus positive minus negative feedback, never below 0"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT subcategory, MAX(1 + positive - negative, 0) FROM user_preferences WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+    def visited(self, session_id):
+        conn = self._connect()
+        try:
+            return {img for (img,) in conn.execute("SELECT img FROM visited_items WHERE session_id = ?", (session_id,))}
+        finally:
+            conn.close()
+
+    def add_visited(self, session_id, images):
+        if not images:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT INTO visited_items (session_id, img, visited_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id, img) DO UPDATE SET visited_at = excluded.visited_at",
+                [(session_id, img, now) for img in images],
+            )
+            # Keep only the most recent entries for this session
+            conn.execute(
+                "DELETE FROM visited_items WHERE session_id = ? AND img NOT IN ("
+                "SELECT img FROM visited_items WHERE session_id = ? ORDER BY visited_at DESC LIMIT ?)",
+                (session_id, session_id, self.visited_limit),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def rerank(candidates, weights, k):
+    """
+    Top ``k`` candidates by subcategory weight (default 1). Ties keep candidate
+    order, matching ``sorted(..., reverse=True)[:k]``.
+    """
+    if not candidates or k <= 0:
+        return []
+    subcategories = np.array([candidate.get("subcategory", "") for candidate in candidates], dtype=object)
+    unique, codes = np.unique(subcategories, return_inverse=True)
+    # One dict lookup per distinct subcategory, then a vectorized gather per candidate
+    scores = np.array([weights.get(subcat, 1) for subcat in unique], dtype=np.float64)[codes]
+    top = heapq.nlargest(k, range(len(candidates)), key=scores.__getitem__)
+    return [candidates[i] for i in top]
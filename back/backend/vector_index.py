@@ -0,0 +1,285 @@
+"""
+In-process exact vector index for small catalogs.
+
+All product embeddings live in one contiguous float32 ``.npy`` matrix (opened
+memory-mapped) next to a parallel metadata array. A query is a single
+matrix-vector product followed by ``np.argpartition``, so results are exact and
+deterministic. ``query()`` returns the same shape as Chroma's
+``collection.query`` so the index can stand in for the collection in ``rag.py``.
+"""
+
+import hashlib
+import json
+import operator
+import os
+import threading
+import time
+
+import numpy as np
+
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH") or os.path.join(os.path.dirname(__file__), "vector_index")
+# Catalogs up to this size are served from the in-process index, larger ones stay on Chroma.
+# Set to 0 to always use Chroma.
+VECTOR_INDEX_MAX_ITEMS = int(os.getenv("VECTOR_INDEX_MAX_ITEMS", "20000"))
+# How often a running API checks whether Chroma was written to since the index was loaded
+VECTOR_INDEX_REFRESH_SECONDS = float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "30"))
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+_RANGE_OPERATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+class NumpyVectorIndex:
+    def __init__(self, embeddings, ids, documents, metadatas, embedding_function=None, fingerprint=None):
+        self.embeddings = embeddings
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.embedding_function = embedding_function
+        self.fingerprint = fingerprint if fingerprint is not None else catalog_fingerprint(self.ids, self.documents, self.metadatas)
+        # Squared norms let us compute squared L2 (Chroma's default "l2" space) from one dot product
+        self._sq_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        self._columns = {}
+
+    def count(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_collection(cls, collection, embedding_function=None, batch_size=1000):
+        """Copy every embedding and metadata record out of a Chroma collection"""
+        total = collection.count()
+        ids, documents, metadatas, embeddings = [], [], [], []
+        for offset in range(0, total, batch_size):
+            batch = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            ids.extend(batch["ids"])
+            documents.extend(batch["documents"])
+            metadatas.extend(batch["metadatas"])
+            embeddings.extend(batch["embeddings"])
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        return cls(matrix, ids, documents, metadatas, embedding_function=embedding_function)
+
+    def save(self, path=VECTOR_INDEX_PATH):
+        os.makedirs(path, exist_ok=True)
+        embeddings_path = os.path.join(path, EMBEDDINGS_FILE)
+        metadata_path = os.path.join(path, METADATA_FILE)
+
+        # Write to temp files first so a reader never maps a half-written matrix
+        with open(embeddings_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.embeddings, dtype=np.float32))
+        with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}, f)
+        os.replace(embeddings_path + ".tmp", embeddings_path)
+        os.replace(metadata_path + ".tmp", metadata_path)
+        print(f"Saved vector index with {self.count()} items to {path}")
+
+    @classmethod
+    def load(cls, path=VECTOR_INDEX_PATH, embedding_function=None):
+        embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(path, METADATA_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            embeddings, data["ids"], data["documents"], data["metadatas"],
+            embedding_function=embedding_function, fingerprint=data.get("fingerprint"),
+        )
+
+    def _column(self, key):
+        """Metadata values for ``key`` as an array, plus a mask of rows that have the key"""
+        if key not in self._columns:
+            present = np.array([key in m for m in self.metadatas], dtype=bool)
+            values = [m.get(key) for m in self.metadatas]
+            if present.all() and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                column = np.asarray(values, dtype=np.float64)
+            else:
+                column = np.asarray(values, dtype=object)
+            self._columns[key] = (column, present)
+        return self._columns[key]
+
+    def _condition_mask(self, key, condition):
+        values, present = self._column(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = present.copy()
+        for op, operand in condition.items():
+            if op == "$eq":
+                mask &= values == operand
+            elif op == "$ne":
+                mask &= values != operand
+            elif op in _RANGE_OPERATORS:
+                if values.dtype == object:
+                    numeric = present & np.fromiter((isinstance(v, (int, float)) and not isinstance(v, bool) for v in values), dtype=bool, count=len(values))
+                    column = np.where(numeric, values, 0).astype(np.float64)
+                else:
+                    numeric, column = present, values
+                mask &= numeric & _RANGE_OPERATORS[op](column, operand)
+            elif op in ("$in", "$nin"):
+                members = set(operand)
+                found = np.fromiter((v in members for v in values), dtype=bool, count=len(values))
+                mask &= found if op == "$in" else ~found
+            else:
+                raise ValueError(f"Unsupported where operator: {op}")
+        return mask
+
+    def where_mask(self, where):
+        """Boolean row mask for a Chroma-style ``where`` filter"""
+        mask = np.ones(self.count(), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self.where_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(self.count(), dtype=bool)
+                for clause in condition:
+                    any_mask |= self.where_mask(clause)
+                mask &= any_mask
+            else:
+                mask &= self._condition_mask(key, condition)
+        return mask
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None, include=("metadatas", "documents", "distances")):
+        """Exact top-k by squared L2 distance, with optional metadata pre-filtering"""
+        if query_embeddings is None:
+            if isinstance(query_texts, str):
+                query_texts = [query_texts]
+            query_embeddings = self.embedding_function(query_texts)
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.embeddings.shape[1])
+
+        if where:
+            candidates = np.flatnonzero(self.where_mask(where))
+            matrix = self.embeddings[candidates]
+            sq_norms = self._sq_norms[candidates]
+        else:
+            candidates = None
+            matrix = self.embeddings
+            sq_norms = self._sq_norms
+
+        k = min(n_results, len(sq_norms))
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in queries:
+            if k == 0:
+                rows, distances = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            else:
+                all_distances = sq_norms - 2.0 * (matrix @ query) + float(query @ query)
+                top = np.argpartition(all_distances, k - 1)[:k] if k < len(all_distances) else np.arange(len(all_distances))
+                # Sort the k winners by distance, breaking ties on row order so results are deterministic
+                top = top[np.lexsort((top, all_distances[top]))]
+                distances = np.maximum(all_distances[top], 0.0)
+                rows = candidates[top] if candidates is not None else top
+
+            result["ids"].append([self.ids[i] for i in rows])
+            result["documents"].append([self.documents[i] for i in rows])
+            result["metadatas"].append([self.metadatas[i] for i in rows])
+            result["distances"].append([float(d) for d in distances])
+
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                result[key] = None
+        return result
+
+
+def catalog_fingerprint(ids, documents, metadatas):
+    """Hash of every record, used to tell whether a saved index still matches Chroma"""
+    digest = hashlib.sha1()
+    for record in sorted(zip(ids, documents, metadatas), key=lambda r: r[0]):
+        digest.update(json.dumps(record, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def collection_fingerprint(collection, batch_size=1000):
+    ids, documents, metadatas = [], [], []
+    for offset in range(0, collection.count(), batch_size):
+        batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"])
+        metadatas.extend(batch["metadatas"])
+    return catalog_fingerprint(ids, documents, metadatas)
+
+
+def build_vector_index(collection, embedding_function=None, path=VECTOR_INDEX_PATH):
+    """Rebuild the on-disk index from the Chroma collection"""
+    index = NumpyVectorIndex.from_collection(collection, embedding_function=embedding_function)
+    index.save(path)
+    return NumpyVectorIndex.load(path, embedding_function=embedding_function)
+
+
+class SearchBackend:
+    """
+    Serves queries from the in-process index for small catalogs and from Chroma
+    otherwise. When the files under ``chroma_path`` change, the collection is
+    fingerprinted again and the index is rebuilt if its records no longer match.
+    """
+
+    def __init__(self, collection, embedding_function=None, path=VECTOR_INDEX_PATH, max_items=VECTOR_INDEX_MAX_ITEMS,
+                 chroma_path=None, refresh_seconds=VECTOR_INDEX_REFRESH_SECONDS):
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.path = path
+        self.max_items = max_items
+        self.chroma_path = chroma_path
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._marker = self._chroma_marker()
+        self._active = self._select()
+
+    @property
+    def backend_name(self):
+        return "numpy" if isinstance(self._active, NumpyVectorIndex) else "chroma"
+
+    def _chroma_marker(self):
+        """Latest mtime of Chroma's SQLite files, a cheap signal that something was written"""
+        if not self.chroma_path:
+            return None
+        mtimes = []
+        for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+            try:
+                mtimes.append(os.stat(os.path.join(self.chroma_path, name)).st_mtime_ns)
+            except OSError:
+                pass
+        return max(mtimes, default=None)
+
+    def _select(self):
+        try:
+            count = self.collection.count()
+            if count == 0 or count > self.max_items:
+                print(f"Using ChromaDB for vector search ({count} items)")
+                return self.collection
+
+            if os.path.exists(os.path.join(self.path, EMBEDDINGS_FILE)):
+                index = NumpyVectorIndex.load(self.path, embedding_function=self.embedding_function)
+                if index.fingerprint == collection_fingerprint(self.collection):
+                    print(f"Using in-memory vector index for {count} items")
+                    return index
+                print("Vector index does not match the ChromaDB collection, rebuilding...")
+
+            index = build_vector_index(self.collection, embedding_function=self.embedding_function, path=self.path)
+            print(f"Using in-memory vector index for {count} items")
+            return index
+
+        except Exception as e:
+            print(f"In-memory vector index unavailable, using ChromaDB: {e}")
+            return self.collection
+
+    def _current(self):
+        if self.chroma_path and time.monotonic() - self._checked_at >= self.refresh_seconds:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.refresh_seconds:
+                    self._checked_at = time.monotonic()
+                    marker = self._chroma_marker()
+                    if marker != self._marker:
+                        print("ChromaDB changed on disk, re-checking the vector index...")
+                        self._marker = marker
+                        self._active = self._select()
+        return self._active
+
+    def count(self):
+        return self._current().count()
+
+    def query(self, **kwargs):
+        return self._current().query(**kwargs)
+
+
+def select_search_backend(collection, embedding_function=None, path=VECTOR_INDEX_PATH, max_items=VECTOR_INDEX_MAX_ITEMS, chroma_path=None):
+    """Return a backend that uses the in-process index for small catalogs and Chroma otherwise"""
+    return SearchBackend(collection, embedding_function=embedding_function, path=path, max_items=max_items, chroma_path=chroma_path)
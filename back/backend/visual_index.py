@@ -0,0 +1,320 @@
+"""
+Visual color-similarity index over the garment images in ``fitted_images``.
+
+Each image is described by two things:
+
+* an HSV color histogram, L1-normalized and square-rooted, so the dot product
+  of two rows is their Bhattacharyya coefficient (1.0 = identical colors);
+* a palette of the ``PALETTE_SIZE`` dominant colors (k-means in Lab) with
+  their pixel shares.
+
+Only garment pixels count. The alpha channel is the mask when the image has
+one. Otherwise, pixels close to the median border color are treated as
+backdrop. Histograms are stored in one contiguous float32 matrix, so
+candidates come from a single matrix-vector product. The top candidates are
+then re-ranked by palette distance.
+
+Features are computed in a process pool. Rebuilding only recomputes images
+whose size or mtime changed, so ingesting new garments is an incremental
+update. Run ``python visual_index.py`` to build or update the index on disk.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+FITTED_IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), "fitted_images")
+VISUAL_INDEX_PATH = os.getenv("VISUAL_INDEX_PATH") or os.path.join(os.path.dirname(__file__), "visual_index")
+VISUAL_INDEX_WORKERS = int(os.getenv("VISUAL_INDEX_WORKERS", "0")) or None
+# How often a running API checks fitted_images for new or changed garments
+VISUAL_INDEX_REFRESH_SECONDS = float(os.getenv("VISUAL_INDEX_REFRESH_SECONDS", "60"))
+
+HIST_BINS = (12, 3, 3)  # hue, saturation, value
+PALETTE_SIZE = 5
+FEATURE_SIZE = 160  # images are shrunk so their longer side is at most this many pixels
+BACKGROUND_TOLERANCE = 30
+# Share of the final score that comes from the histogram; the rest is palette similarity
+HISTOGRAM_WEIGHT = 0.6
+RERANK_FACTOR = 4
+
+HISTOGRAMS_FILE = "histograms.npy"
+PALETTES_FILE = "palettes.npy"
+METADATA_FILE = "metadata.json"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def is_garment_image(name):
+    """Extracted garments only; try-on renders in the same folder are not catalog items"""
+    return name.lower().endswith(IMAGE_EXTENSIONS) and "_tryon_result" not in name
+
+
+def garment_mask(image):
+    """uint8 mask of garment pixels for a BGR or BGRA image"""
+    if image.shape[2] == 4:
+        mask = image[:, :, 3] > 127
+    else:
+        border = np.concatenate([image[0], image[-1], image[:, 0], image[:, -1]]).astype(np.int16)
+        background = np.median(border, axis=0)
+        mask = np.abs(image.astype(np.int16) - background).max(axis=2) > BACKGROUND_TOLERANCE
+    if mask.mean() < 0.02:
+        # Nothing stands out from the backdrop; describe the whole image instead
+        mask[:] = True
+    return mask.astype(np.uint8)
+
+
+def image_features(path):
+    """(histogram, palette) for one image file, or None if it cannot be read"""
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return None
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    scale = FEATURE_SIZE / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    mask = garment_mask(image)
+    bgr = np.ascontiguousarray(image[:, :, :3])
+
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    histogram = cv2.calcHist([hsv], [0, 1, 2], mask, list(HIST_BINS), [0, 180, 0, 256, 0, 256]).ravel()
+    histogram = np.sqrt(histogram / max(histogram.sum(), 1.0)).astype(np.float32)
+
+    lab = cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB)[mask.astype(bool)].astype(np.float32)
+    # 8-bit Lab -> L in 0..100, a/b centred on 0
+    lab[:, 0] *= 100.0 / 255.0
+    lab[:, 1:] -= 128.0
+    if len(lab) > 4000:
+        lab = lab[:: len(lab) // 4000]
+    palette = np.zeros((PALETTE_SIZE, 4), dtype=np.float32)
+    k = min(PALETTE_SIZE, len(lab))
+    if k:
+        cv2.setRNGSeed(0)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+        _, labels, centers = cv2.kmeans(lab, k, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+        shares = np.bincount(labels.ravel(), minlength=k) / len(labels)
+        order = np.argsort(-shares, kind="stable")
+        palette[:k, :3] = centers[order]
+        palette[:k, 3] = shares[order]
+    return histogram, palette
+
+
+def _features_for(path):
+    try:
+        return image_features(path)
+    except cv2.error as e:
+        print(f"Could not compute visual features for {path}: {e}")
+        return None
+
+
+def palette_distances(palette, palettes):
+    """
+    Symmetric weighted nearest-color distance (Lab units) from one palette to
+    each of ``palettes`` [N, PALETTE_SIZE, 4].
+    """
+    pairwise = np.linalg.norm(palettes[:, None, :, :3] - palette[None, :, None, :3], axis=3)  # [N, query, other]
+    # Empty palette slots have zero share, so they never contribute
+    forward = (pairwise.min(axis=2) * palette[None, :, 3]).sum(axis=1)
+    backward = (pairwise.min(axis=1) * palettes[:, :, 3]).sum(axis=1)
+    return 0.5 * (forward + backward)
+
+
+class VisualIndex:
+    def __init__(self, names, stamps, histograms, palettes):
+        self.names = list(names)
+        self.stamps = list(stamps)
+        self.histograms = histograms
+        self.palettes = palettes
+        self._rows = {name: row for row, name in enumerate(self.names)}
+
+    def count(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    @classmethod
+    def build(cls, folder=FITTED_IMAGES_FOLDER, previous=None, workers=VISUAL_INDEX_WORKERS):
+        """
+        Index every garment image in ``folder``. Rows of ``previous`` whose file
+        is unchanged are reused; only new or modified images are computed.
+        """
+        files = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and is_garment_image(entry.name):
+                    stat = entry.stat()
+                    files.append((entry.name, f"{stat.st_size}:{stat.st_mtime_ns}"))
+        files.sort()
+
+        reused = {}
+        if previous is not None:
+            for name, stamp in files:
+                row = previous._rows.get(name)
+                if row is not None and previous.stamps[row] == stamp:
+                    reused[name] = (previous.histograms[row], previous.palettes[row])
+        todo = [name for name, _ in files if name not in reused]
+
+        computed = {}
+        if todo:
+            paths = [os.path.join(folder, name) for name in todo]
+            if len(todo) < 32:
+                results = map(_features_for, paths)
+                computed = dict(zip(todo, results))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    computed = dict(zip(todo, pool.map(_features_for, paths, chunksize=16)))
+        print(f"Visual index: {len(reused)} images unchanged, {len(todo)} computed")
+
+        names, stamps, histograms, palettes = [], [], [], []
+        for name, stamp in files:
+            features = reused.get(name) or computed.get(name)
+            if features is None:
+                continue
+            names.append(name)
+            stamps.append(stamp)
+            histograms.append(features[0])
+            palettes.append(features[1])
+        histogram_size = int(np.prod(HIST_BINS))
+        return cls(
+            names, stamps,
+            np.ascontiguousarray(np.asarray(histograms, dtype=np.float32).reshape(len(names), histogram_size)),
+            np.ascontiguousarray(np.asarray(palettes, dtype=np.float32).reshape(len(names), PALETTE_SIZE, 4)),
+        )
+
+    def save(self, path=VISUAL_INDEX_PATH):
+        os.makedirs(path, exist_ok=True)
+        # Write to temp files first so a reader never maps a half-written matrix
+        targets = []
+        for file_name, array in ((HISTOGRAMS_FILE, self.histograms), (PALETTES_FILE, self.palettes)):
+            target = os.path.join(path, file_name)
+            with open(target + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(array, dtype=np.float32))
+            targets.append(target)
+        target = os.path.join(path, METADATA_FILE)
+        with open(target + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"names": self.names, "stamps": self.stamps, "hist_bins": list(HIST_BINS)}, f)
+        targets.append(target)
+        for target in targets:
+            os.replace(target + ".tmp", target)
+        print(f"Saved visual index with {self.count()} images to {path}")
+
+    @classmethod
+    def load(cls, path=VISUAL_INDEX_PATH):
+        with open(os.path.join(path, METADATA_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if tuple(data.get("hist_bins", ())) != HIST_BINS:
+            raise ValueError("Visual index was built with different histogram bins")
+        return cls(
+            data["names"], data["stamps"],
+            np.load(os.path.join(path, HISTOGRAMS_FILE)),
+            np.load(os.path.join(path, PALETTES_FILE)),
+        )
+
+    def similar(self, name, k=10, candidates=None):
+        """
+        [(image_name, similarity)] most similar to an indexed image, best first.
+        ``candidates`` optionally limits results to a set of image names.
+        """
+        row = self._rows.get(name)
+        if row is None:
+            raise KeyError(name)
+        return self.similar_to(self.histograms[row], self.palettes[row], k, exclude=row, candidates=candidates)
+
+    def similar_to(self, histogram, palette, k=10, exclude=None, candidates=None):
+        if self.count() == 0 or k <= 0:
+            return []
+        scores = self.histograms @ np.asarray(histogram, dtype=np.float32)
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        if candidates is not None:
+            allowed = np.fromiter((name in candidates for name in self.names), dtype=bool, count=self.count())
+            scores[~allowed] = -np.inf
+        shortlist_size = min(k * RERANK_FACTOR, int(np.isfinite(scores).sum()))
+        if shortlist_size == 0:
+            return []
+        shortlist = np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+
+        palette_similarity = 1.0 - np.minimum(palette_distances(np.asarray(palette), self.palettes[shortlist]) / 100.0, 1.0)
+        combined = HISTOGRAM_WEIGHT * scores[shortlist] + (1.0 - HISTOGRAM_WEIGHT) * palette_similarity
+        # Best first, ties on row order so results are deterministic
+        order = np.lexsort((shortlist, -combined))[:k]
+        return [(self.names[shortlist[i]], round(float(combined[i]), 4)) for i in order]
+
+
+class VisualSearch:
+    """
+    Loads the saved index, or builds it on first use, and brings it up to date
+    in the background when files in ``folder`` change.
+    """
+
+    def __init__(self, folder=FITTED_IMAGES_FOLDER, path=VISUAL_INDEX_PATH, refresh_seconds=VISUAL_INDEX_REFRESH_SECONDS):
+        self.folder = folder
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        self._marker = None
+        self._checked_at = 0.0
+        self._updating = False
+        self._lock = threading.Lock()
+
+    def _folder_marker(self):
+        # Adding, removing or renaming a file changes the directory's mtime
+        try:
+            return os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _update(self, marker):
+        try:
+            index = VisualIndex.build(self.folder, previous=self._index)
+            index.save(self.path)
+            self._index = VisualIndex.load(self.path)
+            self._marker = marker
+        except Exception as e:
+            print(f"Could not update the visual index: {e}")
+        finally:
+            self._updating = False
+
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    try:
+                        self._index = VisualIndex.load(self.path)
+                    except (OSError, ValueError, KeyError):
+                        self._index = VisualIndex(
+                            [], [], np.empty((0, int(np.prod(HIST_BINS))), np.float32), np.empty((0, PALETTE_SIZE, 4), np.float32)
+                        )
+                    self._updating = True
+                    self._checked_at = time.monotonic()
+                    # Saved stamps are checked by the incremental build, so no file is trusted blindly
+                    self._update(self._folder_marker())
+        elif time.monotonic() - self._checked_at >= self.refresh_seconds:
+            with self._lock:
+                if not self._updating and time.monotonic() - self._checked_at >= self.refresh_seconds:
+                    self._checked_at = time.monotonic()
+                    marker = self._folder_marker()
+                    if marker != self._marker:
+                        # Keep serving the current index while new garments are computed
+                        self._updating = True
+                        threading.Thread(target=self._update, args=(marker,), daemon=True).start()
+        return self._index
+
+    def similar(self, name, k=10, candidates=None):
+        return self.index().similar(name, k, candidates=candidates)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    existing = None
+    try:
+        existing = VisualIndex.load()
+    except (OSError, ValueError, KeyError):
+        pass
+    VisualIndex.build(previous=existing).save()
+    print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -1,12 +1,14 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-import sqlite3
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
 import uvicorn
 import shutil
+import asyncio
+from db import CATALOG_DB_PATH
+from catalog_snapshot import catalog
 
 app = FastAPI()
 
@@ -32,7 +34,7 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
-SQLITE_DB_PATH = os.path.join(os.path.dirname(__file__), "myntra.db")
+SQLITE_DB_PATH = CATALOG_DB_PATH
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "user_images")
 UPLOADED_PERSON_IMAGE_NAME = None
 
@@ -40,29 +42,26 @@ print(f"Database path: {SQLITE_DB_PATH}")
 print(f"User images directory: {UPLOAD_DIR}")
 print(f"Fitted images directory: {image_directory}")
 
+@app.on_event("startup")
+def load_catalog_snapshot():
+    catalog.refresh()
+
 @app.get("/get_myntra_data")
-def get_myntra_data(category: Optional[str] = None):
+async def get_myntra_data(category: Optional[str] = None):
     try:
-        conn = sqlite3.connect(SQLITE_DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        if category:
-            cursor.execute("SELECT * FROM products WHERE extract_images IS NOT NULL AND LOWER(subcategory) = LOWER(?)", (category,))
-            print(f"Query executed with category filter: {category}")
-        else:
-            cursor.execute("SELECT * FROM products WHERE extract_images IS NOT NULL")
-            
-        rows = cursor.fetchall()
-        conn.close()
-        data = [dict(row) for row in rows]
-        print(f"Returning {len(data)} rows")
+        # Served from the in-memory catalog, reloaded when myntra.db changes
+        data = await asyncio.to_thread(lambda: catalog.current().list_products(category)["items"])
+        print(f"Returning {len(data)} rows" + (f" for category {category}" if category else ""))
         return data
 
     except Exception as e:
         print(f"Error in get_myntra_data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("shutdown")
+def close_catalog_connections():
+    catalog.close()
+
 @app.post("/take_user_image")
 async def take_user_image(file: UploadFile = File(...)):
     global UPLOADED_PERSON_IMAGE_NAME
@@ -19,6 +19,34 @@ interface Product {
   main_category: string
   subcategory: string
   extract_images: string
+  img_variants?: ImageVariants | null
+  // Tiny blurred WebP data URI, shown until the image loads (see back/backend/image_placeholders.py)
+  placeholder?: string | null
+}
+
+// Resized copies of the garment image, as srcsets per format (see back/backend/image_variants.py)
+interface ImageVariants {
+  src: string
+  webp: string
+  jpg: string
+  width: number
+  height: number
+}
+
+const API_URL = 'http://localhost:8001'
+// Matches the grid columns: 1, sm:2, lg:3, xl:4
+const GRID_IMAGE_SIZES = '(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw'
+const absoluteSrcSet = (srcSet: string) =>
+  srcSet.split(', ').map((candidate) => `${API_URL}${candidate}`).join(', ')
+
+const showImageMissing = (e: React.SyntheticEvent<HTMLImageElement>) => {
+  const target = e.target as HTMLImageElement
+  const container = target.closest('picture')?.parentElement ?? target.parentElement!
+  container.innerHTML = `
+    <div class="w-full h-full bg-neutral-100 flex items-center justify-center">
+      <span class="text-neutral-400 text-xs">No Image</span>
+    </div>
+  `
 }
 
 export default function Collections() {
@@ -36,18 +64,34 @@ export default function Collections() {
     'Shorts', 'Skirt', 'Hoodie', 'Jacket', 'Sweater', 'Polo', 'Coat'
   ]
 
-  const fetchProducts = async (category?: string) => {
-    setLoading(true)
+  const PAGE_SIZE = 60
+  const PRODUCT_FIELDS = 'product_id,name,price,img,seller,discount,main_category,subcategory,extract_images,placeholder'
+  const [nextCursor, setNextCursor] = useState<number | null>(null)
+  const [totalProducts, setTotalProducts] = useState<number | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+
+  const fetchProducts = async (category?: string, cursor?: number) => {
+    if (cursor) {
+      setLoadingMore(true)
+    } else {
+      setLoading(true)
+    }
     try {
-      const url = category && category !== 'All'
-        ? `http://localhost:8001/get_myntra_data?category=${encodeURIComponent(category)}`
-        : 'http://localhost:8001/get_myntra_data'
-      
-      const response = await fetch(url)
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE), fields: PRODUCT_FIELDS })
+      if (category && category !== 'All') {
+        params.set('category', category)
+      }
+      if (cursor) {
+        params.set('cursor', String(cursor))
+      }
+
+      const response = await fetch(`http://localhost:8001/get_myntra_data?${params}`)
       if (response.ok) {
         const data = await response.json()
-        console.log(`Fetched ${data.length} ${category || 'all'} items`)
-        setProducts(data)
+        console.log(`Fetched ${data.items.length} of ${data.total} ${category || 'all'} items`)
+        setProducts(previous => cursor ? [...previous, ...data.items] : data.items)
+        setNextCursor(data.next_cursor)
+        setTotalProducts(data.total)
       } else {
         toast.error('Failed to load products')
       }
@@ -56,6 +100,7 @@ export default function Collections() {
       toast.error('Error loading products')
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
@@ -76,15 +121,13 @@ export default function Collections() {
 
     setSearching(true)
     setProducts([])
+    setNextCursor(null)
+    setTotalProducts(null)
     
     try {
-      const response = await fetch('http://localhost:8001/search_products', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ query: searchQuery }),
-      })
+      // GET so the browser can cache the result and revalidate it with its ETag
+      const params = new URLSearchParams({ query: searchQuery })
+      const response = await fetch(`http://localhost:8001/search_products?${params}`)
 
       if (response.ok) {
         const data = await response.json()
@@ -284,7 +327,7 @@ export default function Collections() {
                   <>No products found for "<span className="font-semibold">{searchQuery}</span>"</>
                 )
               ) : (
-                <>Showing <span className="font-semibold">{products.length}</span> {selectedCategory.toLowerCase() === 'all' ? 'products' : selectedCategory.toLowerCase()}{products.length !== 1 ? 's' : ''} available</>
+                <>Showing <span className="font-semibold">{products.length}</span>{totalProducts !== null && totalProducts > products.length ? <> of <span className="font-semibold">{totalProducts}</span></> : null} {selectedCategory.toLowerCase() === 'all' ? 'products' : selectedCategory.toLowerCase()}{products.length !== 1 ? 's' : ''} available</>
               )}
             </p>
           </div>
@@ -309,22 +352,41 @@ export default function Collections() {
                 }`}
               >
                 {/* Product Image */}
-                <div className={`relative ${viewMode === 'list' ? 'w-32 h-32' : 'aspect-square'} overflow-hidden`}>
-                  <Image
-                    src={`http://localhost:8001${product.img}`}
-                    alt={product.name}
-                    fill
-                    className="object-cover group-hover:scale-110 transition-transform duration-300"
-                    onError={(e) => {
-                      const target = e.target as HTMLImageElement
-                      target.style.display = 'none'
-                      target.parentElement!.innerHTML = `
-                        <div class="w-full h-full bg-neutral-100 flex items-center justify-center">
-                          <span class="text-neutral-400 text-xs">No Image</span>
-                        </div>
-                      `
-                    }}
-                  />
+                <div className={`relative ${viewMode === 'list' ? 'w-32 h-32' : 'aspect-square'} overflow-hidden bg-neutral-100`}>
+                  {product.placeholder && (
+                    <div
+                      aria-hidden
+                      className="absolute inset-0 scale-110 blur-lg bg-cover bg-center"
+                      style={{ backgroundImage: `url(${product.placeholder})` }}
+                    />
+                  )}
+                  {product.img_variants ? (
+                    <picture>
+                      <source
+                        type="image/webp"
+                        srcSet={absoluteSrcSet(product.img_variants.webp)}
+                        sizes={viewMode === 'list' ? '128px' : GRID_IMAGE_SIZES}
+                      />
+                      <img
+                        src={`${API_URL}${product.img_variants.src}`}
+                        srcSet={absoluteSrcSet(product.img_variants.jpg)}
+                        sizes={viewMode === 'list' ? '128px' : GRID_IMAGE_SIZES}
+                        alt={product.name}
+                        loading={index < 8 ? 'eager' : 'lazy'}
+                        decoding="async"
+                        className="absolute inset-0 w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
+                        onError={showImageMissing}
+                      />
+                    </picture>
+                  ) : (
+                    <Image
+                      src={`${API_URL}${product.img}`}
+                      alt={product.name}
+                      fill
+                      className="object-cover group-hover:scale-110 transition-transform duration-300"
+                      onError={showImageMissing}
+                    />
+                  )}
                   
                   {/* Discount Badge */}
                   {product.discount > 0 && (
@@ -373,6 +435,20 @@ export default function Collections() {
           </div>
         )}
 
+        {/* Load More */}
+        {!loading && !searching && !showAISearch && nextCursor !== null && (
+          <div className="flex justify-center mt-10">
+            <button
+              onClick={() => fetchProducts(selectedCategory, nextCursor)}
+              disabled={loadingMore}
+              className="flex items-center space-x-2 px-6 py-3 border border-neutral-300 rounded-lg text-neutral-700 hover:bg-neutral-100 transition-colors disabled:opacity-50"
+            >
+              {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+              <span>{loadingMore ? 'Loading...' : 'Load more'}</span>
+            </button>
+          </div>
+        )}
+
         {/* No Products Found */}
         {!loading && !searching && products.length === 0 && (
           <div className="text-center py-20">
@@ -140,6 +140,7 @@ export default function Home() {
     try {
       const requestData = {
         main_category: product.main_category,
+        target_audience: 'Female', // Same default as the recommendations request
         extract_images: product.extract_images
       }
 
@@ -44,7 +44,7 @@ export default function RecommendationPanel({ recommendations }: RecommendationP
                   {/* Fitted Image */}
                   <div className="w-24 h-32 flex-shrink-0 bg-neutral-100 relative overflow-hidden">
                 <Image
-                  src={`http://localhost:8001${item.fitted_image}`}
+                  src={`http://localhost:8001/img${item.fitted_image}?w=192`}
                   alt={`${item.name} fitted`}
                   width={96}
                   height={128}
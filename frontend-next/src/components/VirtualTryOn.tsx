@@ -115,7 +115,7 @@ export default function VirtualTryOn({
                 className="relative w-full h-full"
               >
                 <Image
-                  src={`http://localhost:8001${tryOnResult.selected_image}`}
+                  src={`http://localhost:8001/img${tryOnResult.selected_image}?w=640`}
                   alt="Virtual try-on result"
                   width={300}
                   height={400}
@@ -0,0 +1,245 @@
+"""
+Perceptual-hash deduplication for dataset ingestion.
+
+Every image gets two 64-bit hashes:
+
+* pHash: the signs of the low-frequency 8x8 DCT block of a 32x32 grayscale
+  thumbnail, compared to its median;
+* dHash: whether each pixel of a 9x8 thumbnail is brighter than its right-hand
+  neighbour.
+
+Two images are near-duplicates when both Hamming distances are within
+``max_distance`` bits. With the default ``IMAGE_DEDUP_SIMILARITY`` of 0.95,
+that allows 3 of 64 bits to differ. Kept images sit in a BK-tree over pHash,
+so checking a new image only visits the part of the tree within
+``max_distance`` instead of comparing against every image. Hashing runs in a
+process pool.
+
+Usage from an ingest script::
+
+    with DuplicateIndex() as dedup:
+        for path in dedup.unique(candidate_paths, limit=200):
+            ...copy path...
+        dedup.write_report("duplicate_clusters.json")
+
+Or audit an existing folder: ``python image_dedup.py back/backend/fitted_images``
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+IMAGE_DEDUP_SIMILARITY = float(os.getenv("IMAGE_DEDUP_SIMILARITY", "0.95"))
+IMAGE_DEDUP_WORKERS = int(os.getenv("IMAGE_DEDUP_WORKERS", "0")) or None
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp')
+
+_DCT_SIZE = 32
+# Orthonormal DCT-II basis, so the 2D transform is two matrix products
+_DCT = np.cos(np.pi * (2 * np.arange(_DCT_SIZE)[None, :] + 1) * np.arange(_DCT_SIZE)[:, None] / (2 * _DCT_SIZE))
+_DCT[0] *= np.sqrt(1 / _DCT_SIZE)
+_DCT[1:] *= np.sqrt(2 / _DCT_SIZE)
+
+
+def max_distance_for(similarity):
+    """Hamming distance allowed between two hashes for a similarity threshold in [0, 1]"""
+    return int((1.0 - similarity) * HASH_BITS)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _grayscale(image):
+    if image.mode in ("RGBA", "LA", "P"):
+        # Transparent pixels count as white, as on a product page
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    return image.convert("L")
+
+
+def phash(gray):
+    pixels = np.asarray(gray.resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:8, :8]
+    return _bits_to_int(low > np.median(low))
+
+
+def dhash(gray):
+    pixels = np.asarray(gray.resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hashes(path):
+    """(phash, dhash) for an image file, or None if it cannot be read"""
+    try:
+        with Image.open(path) as image:
+            gray = _grayscale(image)
+        return phash(gray), dhash(gray)
+    except (OSError, ValueError) as e:
+        print(f"Could not hash {path}: {e}")
+        return None
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance"""
+
+    def __init__(self):
+        self._root = None  # [hash, item, {distance: child}]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        self._size += 1
+        if self._root is None:
+            self._root = [value, item, {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """[(distance, hash, item)] within ``max_distance`` of ``value``, closest first"""
+        if self._root is None:
+            return []
+        found, stack = [], [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.append((distance, node[0], node[1]))
+            # Triangle inequality: only children in [d - max, d + max] can hold matches
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda match: match[0])
+        return found
+
+
+class DuplicateIndex:
+    def __init__(self, similarity=IMAGE_DEDUP_SIMILARITY, workers=IMAGE_DEDUP_WORKERS, chunk_size=64):
+        self.max_distance = max_distance_for(similarity)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._tree = BKTree()
+        self._dhashes = {}
+        # kept path -> [(duplicate path, phash distance, dhash distance)]
+        self.clusters = {}
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def find(self, hashes):
+        """Kept image that ``hashes`` duplicates, as (path, phash distance, dhash distance), or None"""
+        phash_value, dhash_value = hashes
+        for distance, _, path in self._tree.search(phash_value, self.max_distance):
+            dhash_distance = hamming(dhash_value, self._dhashes[path])
+            if dhash_distance <= self.max_distance:
+                return path, distance, dhash_distance
+        return None
+
+    def add(self, path, hashes):
+        """Keep ``path`` unless it near-duplicates a kept image; returns True if it was kept"""
+        match = self.find(hashes)
+        if match is not None:
+            kept, distance, dhash_distance = match
+            self.clusters.setdefault(kept, []).append((path, distance, dhash_distance))
+            return False
+        self._tree.add(hashes[0], path)
+        self._dhashes[path] = hashes[1]
+        return True
+
+    def hash_many(self, paths):
+        if len(paths) < 8:
+            return [image_hashes(path) for path in paths]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self._pool.map(image_hashes, paths, chunksize=4))
+
+    def unique(self, paths, limit=None):
+        """
+        Yield paths in order, skipping near-duplicates of anything kept so far,
+        until ``limit`` paths were yielded. Paths are hashed in parallel chunks,
+        so only about as many images are hashed as are needed.
+        """
+        paths = [str(path) for path in paths]
+        kept = 0
+        position = 0
+        while position < len(paths) and (limit is None or kept < limit):
+            wanted = self.chunk_size if limit is None else max(limit - kept, 8)
+            chunk = paths[position:position + wanted]
+            position += len(chunk)
+            for path, hashes in zip(chunk, self.hash_many(chunk)):
+                if limit is not None and kept >= limit:
+                    return
+                if hashes is None or not self.add(path, hashes):
+                    continue
+                kept += 1
+                yield path
+
+    def duplicate_count(self):
+        return sum(len(duplicates) for duplicates in self.clusters.values())
+
+    def report(self):
+        """Duplicate clusters, largest first"""
+        return [
+            {
+                "kept": kept,
+                "duplicates": [
+                    {"path": path, "phash_distance": distance, "dhash_distance": dhash_distance}
+                    for path, distance, dhash_distance in duplicates
+                ],
+            }
+            for kept, duplicates in sorted(self.clusters.items(), key=lambda cluster: (-len(cluster[1]), cluster[0]))
+        ]
+
+    def write_report(self, report_path):
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"max_distance": self.max_distance, "clusters": self.report()}, f, indent=2)
+        print(f"Skipped {self.duplicate_count()} near-duplicates in {len(self.clusters)} clusters, report: {report_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate images in a folder")
+    parser.add_argument("folder")
+    parser.add_argument("--similarity", type=float, default=IMAGE_DEDUP_SIMILARITY)
+    parser.add_argument("--report", default="duplicate_clusters.json")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder) if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    with DuplicateIndex(similarity=args.similarity) as dedup:
+        unique = sum(1 for _ in dedup.unique(paths))
+        print(f"{unique} unique images out of {len(paths)}")
+        dedup.write_report(args.report)
+        for cluster in dedup.report()[:10]:
+            print(f"  {cluster['kept']}: {len(cluster['duplicates'])} near-duplicates")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,14 @@ import sqlite3
 import shutil
 from pathlib import Path
 import csv
+import sys
+from image_dedup import DuplicateIndex
 
-def get_1000_images_from_dataset(dataset_path, total_images=1000):
-    """Get 1000 images from ALL categories in the dataset"""
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'back', 'backend'))
+from catalog_ingest import ingest_products, PRODUCT_COLUMNS
+
+def get_1000_images_from_dataset(dataset_path, total_images=1000, dedup=None):
+    """Get 1000 images from ALL categories in the dataset, skipping near-duplicates when ``dedup`` is given"""
     image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
     images_data = []
     
@@ -84,10 +89,13 @@ def get_1000_images_from_dataset(dataset_path, total_images=1000):
             
             # Get images from this category
             category_count = 0
-            for image_file in category_folder.iterdir():
-                if (image_file.suffix.lower() in image_extensions and 
-                    category_count < target_for_category and 
-                    len(images_data) < total_images):
+            candidates = [image_file for image_file in category_folder.iterdir() if image_file.suffix.lower() in image_extensions]
+            limit = min(target_for_category, total_images - len(images_data))
+            if dedup is not None:
+                # Near-duplicates of anything already taken are skipped, so the next image fills the slot
+                candidates = [Path(path) for path in dedup.unique(candidates, limit=limit)]
+            for image_file in candidates:
+                if category_count < limit:
                     
                     images_data.append({
                         'product_id': product_id,
@@ -155,57 +163,10 @@ def create_csv_file(images_data, csv_path):
     print(f"Created CSV file with {len(images_data)} entries at: {csv_path}")
 
 def create_database(images_data, db_path):
-    """Create SQLite database with 1000 products"""
-    
-    # Remove existing database
-    if os.path.exists(db_path):
-        os.remove(db_path)
-        print(f"Removed existing database: {db_path}")
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create products table
-    create_table_sql = '''
-    CREATE TABLE IF NOT EXISTS products (
-        product_id INTEGER PRIMARY KEY,
-        name TEXT,
-        img TEXT,
-        subcategory TEXT,
-        main_category TEXT,
-        seller TEXT,
-        price REAL,
-        discount REAL,
-        target_audience TEXT,
-        extract_images TEXT
-    )
-    '''
-    
-    cursor.execute(create_table_sql)
-    
-    # Insert new data
-    insert_sql = '''
-    INSERT INTO products 
-    (product_id, name, img, subcategory, main_category, seller, price, discount, target_audience, extract_images)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    '''
-    
-    for item in images_data:
-        cursor.execute(insert_sql, (
-            item['product_id'],
-            item['name'], 
-            item['img'],
-            item['subcategory'],
-            item['main_category'],
-            item['seller'],
-            item['price'],
-            item['discount'],
-            item['target_audience'],
-            item['extract_images']
-        ))
-    
-    conn.commit()
-    conn.close()
+    """Upsert the products into the SQLite database in one transaction, replacing the previous catalog"""
+    rows = ({key: item[key] for key in PRODUCT_COLUMNS} for item in images_data)
+    # The API keeps serving the old catalog until the load commits, so the database is never deleted
+    ingest_products(rows, db_path, replace_missing=True)
     
     print(f"Created database with {len(images_data)} products at: {db_path}")
 
@@ -220,7 +181,9 @@ def main():
     
     # Step 1: Get 1000 images from all categories
     print("Step 1: Getting 1000 images from ALL categories...")
-    images_data = get_1000_images_from_dataset(dataset_path, total_images=1000)
+    with DuplicateIndex() as dedup:
+        images_data = get_1000_images_from_dataset(dataset_path, total_images=1000, dedup=dedup)
+        dedup.write_report("back/backend/duplicate_clusters.json")
     
     # Step 2: Copy images
     print("Step 2: Copying images to fitted_images folder...")
@@ -259,6 +222,7 @@ def main():
     print(f"   - Images: {output_dir}")
     print(f"   - CSV: {csv_path}")
     print(f"   - Database: {db_path}")
+    print(f"   - Duplicate report: back/backend/duplicate_clusters.json")
     
     print(f"\\n🔥 You now have 1000 fashion items with full diversity!")
 
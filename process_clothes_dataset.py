@@ -10,6 +10,7 @@ from PIL import Image
 import random
 import uuid
 from datetime import datetime, timedelta
+from image_dedup import DuplicateIndex
 
 # Paths
 CLOTHES_DATASET_PATH = "c:\\Users\\sebas\\Downloads\\AI_VITON-main\\Clothes_Dataset"
@@ -42,8 +43,8 @@ SELLERS = [
     'VogueCollection', 'StyleZone', 'TrendSetters', 'FashionForward', 'ChicWear'
 ]
 
-def generate_product_data():
-    """Generate product data from Clothes_Dataset directory"""
+def generate_product_data(dedup):
+    """Generate product data from Clothes_Dataset directory, skipping near-duplicate images"""
     products_data = []
     product_id = 1000
     
@@ -69,17 +70,17 @@ def generate_product_data():
         image_files = [f for f in os.listdir(category_path) 
                       if f.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))]
         
-        for i, image_file in enumerate(image_files):
-            # Set different limits based on category
-            if category_folder == 'Gaun':
-                if i >= 200:  # Load 200 dresses
-                    break
-            else:
-                if i >= 20:  # Limit other categories to 20 items to keep dataset manageable
-                    break
-                
+        # Set different limits based on category
+        if category_folder == 'Gaun':
+            limit = 200  # Load 200 dresses
+        else:
+            limit = 20  # Limit other categories to 20 items to keep dataset manageable
+        
+        # Near-duplicates of anything already taken are skipped, so the next image fills the slot
+        unique_paths = dedup.unique([os.path.join(category_path, image_file) for image_file in image_files], limit=limit)
+        for source_image_path in unique_paths:
+            image_file = os.path.basename(source_image_path)
             try:
-                source_image_path = os.path.join(category_path, image_file)
                 
                 # Copy image to fitted_images with new naming convention
                 new_filename = f"{product_id}_extracted.png"
@@ -180,7 +181,9 @@ def main():
     print("Starting clothes dataset processing...")
     
     # Generate product data
-    products_data = generate_product_data()
+    with DuplicateIndex() as dedup:
+        products_data = generate_product_data(dedup)
+        dedup.write_report(os.path.join(BACKEND_PATH, "duplicate_clusters.json"))
     
     if not products_data:
         print("No products were processed!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test perceptual-hash deduplication: hashing, BK-tree lookups and ingest skipping
+"""
+
+import os
+import random
+import tempfile
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from image_dedup import BKTree, DuplicateIndex, hamming, image_hashes
+
+
+def make_garment(seed):
+    """A distinct synthetic photo: random colored blocks with some noise"""
+    rng = np.random.default_rng(seed)
+    image = np.full((240, 180, 3), rng.uniform(0, 255, size=3))
+    for _ in range(8):
+        top, left = rng.integers(0, 200), rng.integers(0, 140)
+        height, width = rng.integers(30, 120), rng.integers(30, 100)
+        image[top:top + height, left:left + width] = rng.uniform(0, 255, size=3)
+    image += rng.normal(0, 6, size=image.shape)
+    return Image.fromarray(np.clip(image, 0, 255).astype(np.uint8))
+
+
+def test_bktree_matches_brute_force():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    # Plant some near neighbours
+    hashes += [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in hashes[:200]]
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    for query in hashes[:50] + [rng.getrandbits(64) for _ in range(50)]:
+        expected = sorted(i for i, h in enumerate(hashes) if hamming(query, h) <= 4)
+        assert sorted(item for _, _, item in tree.search(query, 4)) == expected
+    print("✅ BK-tree search matches brute force")
+
+
+def test_near_duplicates_are_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for seed in range(12):
+            path = os.path.join(tmp, f"{seed:02d}_original.png")
+            make_garment(seed).save(path)
+            paths.append(path)
+
+        # Re-encoded, resized and stamped copies of the first three images
+        Image.open(paths[0]).convert("RGB").save(os.path.join(tmp, "00_recompressed.jpg"), quality=70)
+        Image.open(paths[1]).resize((360, 480)).save(os.path.join(tmp, "01_resized.png"))
+        stamped = Image.open(paths[2]).convert("RGB")
+        ImageDraw.Draw(stamped).rectangle((2, 2, 14, 10), fill=(255, 255, 255))
+        stamped.save(os.path.join(tmp, "02_stamped.png"))
+        duplicates = {"00_recompressed.jpg": "00_original.png", "01_resized.png": "01_original.png", "02_stamped.png": "02_original.png"}
+
+        candidates = sorted(os.path.join(tmp, name) for name in os.listdir(tmp))
+        with DuplicateIndex(workers=2, chunk_size=4) as dedup:
+            # Originals sort before their copies, so they are the ones kept
+            kept = [os.path.basename(path) for path in dedup.unique(candidates)]
+            assert kept == [f"{seed:02d}_original.png" for seed in range(12)], kept
+            found = {os.path.basename(d["path"]): os.path.basename(c["kept"]) for c in dedup.report() for d in c["duplicates"]}
+            assert found == duplicates, found
+
+            report_path = os.path.join(tmp, "report.json")
+            dedup.write_report(report_path)
+            assert os.path.exists(report_path)
+
+        # A limit still yields that many unique images: duplicates do not use up slots
+        with DuplicateIndex() as dedup:
+            limited = list(dedup.unique([paths[0], os.path.join(tmp, "00_recompressed.jpg"), paths[1], paths[2]], limit=3))
+            assert [os.path.basename(path) for path in limited] == ["00_original.png", "01_original.png", "02_original.png"]
+
+        # Distinct images stay far apart
+        hashes = [image_hashes(path)[0] for path in paths]
+        assert min(hamming(a, b) for i, a in enumerate(hashes) for b in hashes[i + 1:]) > 3
+    print("✅ Near-duplicates skipped and reported, distinct images kept")
+
+
+if __name__ == "__main__":
+    test_bktree_matches_brute_force()
+    test_near_duplicates_are_skipped()